@@ -1,7 +1,29 @@
 """
 Aggregate suitability and risk scores by H3 hexagon.
+
+`analyze_chunks` fuses calculate_suitability -> assess_risk -> aggregate_by_h3
+into one pass over chunks: each chunk is reduced to per-cell partials (count,
+sum and max of suitability) that are merged as chunks arrive. Risk needs the
+global suitability max, so it is finished in a second phase over the small
+per-cell table: mean(1 - s / max) over a cell equals 1 - mean(s) / max.
+Rows without a cell are kept under a missing-cell key so they count towards
+that max, as they do in assess_risk, but they get no output row.
 """
 
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.suitability import (
+    WeightedSuitability,
+    default_suitability,
+    suitability_scores,
+)
+
+PARTIAL_COLUMNS = ["n", "suitability_sum", "suitability_max"]
+
+
 def aggregate_by_h3(df):
     if "h3_index" not in df.columns:
         print("Missing H3 index column. Skipping aggregation.")
@@ -14,3 +36,106 @@ def aggregate_by_h3(df):
 
     print("Aggregation by H3 index completed.")
     return grouped
+
+
+def has_cell(index) -> np.ndarray:
+    """
+    The missing-cell rule, shared with incremental.py: partial tables keep rows
+    without a cell under a missing (NaN) key, which counts towards the global
+    suitability max, as in assess_risk, but gets no output row, as in
+    aggregate_by_h3. True for every key that is a real cell.
+    """
+    return np.asarray(pd.notna(index), dtype=bool)
+
+
+def partial_aggregates(
+    df: pd.DataFrame,
+    weights: Optional[Dict[str, float]] = None,
+    cell_col: str = "h3_index",
+    scores: Optional[np.ndarray] = None,
+    suitability: Optional[WeightedSuitability] = None,
+) -> pd.DataFrame:
+    """
+    Score the rows of one chunk and reduce them to per-cell count, sum and max
+    of suitability. scores, if given, are per-row suitability scores used
+    instead of suitability_scores(df, weights, suitability). Rows without a
+    cell are grouped under a missing key. Only the score array is
+    materialized; the chunk itself is not copied.
+    """
+    if scores is None:
+        scores = suitability_scores(df, weights, suitability)
+    grouped = pd.Series(scores).groupby(df[cell_col].to_numpy(), dropna=False)
+    partial = pd.DataFrame({
+        "n": grouped.count(),
+        "suitability_sum": grouped.sum(),
+        "suitability_max": grouped.max(),
+    })
+    partial.index.name = "h3_index"
+    return partial
+
+
+def merge_partials(*partials: pd.DataFrame) -> pd.DataFrame:
+    """
+    Combine per-cell partials from several chunks.
+    """
+    partials = [p for p in partials if p is not None and len(p)]
+    if len(partials) == 1:
+        return partials[0]
+    if not partials:
+        return pd.DataFrame(
+            {
+                c: pd.Series(dtype=t)
+                for c, t in zip(PARTIAL_COLUMNS, [np.int64, float, float])
+            }
+        )
+    merged = (
+        pd.concat(partials)
+        .groupby(level=0, dropna=False)
+        .agg({"n": "sum", "suitability_sum": "sum", "suitability_max": "max"})
+    )
+    merged.index.name = "h3_index"
+    return merged
+
+
+def finalize_aggregates(partials: pd.DataFrame) -> pd.DataFrame:
+    """
+    Second phase: turn merged partials into mean suitability_score and
+    risk_score per cell. Rows without a cell follow has_cell: they count
+    towards the global max and are then dropped.
+    """
+    global_max = partials["suitability_max"].max()
+    partials = partials[has_cell(partials.index)]
+    n = partials["n"].to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(
+            n > 0, partials["suitability_sum"].to_numpy() / n, np.nan
+        )
+    return pd.DataFrame({
+        "h3_index": partials.index.to_numpy(),
+        "suitability_score": mean,
+        "risk_score": 1 - mean / global_max,
+    })
+
+
+def analyze_chunks(
+    chunks: Iterable[pd.DataFrame],
+    weights: Optional[Dict[str, float]] = None,
+    cell_col: str = "h3_index",
+    suitability: Optional[WeightedSuitability] = None,
+) -> pd.DataFrame:
+    """
+    Suitability, risk and per-hex mean aggregates over a stream of chunks (e.g.
+    loader.iter_data). Same result as calculate_suitability -> assess_risk ->
+    aggregate_by_h3 on the concatenated rows, with memory bounded by one chunk
+    plus the per-cell table. The scorer is built once, not per chunk.
+    """
+    suitability = suitability or default_suitability(weights)
+    partials = None
+    for chunk in chunks:
+        partial = partial_aggregates(
+            chunk, cell_col=cell_col, suitability=suitability
+        )
+        partials = merge_partials(partials, partial)
+    result = finalize_aggregates(merge_partials(partials))
+    print(f"✅ Fused analysis aggregated {len(result)} H3 cells.")
+    return result
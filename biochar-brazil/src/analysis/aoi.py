@@ -0,0 +1,288 @@
+"""
+Area-of-interest queries: ranked biochars per H3 cell within a radius.
+
+The radius (region.aoi_radius_km) is turned into an H3 k-ring at the store's
+resolution, with k large enough for the ring to cover the circle. Ring
+cells and their centers are cached per (center cell, k), and cells whose
+center lies beyond the radius are dropped, so the k-ring's hexagonal corners
+don't widen the area.
+
+Results come from a region store, the precomputed output of
+src.analysis.region held sorted by cell, so a query is a few binary searches
+and array slices rather than a re-run of the threshold engine.
+
+Store layout (one directory):
+- scores.parquet   region score rows (h3_index as
+                   uint64), sorted by cell and rank
+- meta.json        H3 resolution, cell and row counts
+
+Usage:
+    python -m src.analysis.aoi --lat -12.5 --lon -55.7 \\
+        --scores data/outputs/tables/region_scores.csv
+"""
+
+import argparse
+import json
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+
+import h3
+import numpy as np
+import pandas as pd
+import yaml
+from h3.api import basic_int
+
+from src.analysis.region import RESULT_COLUMNS
+from src.utils.geospatial import h3_cell_resolutions, h3_cells_to_int
+
+EARTH_RADIUS_KM = 6371.0088
+AOI_COLUMNS = RESULT_COLUMNS + ["ring", "distance_km"]
+
+
+def aoi_ring_size(radius_km: float, resolution: int) -> int:
+    """
+    A k whose k-ring covers a radius_km circle around the center cell.
+    Along its flat sides ring k is only 1.5 * k edge lengths out; one extra
+    ring absorbs cell size varying around the average edge length.
+    """
+    step = 1.5 * h3.average_hexagon_edge_length(resolution, unit="km")
+    return int(math.ceil(max(radius_km, 0.0) / step)) + 1
+
+
+@lru_cache(maxsize=4096)
+def aoi_ring(
+    cell: int, k: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Cells of the k-ring around a uint64 cell, sorted, with their grid distance
+    and center lat/lng (radians). Cached; the returned arrays are read-only.
+    """
+    cells, rings = [], []
+    for d in range(k + 1):
+        ring = basic_int.grid_ring(cell, d)
+        cells.extend(ring)
+        rings.extend([d] * len(ring))
+    cells = np.array(cells, dtype=np.uint64)
+    order = np.argsort(cells)
+    centers = np.radians(
+        np.array([basic_int.cell_to_latlng(int(c)) for c in cells[order]])
+    )
+    out = (
+        cells[order],
+        np.array(rings, dtype=np.int16)[order],
+        centers[:, 0],
+        centers[:, 1],
+    )
+    for a in out:
+        a.flags.writeable = False
+    return out
+
+
+def haversine_km(
+    lat: float, lon: float, lat_rad: np.ndarray, lng_rad: np.ndarray
+) -> np.ndarray:
+    lat0, lon0 = math.radians(lat), math.radians(lon)
+    a = (
+        np.sin((lat_rad - lat0) / 2) ** 2
+        + math.cos(lat0) * np.cos(lat_rad) * np.sin((lng_rad - lon0) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class RegionStore:
+    def __init__(self, scores: pd.DataFrame, resolution: int):
+        self.scores = scores.reset_index(drop=True)
+        self.resolution = resolution
+        keys = self.scores["h3_index"].to_numpy()
+        # One entry per cell: its id and the span of its rows
+        self.cells, self.starts = np.unique(keys, return_index=True)
+        self.ends = np.append(self.starts[1:], len(keys))
+        self._columns = {
+            c: self.scores[c].to_numpy() for c in RESULT_COLUMNS[1:]
+        }
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    @classmethod
+    def build(
+        cls,
+        scores: pd.DataFrame | str | Path,
+        path: Optional[str | Path] = None,
+    ) -> "RegionStore":
+        """
+        Index region score rows (a frame or the CSV written by
+        src.analysis.region), and save them if path is given.
+        """
+        if not isinstance(scores, pd.DataFrame):
+            scores = pd.read_csv(scores)
+        scores = scores[RESULT_COLUMNS].copy()
+        scores["h3_index"] = h3_cells_to_int(scores["h3_index"].to_numpy())
+        resolutions = np.unique(
+            h3_cell_resolutions(scores["h3_index"].to_numpy())
+        )
+        if len(resolutions) != 1:
+            raise ValueError(
+                "Region scores must share one H3 resolution, found "
+                f"{resolutions.tolist()}"
+            )
+        scores = scores.sort_values(["h3_index", "rank"], kind="stable")
+        store = cls(scores, int(resolutions[0]))
+        if path is not None:
+            store.save(path)
+        return store
+
+    def save(self, path: str | Path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        self.scores.to_parquet(path / "scores.parquet", index=False)
+        with open(path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "resolution": self.resolution,
+                    "n_cells": len(self.cells),
+                    "n_rows": len(self.scores),
+                },
+                f,
+                indent=2,
+            )
+        print(f"✅ Region store with {len(self.cells)} cells saved to: {path}")
+
+    @classmethod
+    def load(cls, path: str | Path) -> "RegionStore":
+        path = Path(path)
+        meta_path = path / "meta.json"
+        if not meta_path.exists():
+            raise FileNotFoundError(f"Region store not found at {path}")
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            pd.read_parquet(path / "scores.parquet"), meta["resolution"]
+        )
+
+    def rows(self, cells: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Row positions of the given sorted uint64 cells, and for each row the
+        index of its cell in cells. Cells not in the store contribute no rows.
+        """
+        pos = np.minimum(
+            np.searchsorted(self.cells, cells), max(len(self.cells) - 1, 0)
+        )
+        found = (
+            np.flatnonzero(self.cells[pos] == cells)
+            if len(self.cells)
+            else np.array([], dtype=np.intp)
+        )
+        starts, ends = self.starts[pos[found]], self.ends[pos[found]]
+        counts = ends - starts
+        owner = np.repeat(found, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        return np.repeat(starts, counts) + offsets, owner
+
+    def query_aoi(
+        self, lat: float, lon: float, radius_km: float
+    ) -> pd.DataFrame:
+        """
+        Ranked results for every stored cell whose center is within radius_km
+        of (lat, lon). One row per (cell, rank), nearest cells first; ring is
+        the grid distance from the point's cell.
+        """
+        center = basic_int.latlng_to_cell(lat, lon, self.resolution)
+        cells, rings, lat_rad, lng_rad = aoi_ring(
+            center, aoi_ring_size(radius_km, self.resolution)
+        )
+        distance = haversine_km(lat, lon, lat_rad, lng_rad)
+        inside = np.flatnonzero((distance <= radius_km) | (rings == 0))
+
+        rows, owner = self.rows(cells[inside])
+        owner = inside[owner]
+        out = {"h3_index": [h3.int_to_str(int(c)) for c in cells[owner]]}
+        out.update({c: values[rows] for c, values in self._columns.items()})
+        out["ring"] = rings[owner]
+        out["distance_km"] = distance[owner]
+        df = pd.DataFrame(out, columns=AOI_COLUMNS)
+        return df.sort_values(
+            ["distance_km", "h3_index", "rank"], kind="stable"
+        ).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ranked biochars for every H3 cell within a radius "
+        "of a point"
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default="configs/default.yaml",
+        help="Path to configuration YAML file",
+    )
+    parser.add_argument(
+        "--lat", type=float, required=True, help="Latitude of the AOI center"
+    )
+    parser.add_argument(
+        "--lon", type=float, required=True, help="Longitude of the AOI center"
+    )
+    parser.add_argument(
+        "--radius-km",
+        type=float,
+        default=None,
+        help="AOI radius (default: region.aoi_radius_km)",
+    )
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=None,
+        help="Region store directory (default: paths.region_store)",
+    )
+    parser.add_argument(
+        "--scores",
+        type=str,
+        default=None,
+        help="Region scores CSV to (re)build the store from",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Output CSV (default: <tables_dir>/aoi_scores.csv)",
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    store_path = args.store or config["paths"]["region_store"]
+    store = (
+        RegionStore.build(args.scores, store_path)
+        if args.scores
+        else RegionStore.load(store_path)
+    )
+    if store.resolution != config["h3"]["resolution"]:
+        print(
+            f"Warning: region store is at H3 res {store.resolution}, config "
+            f"has {config['h3']['resolution']}."
+        )
+
+    radius_km = (
+        args.radius_km
+        if args.radius_km is not None
+        else config["region"]["aoi_radius_km"]
+    )
+    results = store.query_aoi(args.lat, args.lon, radius_km)
+    output = Path(
+        args.output or Path(config["paths"]["tables_dir"]) / "aoi_scores.csv"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    results.to_csv(output, index=False)
+    print(
+        f"✅ {results['h3_index'].nunique()} cells within {radius_km} km saved "
+        f"to: {output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Hybrid ranking: blend random-forest predictions with threshold-rule scores.
+
+For each batch of H3 cells, the soil properties are read once into a float
+matrix that both engines use: its columns drive the rule signatures, and
+they fill the soil part of the (cell, biochar) pair matrix the model predicts
+on. The biochar part of that matrix and the per-rule points of the catalogue
+are built once per scorer, not per batch.
+
+Model features named "soil_<prop>" come from the cell's soil properties;
+all other features come from the biochar catalogue.
+
+blended = (ml_weight * ml01 + rules_weight * normalized_score)
+          / (ml_weight + rules_weight)
+where ml01 is the prediction mapped from [ml_min, ml_max] to [0, 1].
+Biochars failing a critical rule get a blended score of 0.
+
+Usage:
+    python -m src.analysis.hybrid \\
+        --biochars data/processed/Dataset_feedstock_ML.xlsx \\
+        --model data/processed/ml_model.pkl
+"""
+
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from src.analysis.region import chunk_cells, polyfill_bbox
+from src.analysis.sweep import load_soils
+from src.analysis.thresholds import (
+    RULES,
+    CompiledRules,
+    evaluate_matrix,
+    prepare_biochars,
+)
+from src.data.loader import load_data
+from src.models.ml_model import MLModel
+
+SOIL_FEATURE_PREFIX = "soil_"
+HYBRID_COLUMNS = [
+    "h3_index",
+    "rank",
+    "biochar_id",
+    "name",
+    "blended_score",
+    "ml_score",
+    "rule_score",
+]
+
+
+class HybridScorer:
+
+    def __init__(
+        self,
+        model: MLModel,
+        biochars: pd.DataFrame,
+        rules: Optional[CompiledRules] = None,
+        ml_weight: float = 0.5,
+        rules_weight: float = 0.5,
+        ml_min: float = 0.0,
+        ml_max: float = 1.0,
+        top_k: int = 10,
+    ):
+        if model.feature_columns is None:
+            raise ValueError(
+                "Hybrid scoring needs a model with feature column metadata."
+            )
+        if ml_weight < 0 or rules_weight < 0 or ml_weight + rules_weight == 0:
+            raise ValueError(
+                "Blend weights must be non-negative and not both zero."
+            )
+        if ml_max <= ml_min:
+            raise ValueError("ml_max must be greater than ml_min.")
+        self.model = model
+        self.rules = rules or RULES
+        self.ml_weight = float(ml_weight)
+        self.rules_weight = float(rules_weight)
+        self.ml_min = float(ml_min)
+        self.ml_max = float(ml_max)
+        self.top_k = top_k
+
+        features = model.feature_columns
+        self.soil_features = [
+            (j, f[len(SOIL_FEATURE_PREFIX):])
+            for j, f in enumerate(features)
+            if f.startswith(SOIL_FEATURE_PREFIX)
+        ]
+        bio_features = [
+            (j, f)
+            for j, f in enumerate(features)
+            if not f.startswith(SOIL_FEATURE_PREFIX)
+        ]
+        missing = [f for _, f in bio_features if f not in biochars.columns]
+        if missing:
+            raise ValueError(
+                f"Biochar catalogue is missing model features: {missing}"
+            )
+
+        # Catalogue-side work, shared by every batch
+        self.prepared = prepare_biochars(biochars, self.rules)
+        self.n_biochars = len(biochars)
+        self.bio_block = np.zeros(
+            (self.n_biochars, len(features)), dtype=np.float32
+        )
+        for j, f in bio_features:
+            self.bio_block[:, j] = pd.to_numeric(
+                biochars[f], errors="coerce"
+            ).to_numpy(dtype=np.float32)
+        self.bio_block[np.isnan(self.bio_block)] = 0.0
+        self.soil_props = list(
+            dict.fromkeys(
+                self.rules.soil_props + [p for _, p in self.soil_features]
+            )
+        )
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Dict[str, Any],
+        model: MLModel,
+        biochars: pd.DataFrame,
+        rules: Optional[CompiledRules] = None,
+        top_k: Optional[int] = None,
+    ) -> "HybridScorer":
+        hybrid = config.get("hybrid", {})
+        return cls(
+            model, biochars, rules,
+            ml_weight=hybrid.get("ml_weight", 0.5),
+            rules_weight=hybrid.get("rules_weight", 0.5),
+            ml_min=hybrid.get("ml_min", 0.0),
+            ml_max=hybrid.get("ml_max", 1.0),
+            top_k=top_k or config.get("pipeline", {}).get("top_k", 10),
+        )
+
+    def soil_matrix(self, soils: pd.DataFrame) -> np.ndarray:
+        """
+        The shared per-batch soil matrix (n_cells x soil_props), float64 so
+        rule cut-offs compare exactly.
+        """
+        S = np.full((len(soils), len(self.soil_props)), np.nan)
+        for k, prop in enumerate(self.soil_props):
+            if prop in soils.columns:
+                S[:, k] = pd.to_numeric(soils[prop], errors="coerce").to_numpy(
+                    dtype=float
+                )
+        return S
+
+    def score_matrix(self, soils: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Blended, ML and rule scores for every (cell, biochar) pair of a batch,
+        each (n_cells x n_biochars).
+        """
+        S = self.soil_matrix(soils)
+        n, B = len(S), self.n_biochars
+        columns = {prop: S[:, k] for k, prop in enumerate(self.soil_props)}
+
+        rule = evaluate_matrix(
+            columns, None, self.rules, prepared=self.prepared
+        )
+
+        X = np.broadcast_to(
+            self.bio_block, (n, B, self.bio_block.shape[1])
+        ).copy()
+        for j, prop in self.soil_features:
+            X[:, :, j] = columns[prop][:, None]
+        X[np.isnan(X)] = 0.0
+        ml = self.model._predict_array(X.reshape(n * B, -1)).reshape(n, B)
+
+        ml01 = np.clip(
+            (ml - self.ml_min) / (self.ml_max - self.ml_min), 0.0, 1.0
+        )
+        blended = (
+            self.ml_weight * ml01
+            + self.rules_weight * rule["normalized_score"]
+        ) / (self.ml_weight + self.rules_weight)
+        blended = np.where(rule["hard_fail"], 0.0, blended)
+        return {
+            "blended": blended,
+            "ml": ml,
+            "rule": rule["normalized_score"],
+            "hard_fail": rule["hard_fail"],
+        }
+
+    def score_batch(self, soils: pd.DataFrame) -> pd.DataFrame:
+        """
+        Top-k biochars per cell by blended score (ties keep catalogue order),
+        one row per (cell, rank).
+        """
+        scores = self.score_matrix(soils)
+        k = min(self.top_k or self.n_biochars, self.n_biochars)
+        order = np.argsort(-scores["blended"], axis=1, kind="stable")[:, :k]
+        rows = np.repeat(np.arange(len(soils)), k)
+        cols = order.reshape(-1)
+        return pd.DataFrame({
+            "h3_index": soils["h3_index"].to_numpy()[rows],
+            "rank": np.tile(np.arange(1, k + 1), len(soils)),
+            "biochar_id": self.prepared["biochar_id"][cols],
+            "name": self.prepared["name"][cols],
+            "blended_score": scores["blended"][rows, cols],
+            "ml_score": scores["ml"][rows, cols],
+            "rule_score": scores["rule"][rows, cols],
+        }, columns=HYBRID_COLUMNS)
+
+
+def score_region_hybrid(
+    scorer: HybridScorer,
+    cells: List[str],
+    output_path: str | Path,
+    chunk_size: int = 2000,
+    soil_store: Optional[str] = None,
+) -> int:
+    """
+    Score cells batch by batch and stream the hybrid top-k rows to output_path
+    (CSV).
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        pd.DataFrame(columns=HYBRID_COLUMNS).to_csv(f, index=False)
+        for chunk in chunk_cells(cells, chunk_size):
+            scorer.score_batch(load_soils(list(chunk), soil_store)).to_csv(
+                f, header=False, index=False
+            )
+    print(f"✅ Hybrid scores for {len(cells)} cells saved to: {output_path}")
+    return len(cells)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rank biochars per H3 cell by blended ML and rule scores"
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default="configs/default.yaml",
+        help="Path to configuration YAML file",
+    )
+    parser.add_argument(
+        "--biochars",
+        type=str,
+        required=True,
+        help="Biochar catalogue (CSV/Excel)",
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default="data/processed/ml_model.pkl",
+        help="Saved MLModel artifact",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Output CSV (default: <tables_dir>/hybrid_scores.csv)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="H3 cells per batch (default: pipeline.chunk_size)",
+    )
+    parser.add_argument(
+        "--soil-store",
+        type=str,
+        default=None,
+        help="Soil property store (default: paths.soil_store)",
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    soil_store = args.soil_store or config["paths"].get("soil_store")
+    if soil_store and not (Path(soil_store) / "meta.json").exists():
+        print(
+            f"Warning: soil property store not found at {soil_store}; using "
+            "mock soil values."
+        )
+        soil_store = None
+
+    scorer = HybridScorer.from_config(
+        config, MLModel.from_artifact(args.model), load_data(args.biochars)
+    )
+    score_region_hybrid(
+        scorer,
+        polyfill_bbox(config["region"]["bbox"], config["h3"]["resolution"]),
+        args.output
+        or Path(config["paths"]["tables_dir"]) / "hybrid_scores.csv",
+        chunk_size=args.chunk_size
+        or config.get("pipeline", {}).get("chunk_size", 2000),
+        soil_store=soil_store,
+    )
+
+
+if __name__ == "__main__":
+    main()
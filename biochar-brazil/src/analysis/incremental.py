@@ -0,0 +1,227 @@
+"""
+Incremental analysis: keep per-H3-cell suitability results on disk and, on each
+run, recompute only the cells whose input rows changed.
+
+Store layout (one directory):
+- cells.parquet   h3_index, input_hash, n, suitability_sum, suitability_max
+                  per cell
+- meta.json       scoring version (hash of the WeightedSuitability weights,
+                  sub-score curves and clamps)
+
+The per-cell count, sum and max (the partials of aggregation.analyze_chunks)
+are enough to rebuild the output of calculate_suitability -> assess_risk ->
+aggregate_by_h3 after a partial update. A changed version re-scores every cell.
+
+The CLI scores with WeightedSuitability built from scoring.* in the config, so
+editing the config weights or sub-scores re-scores the store.
+
+Usage:
+    python -m src.analysis.incremental --input data/processed/soil_samples.csv
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from src.analysis.aggregation import (
+    PARTIAL_COLUMNS,
+    finalize_aggregates,
+    has_cell,
+    partial_aggregates,
+)
+from src.analysis.suitability import (
+    WeightedSuitability,
+    default_suitability,
+)
+from src.data.loader import load_data
+
+STORE_COLUMNS = ["input_hash"] + PARTIAL_COLUMNS
+
+
+def scoring_version(weights: Optional[Dict[str, float]] = None,
+                    suitability: Optional[WeightedSuitability] = None) -> str:
+    """
+    Hash of everything besides the input rows that stored results depend on:
+    the suitability scorer's settings, and nothing the scoring does not read.
+    """
+    suitability = suitability or default_suitability(weights)
+    spec = {
+        "features": suitability.features,
+        "weights": suitability.weights[0].tolist(),
+        "transform": suitability.transform,
+        "clamp": [suitability.clamp_min, suitability.clamp_max],
+    }
+    return hashlib.sha256(
+        json.dumps(spec, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def cell_hashes(df: pd.DataFrame, cell_col: str = "h3_index") -> pd.Series:
+    """
+    Content hash of each cell's input rows (uint64, indexed by cell). Row
+    hashes are summed, so the hash doesn't depend on row order within a cell.
+    Rows without a cell are hashed under a missing (NaN) key.
+    """
+    row_hashes = pd.util.hash_pandas_object(
+        df.drop(columns=[cell_col]), index=False
+    ).to_numpy()
+    codes, cells = pd.factorize(df[cell_col], use_na_sentinel=False)
+    acc = np.zeros(len(cells), dtype=np.uint64)
+    np.add.at(acc, codes, row_hashes)  # wraps modulo 2**64
+    return pd.Series(
+        acc, index=pd.Index(cells, name=cell_col), name="input_hash"
+    )
+
+
+class ResultStore:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.version = None
+        self.cells = pd.DataFrame(
+            {
+                c: pd.Series(dtype=t)
+                for c, t in zip(
+                    STORE_COLUMNS, [np.uint64, np.int64, float, float]
+                )
+            }
+        )
+        meta_path = self.path / "meta.json"
+        if meta_path.exists():
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self.version = json.load(f)["version"]
+            self.cells = pd.read_parquet(
+                self.path / "cells.parquet"
+            ).set_index("h3_index")
+
+    def __len__(self) -> int:
+        return int(has_cell(self.cells.index).sum())
+
+    def update(
+        self,
+        df: pd.DataFrame,
+        weights: Optional[Dict[str, float]] = None,
+        suitability: Optional[WeightedSuitability] = None,
+        cell_col: str = "h3_index",
+    ) -> pd.DataFrame:
+        """
+        Bring the store in line with df (all current input rows) and return the
+        per-cell aggregates. Only cells that are new, or whose rows changed,
+        are re-scored; cells no longer in df are dropped. Rows are scored by
+        suitability (its first scenario) when given, else by
+        default_suitability(weights). Rows without a cell are stored under the
+        missing-cell key, as in aggregation.analyze_chunks.
+        """
+        suitability = suitability or default_suitability(weights)
+        version = scoring_version(suitability=suitability)
+        hashes = cell_hashes(df, cell_col)
+
+        old = self.cells if version == self.version else self.cells.iloc[:0]
+        pos = old.index.get_indexer(hashes.index)
+        found = pos >= 0
+        same = np.zeros(len(hashes), dtype=bool)
+        same[found] = (
+            old["input_hash"].to_numpy()[pos[found]]
+            == hashes.to_numpy()[found]
+        )
+
+        changed = hashes.index[~same]
+        rows = df[df[cell_col].isin(changed)]
+        stats = partial_aggregates(
+            rows, cell_col=cell_col, suitability=suitability
+        )
+        stats.insert(0, "input_hash", hashes.loc[stats.index].to_numpy())
+
+        kept = old.iloc[pos[same]]
+        merged = pd.concat([kept, stats]) if len(kept) else stats
+        self.cells = merged[STORE_COLUMNS].sort_index().rename_axis("h3_index")
+        self.version = version
+        n_cells = int(has_cell(hashes.index).sum())
+        n_changed = int(has_cell(changed).sum())
+        print(
+            f"✅ Re-scored {n_changed} of {n_cells} H3 cells "
+            f"({n_cells - n_changed} unchanged)."
+        )
+        return self.aggregates()
+
+    def aggregates(self) -> pd.DataFrame:
+        """
+        Per-cell suitability_score and risk_score, equal to running
+        calculate_suitability -> assess_risk -> aggregate_by_h3 over all
+        current rows.
+        """
+        return finalize_aggregates(self.cells)
+
+    def save(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path / "cells.parquet.tmp"
+        self.cells.reset_index().to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.path / "cells.parquet")
+        with open(self.path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": self.version, "n_cells": len(self)},
+                f,
+                indent=2,
+            )
+        print(
+            f"✅ Result store with {len(self)} cells saved to: "
+            f"{self.path}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Incrementally re-score H3 cells whose inputs changed"
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default="configs/default.yaml",
+        help="Path to configuration YAML file",
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        required=True,
+        help="Soil samples with an h3_index column (CSV/Excel)",
+    )
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=None,
+        help="Result store directory (default: paths.results_store)",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Output CSV (default: <tables_dir>/h3_aggregates.csv)",
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    store = ResultStore(args.store or config["paths"]["results_store"])
+    aggregates = store.update(
+        load_data(args.input),
+        suitability=WeightedSuitability.from_config(config),
+    )
+    store.save()
+
+    output = Path(
+        args.output
+        or Path(config["paths"]["tables_dir"]) / "h3_aggregates.csv"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    aggregates.to_csv(output, index=False)
+    print(f"✅ H3 aggregates saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
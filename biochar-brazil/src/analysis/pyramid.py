@@ -0,0 +1,206 @@
+"""
+Multi-resolution H3 aggregation pyramid.
+
+Raw rows are reduced once, at the base resolution, to count / sum / min / max /
+sum of squares per cell and value column. Each coarser level is rolled up from
+the level below by grouping on parent cells, so zooming out never touches the
+raw rows again. Mean, variance and extremes at any level are then derived from
+those five statistics.
+
+Store layout (one directory):
+- res_<r>.parquet   h3_index (uint64) + <col>_<stat> columns per level
+- meta.json         value columns and resolutions
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.utils.geospatial import (
+    h3_cell_parents,
+    h3_cell_resolutions,
+    h3_cells_to_int,
+)
+
+STATS = ["count", "sum", "min", "max", "sumsq"]
+
+# How each statistic combines when children roll up into their parent
+ROLLUP = {
+    "count": "sum",
+    "sum": "sum",
+    "min": "min",
+    "max": "max",
+    "sumsq": "sum",
+}
+
+
+class H3Pyramid:
+    def __init__(self, levels: Dict[int, pd.DataFrame], value_cols: List[str]):
+        self.levels = levels
+        self.value_cols = list(value_cols)
+        self.base_resolution = max(levels)
+
+    @property
+    def resolutions(self) -> List[int]:
+        return sorted(self.levels)
+
+    @classmethod
+    def build(
+        cls,
+        df: pd.DataFrame,
+        value_cols: Sequence[str],
+        min_resolution: int = 0,
+        cell_col: str = "h3_index",
+    ) -> "H3Pyramid":
+        """
+        Reduce rows (all with cells at one resolution) to the base level, then
+        roll up to min_resolution. Rows with a missing cell are ignored; NaN
+        values don't count.
+        """
+        cells = h3_cells_to_int(df[cell_col].to_numpy())
+        valid = cells != 0
+        resolutions = np.unique(h3_cell_resolutions(cells[valid]))
+        if len(resolutions) != 1:
+            raise ValueError(
+                "Rows must share one H3 resolution, found "
+                f"{resolutions.tolist()}"
+            )
+        base = int(resolutions[0])
+        if not 0 <= min_resolution <= base:
+            raise ValueError(
+                "min_resolution must be between 0 and the base resolution "
+                f"{base}"
+            )
+
+        values = {}
+        for col in value_cols:
+            v = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+            v = v[valid]
+            values[col] = v
+            values[f"{col}__sq"] = v * v
+        grouped = pd.DataFrame(values).groupby(cells[valid])
+        agg = {}
+        for col in value_cols:
+            agg[f"{col}_count"] = grouped[col].count()
+            agg[f"{col}_sum"] = grouped[col].sum()
+            agg[f"{col}_min"] = grouped[col].min()
+            agg[f"{col}_max"] = grouped[col].max()
+            agg[f"{col}_sumsq"] = grouped[f"{col}__sq"].sum()
+        levels = {base: pd.DataFrame(agg).rename_axis("h3_index")}
+
+        for res in range(base - 1, min_resolution - 1, -1):
+            levels[res] = cls._roll_up(levels[res + 1], res, value_cols)
+        print(
+            f"✅ Built H3 pyramid for {list(value_cols)}: res {base} "
+            f"({len(levels[base])} cells) to res {min_resolution}."
+        )
+        return cls(levels, value_cols)
+
+    @staticmethod
+    def _roll_up(
+        child: pd.DataFrame, resolution: int, value_cols: Sequence[str]
+    ) -> pd.DataFrame:
+        parents = h3_cell_parents(child.index.to_numpy(), resolution)
+        how = {
+            f"{col}_{stat}": ROLLUP[stat]
+            for col in value_cols
+            for stat in STATS
+        }
+        return child.groupby(parents).agg(how).rename_axis("h3_index")
+
+    def _level(self, resolution: int) -> pd.DataFrame:
+        if resolution not in self.levels:
+            raise KeyError(
+                f"Resolution {resolution} not in pyramid (has "
+                f"{self.resolutions})"
+            )
+        return self.levels[resolution]
+
+    @staticmethod
+    def _derive(level: pd.DataFrame, col: str) -> pd.DataFrame:
+        n = level[f"{col}_count"].to_numpy(dtype=float)
+        s = level[f"{col}_sum"].to_numpy()
+        sq = level[f"{col}_sumsq"].to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, s / n, np.nan)
+            # Sample variance (ddof=1, as pandas),
+            # clipped at 0 against rounding
+            var = np.where(
+                n > 1, np.maximum((sq - s * mean) / (n - 1), 0.0), np.nan
+            )
+        return pd.DataFrame({
+            "h3_index": level.index.to_numpy(),
+            "count": n.astype(np.int64),
+            "mean": mean,
+            "var": var,
+            "min": level[f"{col}_min"].to_numpy(),
+            "max": level[f"{col}_max"].to_numpy(),
+        })
+
+    def stats(self, resolution: int, value_col: str) -> pd.DataFrame:
+        """
+        count, mean, var, min and max of value_col for every cell at a
+        resolution.
+        """
+        return self._derive(self._level(resolution), value_col)
+
+    def lookup(self, cells, value_col: str) -> pd.DataFrame:
+        """
+        Stats for specific cells (uint64 or strings, any mix of pyramid
+        resolutions), in input order. Cells without data get count 0 and NaN
+        stats.
+        """
+        keys = h3_cells_to_int(cells)
+        res = h3_cell_resolutions(keys)
+        parts = []
+        for r in np.unique(res):
+            pos = np.nonzero(res == r)[0]
+            level = self._level(int(r)).reindex(keys[pos])
+            level[f"{value_col}_count"] = level[f"{value_col}_count"].fillna(0)
+            parts.append(self._derive(level, value_col).set_index(pos))
+        out = (
+            pd.concat(parts).sort_index()
+            if parts
+            else self._derive(
+                self._level(self.base_resolution).iloc[:0], value_col
+            )
+        )
+        out["h3_index"] = np.asarray(cells)
+        return out.reset_index(drop=True)
+
+    def save(self, path: str | Path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for res, level in self.levels.items():
+            level.reset_index().to_parquet(
+                path / f"res_{res}.parquet", index=False
+            )
+        with open(path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "value_cols": self.value_cols,
+                    "resolutions": self.resolutions,
+                },
+                f,
+                indent=2,
+            )
+        print(f"✅ H3 pyramid saved to: {path}")
+
+    @classmethod
+    def load(cls, path: str | Path) -> "H3Pyramid":
+        path = Path(path)
+        meta_path = path / "meta.json"
+        if not meta_path.exists():
+            raise FileNotFoundError(f"H3 pyramid not found at {path}")
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        levels = {
+            res: pd.read_parquet(path / f"res_{res}.parquet").set_index(
+                "h3_index"
+            )
+            for res in meta["resolutions"]
+        }
+        return cls(levels, meta["value_cols"])
@@ -0,0 +1,266 @@
+"""
+Region-wide scoring: polyfill the configured bbox into H3 cells and rank the
+biochar catalogue for every cell with the threshold engine.
+
+Cells are split into chunks and scored in a process pool; each worker keeps the
+catalogue and compiled rules in memory, and per-cell top-k rows are streamed to
+a CSV file as chunks finish.
+
+Usage:
+    python -m src.analysis.region \\
+        --biochars data/processed/Dataset_feedstock_ML.xlsx
+"""
+
+import argparse
+import os
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import h3
+import pandas as pd
+import yaml
+
+from src.analysis.thresholds import (
+    CompiledRules,
+    evaluate_soils_against_biochars,
+)
+from src.data.loader import load_data
+from src.utils.geospatial import (
+    get_soil_properties_for_cells,
+    get_soil_properties_from_h3,
+)
+
+RESULT_COLUMNS = [
+    "h3_index",
+    "rank",
+    "biochar_id",
+    "name",
+    "total_score",
+    "max_score",
+    "normalized_score",
+]
+
+# Per-process state, set once by _init_worker
+# so chunks don't re-pickle the catalogue
+_WORKER: Dict[str, Any] = {}
+
+
+def polyfill_bbox(bbox: Sequence[float], resolution: int) -> List[str]:
+    """
+    Return the H3 cells whose centers fall inside a [minx, miny, maxx, maxy]
+    bbox.
+    """
+    minx, miny, maxx, maxy = bbox
+    poly = h3.LatLngPoly(
+        [(miny, minx), (miny, maxx), (maxy, maxx), (maxy, minx)]
+    )
+    return sorted(h3.h3shape_to_cells(poly, resolution))
+
+
+def chunk_cells(
+    cells: Sequence[str], chunk_size: int
+) -> Iterator[Sequence[str]]:
+    """
+    Yield consecutive slices of at most chunk_size cells.
+    """
+    for start in range(0, len(cells), chunk_size):
+        yield cells[start:start + chunk_size]
+
+
+def table_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Convert a biochar or soil table to the dict records the threshold engine
+    reads (NaN -> None).
+    """
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _init_worker(
+    biochars: List[Dict[str, Any]],
+    top_k: int,
+    rules: Optional[CompiledRules],
+    soil_store: Optional[str],
+):
+    _WORKER["biochars"] = biochars
+    _WORKER["top_k"] = top_k
+    _WORKER["rules"] = rules
+    _WORKER["soil_store"] = soil_store
+
+
+def score_cells(
+    cells: Sequence[str],
+    biochars: List[Dict[str, Any]],
+    top_k: int = 10,
+    rules: Optional[CompiledRules] = None,
+    soil_store: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Rank biochars for each cell and return one row per (cell, rank). Soil
+    properties come from soil_store in one bulk lookup, or mock values without
+    one.
+    """
+    if soil_store is not None:
+        soils = table_records(get_soil_properties_for_cells(cells, soil_store))
+    else:
+        soils = [get_soil_properties_from_h3(c) for c in cells]
+    ranked = evaluate_soils_against_biochars(
+        soils, biochars, with_rationale=False, top_k=top_k, rules=rules
+    )
+    rows = [
+        (
+            cell,
+            rank,
+            r["biochar_id"],
+            r["name"],
+            r["total_score"],
+            r["max_score"],
+            r["normalized_score"],
+        )
+        for cell, results in zip(cells, ranked)
+        for rank, r in enumerate(results, start=1)
+    ]
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+def _score_chunk(cells: Sequence[str]) -> pd.DataFrame:
+    return score_cells(
+        cells,
+        _WORKER["biochars"],
+        _WORKER["top_k"],
+        _WORKER["rules"],
+        _WORKER["soil_store"],
+    )
+
+
+def score_region(
+    biochars: List[Dict[str, Any]],
+    bbox: Sequence[float],
+    resolution: int,
+    output_path: str | Path,
+    workers: Optional[int] = None,
+    chunk_size: int = 2000,
+    top_k: int = 10,
+    rules: Optional[CompiledRules] = None,
+    soil_store: Optional[str] = None,
+) -> int:
+    """
+    Score every H3 cell in bbox and stream per-cell top-k rows to output_path
+    (CSV).
+
+    workers: process count (None/0 = all cores, 1 = run in this process).
+    soil_store: path of a SoilPropertyStore (each worker memory-maps it); mock
+                soils if None.
+    Returns the number of cells scored.
+    """
+    cells = polyfill_bbox(bbox, resolution)
+    chunks = chunk_cells(cells, chunk_size)
+    workers = workers or os.cpu_count() or 1
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    print(
+        f"Scoring {len(cells)} H3 cells (res {resolution}) with {workers} "
+        f"worker(s), chunk size {chunk_size}."
+    )
+
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        pd.DataFrame(columns=RESULT_COLUMNS).to_csv(f, index=False)
+        if workers == 1:
+            for chunk in chunks:
+                score_cells(chunk, biochars, top_k, rules, soil_store).to_csv(
+                    f, header=False, index=False
+                )
+        else:
+            with Pool(
+                workers,
+                initializer=_init_worker,
+                initargs=(biochars, top_k, rules, soil_store),
+            ) as pool:
+                for frame in pool.imap(_score_chunk, chunks):
+                    frame.to_csv(f, header=False, index=False)
+
+    print(f"✅ Region scores saved to: {output_path}")
+    return len(cells)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Score every H3 cell of the configured region"
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default="configs/default.yaml",
+        help="Path to configuration YAML file",
+    )
+    parser.add_argument(
+        "--biochars",
+        type=str,
+        required=True,
+        help="Biochar catalogue (CSV/Excel)",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Output CSV (default: <tables_dir>/region_scores.csv)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: pipeline.workers)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="H3 cells per task (default: pipeline.chunk_size)",
+    )
+    parser.add_argument(
+        "--top-k",
+        type=int,
+        default=None,
+        help="Biochars kept per cell (default: pipeline.top_k)",
+    )
+    parser.add_argument(
+        "--soil-store",
+        type=str,
+        default=None,
+        help="Soil property store (default: paths.soil_store)",
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    pipeline = config.get("pipeline", {})
+    output = (
+        args.output
+        or Path(config["paths"]["tables_dir"]) / "region_scores.csv"
+    )
+    soil_store = args.soil_store or config["paths"].get("soil_store")
+    if soil_store and not (Path(soil_store) / "meta.json").exists():
+        print(
+            f"Warning: soil property store not found at {soil_store}; using "
+            "mock soil values."
+        )
+        soil_store = None
+
+    score_region(
+        table_records(load_data(args.biochars)),
+        bbox=config["region"]["bbox"],
+        resolution=config["h3"]["resolution"],
+        output_path=output,
+        workers=(
+            args.workers
+            if args.workers is not None
+            else pipeline.get("workers")
+        ),
+        chunk_size=args.chunk_size or pipeline.get("chunk_size", 2000),
+        top_k=args.top_k or pipeline.get("top_k", 10),
+        soil_store=soil_store,
+    )
+
+
+if __name__ == "__main__":
+    main()
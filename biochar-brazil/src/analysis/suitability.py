@@ -1,22 +1,307 @@
 """
 Compute biochar application suitability based on soil and biomass properties.
+
+`WeightedSuitability` is the config-driven engine. Each scoring.weights
+feature is first turned into a 0-10 sub-score: numeric features through a
+linear or optimal-range curve, categorical ones (soil type, land cover)
+through a level table. The `scoring.weights` of one or more scenarios form a
+weight matrix, the sub-scores a float32 matrix, and all scenarios are scored
+with one matrix product, clamped to [clamp_min, clamp_max] and classed
+good/ok/poor by the `recommendation` thresholds.
 """
 
-def calculate_suitability(df):
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+import yaml
+
+DEFAULT_CONFIG_PATH = (
+    Path(__file__).resolve().parents[2] / "configs" / "default.yaml"
+)
+
+# scoring.weights key -> candidate input columns, first one present is used
+SCORING_FEATURES: Dict[str, Sequence[str]] = {
+    "soil_ph": ("pH",),
+    "soc": ("SOC", "organic_carbon"),
+    "moisture": ("moisture",),
+    "temp": ("temp",),
+    "soil_type": ("soil_type", "texture"),
+    "land_cover": ("land_cover",),
+}
+
+SUBSCORE_MAX = 10.0
+
+# Raw value -> 0..10 sub-score per feature
+# (override with scoring.features.<f>.subscore).
+#   linear:      0 at `lo`, 10 at `hi` (either direction), clipped
+#   range:       10 inside [min, max], falling to 0 at `span` outside
+#   categorical: `levels` table; `default` for unknown levels
+#   identity:    the value already is a 0..10 sub-score
+# Biochar pays off most on acidic, carbon-poor, coarse-textured cropland.
+FEATURE_SUBSCORES: Dict[str, Dict[str, Any]] = {
+    "soil_ph": {"type": "linear", "lo": 8.0, "hi": 5.0},
+    "soc": {"type": "linear", "lo": 5.0, "hi": 1.0},
+    "moisture": {"type": "range", "min": 20.0, "max": 60.0, "span": 20.0},
+    "temp": {"type": "range", "min": 15.0, "max": 30.0, "span": 10.0},
+    "soil_type": {
+        "type": "categorical",
+        "default": 5.0,
+        "levels": {
+            "sand": 10, "loamy sand": 9, "sandy loam": 8, "sandy clay loam": 7,
+            "loam": 6, "silt loam": 5, "sandy clay": 5, "silt": 4,
+            "clay loam": 4, "silty clay loam": 4, "silty clay": 3, "clay": 3,
+        },
+    },
+    "land_cover": {
+        "type": "categorical",
+        "default": 5.0,
+        # Names, or Copernicus 100m discrete_classification codes
+        "levels": {
+            "cropland": 10, "40": 10, "grassland": 8, "30": 8,
+            "shrubland": 6, "20": 6, "bare": 4, "60": 4, "100": 3,
+            "forest": 2, **{str(c): 2 for c in (111, 112, 113, 114, 115, 116,
+                                                121, 122, 123, 124, 125, 126)},
+            "urban": 0, "50": 0, "snow": 0, "70": 0, "water": 0, "80": 0,
+            "wetland": 0, "90": 0, "200": 0,
+        },
+    },
+}
+
+SUITABILITY_CLASSES = ["poor", "ok", "good"]
+
+
+def default_suitability(weights=None) -> "WeightedSuitability":
     """
-    Calculate suitability score for biochar application.
-    Weights can be adjusted in future versions or read from config.
+    WeightedSuitability from the default config, with weights (scoring.weights
+    keys) overriding the configured ones.
+    """
+    return WeightedSuitability.from_config(
+        scenarios=[weights] if weights else None
+    )
+
+
+def suitability_scores(df, weights=None, suitability=None) -> np.ndarray:
+    """
+    Weighted suitability per row as a float64 array, without touching df.
+    Scored by suitability (its first scenario), else by
+    default_suitability(weights). Features missing from df count as 0. The
+    product runs in float64, so a row scores the same in any chunking.
+    """
+    suitability = suitability or default_suitability(weights)
+    X = suitability.feature_matrix(df).astype(np.float64)
+    return suitability.score_matrix(X)[:, 0]
+
+
+def calculate_suitability(df, weights=None, suitability=None):
+    """
+    Calculate suitability score for biochar application, with the
+    config-driven engine (see suitability_scores for weights/suitability).
     """
     if df.empty:
         print("No data available for suitability calculation.")
         return df
 
-    # Weighted model: adjust based on domain knowledge
-    df["suitability_score"] = (
-        0.4 * df.get("pH", 0) +
-        0.3 * df.get("organic_carbon", 0) +
-        0.3 * df.get("moisture", 0)
-    )
+    df["suitability_score"] = suitability_scores(df, weights, suitability)
 
     print("Suitability analysis completed.")
     return df[["h3_index", "suitability_score"]]
+
+
+def _level_key(value: Any) -> Any:
+    """
+    Lookup key of a categorical value: trimmed lower-case text, integral
+    numbers as "40".
+    """
+    if pd.isna(value):
+        return None
+    if (
+        isinstance(value, (int, float, np.number))
+        and float(value).is_integer()
+    ):
+        return str(int(value))
+    return str(value).strip().lower()
+
+
+def subscores(
+    values: pd.Series, spec: Dict[str, Any], feature: str = ""
+) -> np.ndarray:
+    """
+    0..10 sub-scores (float64) of raw feature values under a FEATURE_SUBSCORES
+    spec. NaN stays NaN.
+    """
+    kind = spec.get("type", "identity")
+    if kind == "categorical":
+        levels = {_level_key(k): float(v) for k, v in spec["levels"].items()}
+        default = float(spec.get("default", np.nan))
+        keys = [_level_key(v) for v in values.tolist()]
+        return np.array(
+            [np.nan if k is None else levels.get(k, default) for k in keys],
+            dtype=np.float64,
+        )
+
+    if not (pd.api.types.is_numeric_dtype(values) or values.isna().all()):
+        raise ValueError(
+            f"Feature '{feature}' (column '{values.name}') is not numeric; "
+            f"give it a categorical subscore in scoring.features.{feature}"
+        )
+    v = values.to_numpy(dtype=np.float64)
+    if kind == "identity":
+        return v
+    if kind == "linear":
+        lo, hi = float(spec["lo"]), float(spec["hi"])
+        return np.clip((v - lo) / (hi - lo), 0.0, 1.0) * SUBSCORE_MAX
+    if kind == "range":
+        lo, hi, span = (
+            float(spec["min"]),
+            float(spec["max"]),
+            float(spec["span"]),
+        )
+        outside = np.maximum(np.maximum(lo - v, v - hi), 0.0)
+        return np.clip(1.0 - outside / span, 0.0, 1.0) * SUBSCORE_MAX
+    raise ValueError(f"Unknown subscore type '{kind}' for feature '{feature}'")
+
+
+class WeightedSuitability:
+    """
+    Weighted suitability over the scoring.weights features, for one or several
+    weight scenarios.
+
+    features:  feature names (weight keys), in weight-matrix column order
+    weights:   float32 (n_scenarios x n_features); features missing from a
+               scenario weigh 0
+    transform: per feature {column, scale, offset, subscore}; value * scale +
+               offset is mapped to a 0..10 sub-score (FEATURE_SUBSCORES unless
+               `subscore` is given), and the sub-score is what gets weighted
+    """
+
+    def __init__(
+        self,
+        weights: Dict[str, float] | List[Dict[str, float]],
+        clamp_min: float = 0.0,
+        clamp_max: float = 10.0,
+        good_threshold: float = 7.5,
+        ok_threshold: float = 6.0,
+        features: Dict[str, Dict[str, Any]] | None = None,
+    ):
+        scenarios = [weights] if isinstance(weights, dict) else list(weights)
+        if not scenarios:
+            raise ValueError("At least one weight scenario is required.")
+        self.features: List[str] = list(
+            dict.fromkeys(k for w in scenarios for k in w)
+        )
+        self.weights = np.array(
+            [[w.get(f, 0.0) for f in self.features] for w in scenarios],
+            dtype=np.float32,
+        )
+        self.clamp_min = float(clamp_min)
+        self.clamp_max = float(clamp_max)
+        self.good_threshold = float(good_threshold)
+        self.ok_threshold = float(ok_threshold)
+        self.transform = {
+            f: dict((features or {}).get(f, {})) for f in self.features
+        }
+        for f, spec in self.transform.items():
+            spec.setdefault(
+                "subscore", FEATURE_SUBSCORES.get(f, {"type": "identity"})
+            )
+
+    @classmethod
+    def from_config(
+        cls,
+        config: str | Path | Dict[str, Any] = DEFAULT_CONFIG_PATH,
+        scenarios: List[Dict[str, float]] | None = None,
+    ) -> "WeightedSuitability":
+        """
+        Build the engine from a config (path or loaded dict). Each scenario
+        overrides some of scoring.weights; without scenarios the config weights
+        are the only one.
+        """
+        if not isinstance(config, dict):
+            with open(config, "r", encoding="utf-8") as f:
+                config = yaml.safe_load(f)
+        scoring = config["scoring"]
+        recommendation = config.get("recommendation", {})
+        base = scoring["weights"]
+        return cls(
+            [{**base, **s} for s in scenarios] if scenarios else base,
+            clamp_min=scoring.get("clamp_min", 0.0),
+            clamp_max=scoring.get("clamp_max", 10.0),
+            good_threshold=recommendation.get("good_threshold", 7.5),
+            ok_threshold=recommendation.get("ok_threshold", 6.0),
+            features=scoring.get("features"),
+        )
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def _column(self, df: pd.DataFrame, feature: str) -> str | None:
+        spec = self.transform[feature]
+        candidates = (
+            [spec["column"]]
+            if "column" in spec
+            else SCORING_FEATURES.get(feature, (feature,))
+        )
+        return next((c for c in candidates if c in df.columns), None)
+
+    def feature_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        float32 (n_rows x n_features) matrix of 0..10 sub-scores.
+        Features absent from df are 0, like calculate_suitability.
+        """
+        X = np.zeros((len(df), len(self.features)), dtype=np.float32)
+        for j, feature in enumerate(self.features):
+            col = self._column(df, feature)
+            if col is None:
+                continue
+            spec = self.transform[feature]
+            values = df[col]
+            if spec["subscore"].get("type") != "categorical" and (
+                "scale" in spec or "offset" in spec
+            ):
+                values = values * spec.get("scale", 1.0) + spec.get(
+                    "offset", 0.0
+                )
+            X[:, j] = subscores(values, spec["subscore"], feature)
+        return X
+
+    def score_matrix(self, X: np.ndarray) -> np.ndarray:
+        """
+        Clamped scores (n_rows x n_scenarios) for a feature matrix. NaN
+        features give NaN scores.
+        """
+        scores = X @ self.weights.T
+        return np.clip(scores, self.clamp_min, self.clamp_max, out=scores)
+
+    def classify(self, scores: np.ndarray) -> np.ndarray:
+        """
+        Class codes into SUITABILITY_CLASSES (0 poor, 1 ok, 2 good); -1 for NaN
+        scores.
+        """
+        codes = (scores >= self.ok_threshold).astype(np.int8) + (
+            scores >= self.good_threshold
+        )
+        codes[np.isnan(scores)] = -1
+        return codes
+
+    def score(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Score a table. One scenario gives suitability_score / suitability_class
+        columns; several give suitability_score_<i> / suitability_class_<i> per
+        scenario. An h3_index column is carried over when present.
+        """
+        scores = self.score_matrix(self.feature_matrix(df))
+        codes = self.classify(scores)
+        out = (
+            {"h3_index": df["h3_index"].to_numpy()}
+            if "h3_index" in df.columns
+            else {}
+        )
+        for i in range(len(self)):
+            suffix = "" if len(self) == 1 else f"_{i}"
+            out[f"suitability_score{suffix}"] = scores[:, i]
+            out[f"suitability_class{suffix}"] = pd.Categorical.from_codes(
+                codes[:, i], categories=SUITABILITY_CLASSES
+            )
+        return pd.DataFrame(out, index=df.index)
@@ -0,0 +1,317 @@
+"""
+Scenario sweep: score every H3 cell of the region under a grid of
+`scoring.weights` and `thresholds` bundle overrides, for sensitivity analysis.
+
+Soil properties and the suitability feature matrix are built once. All weight
+scenarios are scored in one batched matrix product; each threshold scenario
+is compiled and run through the matrix engine, across a process pool if asked.
+Results go to one long Parquet table (scenario, h3_index, suitability_score,
+suitability_class[, best_biochar, best_score]) plus a JSON list of scenarios.
+
+Sweep spec (YAML), each key a list of values; scenarios are the full grid:
+    weights:
+      soc: [0.2, 0.3]
+    thresholds:
+      # <bundle>.<when|rules>.<prop or index>.<field>
+      acidic_soil.when.pH.value: [5.5, 6.0]
+
+Usage:
+    python -m src.analysis.sweep --sweep configs/sweep.yaml \\
+        --biochars data/processed/Dataset_feedstock_ML.xlsx
+"""
+
+import argparse
+import copy
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from src.analysis.region import polyfill_bbox
+from src.analysis.suitability import WeightedSuitability
+from src.analysis.thresholds import (
+    CompiledRules,
+    compile_bundles,
+    evaluate_matrix,
+)
+from src.data.loader import load_data
+from src.utils.geospatial import (
+    get_soil_properties_for_cells,
+    get_soil_properties_from_h3,
+    h3_cells_to_int,
+)
+
+# Per-process state for threshold scenarios, set once by _init_worker
+_WORKER: Dict[str, Any] = {}
+
+
+def expand_grid(grid: Optional[Dict[str, List[Any]]]) -> List[Dict[str, Any]]:
+    """
+    Cartesian product of a {key: [values]} grid as a list of {key: value} dicts
+    ([{}] for an empty grid).
+    """
+    grid = grid or {}
+    return [
+        dict(zip(grid, values)) for values in itertools.product(*grid.values())
+    ]
+
+
+def override_bundles(
+    bundles: Dict[str, Dict[str, Any]], overrides: Dict[str, Any]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Copy of bundles with overrides applied, keyed
+    "<bundle>.<when|rules>.<prop or index>.<field>".
+    A prop selector picks the first condition/rule on that property.
+    """
+    bundles = copy.deepcopy(bundles)
+    for path, value in overrides.items():
+        parts = path.split(".")
+        if len(parts) != 4 or parts[1] not in ("when", "rules"):
+            raise ValueError(
+                f"Invalid threshold override '{path}'; expected "
+                "<bundle>.<when|rules>.<prop or index>.<field>"
+            )
+        bundle, section, selector, field = parts
+        if bundle not in bundles:
+            raise KeyError(f"Unknown bundle '{bundle}' in override '{path}'")
+        entries = bundles[bundle][section]
+        if selector.isdigit():
+            entry = entries[int(selector)]
+        else:
+            entry = next((e for e in entries if e["prop"] == selector), None)
+            if entry is None:
+                raise KeyError(
+                    f"Bundle '{bundle}' has no {section} entry on "
+                    f"'{selector}' (override '{path}')"
+                )
+        entry[field] = value
+    return bundles
+
+
+def load_soils(
+    cells: List[str], soil_store: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Soil properties per cell (h3_index + property columns), from the store or
+    mock values.
+    """
+    if soil_store is not None:
+        return get_soil_properties_for_cells(cells, soil_store)
+    return pd.DataFrame(
+        [get_soil_properties_from_h3(c) for c in cells]
+    ).assign(h3_index=cells)
+
+
+def best_biochars(
+    soils: pd.DataFrame, biochars: pd.DataFrame, rules: CompiledRules
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-ranked biochar per soil (catalogue row index) and its normalized score.
+    Ranking and tie-breaking match evaluate_soil_against_biochars: highest
+    total_score, then normalized_score, then catalogue order. The argmax runs
+    once per distinct soil signature and is gathered per soil, so no
+    n_soils x n_biochars array is built.
+    """
+    scored = evaluate_matrix(soils, biochars, rules, expand=False)
+    total, norm = scored["total_score"], scored["normalized_score"]
+    top = total == total.max(axis=1, keepdims=True)
+    best = np.argmax(np.where(top, norm, -np.inf), axis=1)
+    best_norm = norm[np.arange(len(best)), best]
+    sig = scored["signature"]
+    return best[sig].astype(np.int32), best_norm[sig].astype(np.float32)
+
+
+def _init_worker(soils: pd.DataFrame, biochars: pd.DataFrame):
+    _WORKER["soils"] = soils
+    _WORKER["biochars"] = biochars
+
+
+def _threshold_scenario(rules: CompiledRules) -> Tuple[np.ndarray, np.ndarray]:
+    return best_biochars(_WORKER["soils"], _WORKER["biochars"], rules)
+
+
+def run_sweep(
+    soils: pd.DataFrame,
+    config: Dict[str, Any],
+    weight_grid: Optional[Dict[str, List[float]]] = None,
+    threshold_grid: Optional[Dict[str, List[Any]]] = None,
+    biochars: Optional[pd.DataFrame] = None,
+    workers: Optional[int] = None,
+) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Evaluate every (weights, thresholds) scenario of the grids against the
+    soils table.
+
+    Returns the scenario x cell table and the scenario list; scenario ids
+    number weight combinations fastest. Threshold scenarios (best biochar per
+    cell) are only run when a biochar catalogue is given.
+    workers: processes for threshold scenarios (None/0 = all cores, 1 = in this
+             process).
+    """
+    weight_scenarios = expand_grid(weight_grid)
+    threshold_scenarios = expand_grid(threshold_grid)
+    scenarios = [
+        {
+            "scenario": t * len(weight_scenarios) + w,
+            "weights": ws,
+            "thresholds": ts,
+        }
+        for t, ts in enumerate(threshold_scenarios)
+        for w, ws in enumerate(weight_scenarios)
+    ]
+
+    # Shared arrays: one feature matrix, all weight scenarios in one product
+    model = WeightedSuitability.from_config(config, scenarios=weight_scenarios)
+    scores = model.score_matrix(model.feature_matrix(soils))
+    classes = model.classify(scores)
+    cells = h3_cells_to_int(soils["h3_index"].to_numpy())
+    n_cells = len(cells)
+
+    best = None
+    if biochars is not None:
+        spec = config["thresholds"]
+        compiled = [
+            compile_bundles(
+                override_bundles(spec["bundles"], ts),
+                spec.get("points_per_rule", 2.0),
+                spec.get("total_points_target", 20.0),
+            )
+            for ts in threshold_scenarios
+        ]
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(compiled) == 1:
+            best = [
+                best_biochars(soils, biochars, rules) for rules in compiled
+            ]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(compiled)),
+                initializer=_init_worker,
+                initargs=(soils, biochars),
+            ) as pool:
+                best = list(pool.map(_threshold_scenario, compiled))
+
+    n_w = len(weight_scenarios)
+    table = {
+        "scenario": np.repeat(
+            np.arange(len(scenarios), dtype=np.int32), n_cells
+        ),
+        "h3_index": np.tile(cells, len(scenarios)),
+        "suitability_score": np.tile(
+            scores.T, (len(threshold_scenarios), 1)
+        ).reshape(-1),
+        "suitability_class": np.tile(
+            classes.T, (len(threshold_scenarios), 1)
+        ).reshape(-1),
+    }
+    if best is not None:
+        table["best_biochar"] = np.concatenate(
+            [
+                best[t][0]
+                for t in range(len(threshold_scenarios))
+                for _ in range(n_w)
+            ]
+        )
+        table["best_score"] = np.concatenate(
+            [
+                best[t][1]
+                for t in range(len(threshold_scenarios))
+                for _ in range(n_w)
+            ]
+        )
+    return pd.DataFrame(table), scenarios
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sweep scoring weights and threshold overrides over "
+        "the region"
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default="configs/default.yaml",
+        help="Path to configuration YAML file",
+    )
+    parser.add_argument(
+        "--sweep",
+        type=str,
+        required=True,
+        help="Sweep spec YAML (weights / thresholds grids)",
+    )
+    parser.add_argument(
+        "--biochars",
+        type=str,
+        default=None,
+        help="Biochar catalogue (CSV/Excel) for threshold scenarios",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Output Parquet (default: <tables_dir>/scenario_sweep.parquet)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: pipeline.workers)",
+    )
+    parser.add_argument(
+        "--soil-store",
+        type=str,
+        default=None,
+        help="Soil property store (default: paths.soil_store)",
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    with open(args.sweep, "r", encoding="utf-8") as f:
+        sweep = yaml.safe_load(f) or {}
+    soil_store = args.soil_store or config["paths"].get("soil_store")
+    if soil_store and not (Path(soil_store) / "meta.json").exists():
+        print(
+            f"Warning: soil property store not found at {soil_store}; using "
+            "mock soil values."
+        )
+        soil_store = None
+
+    cells = polyfill_bbox(config["region"]["bbox"], config["h3"]["resolution"])
+    table, scenarios = run_sweep(
+        load_soils(cells, soil_store),
+        config,
+        weight_grid=sweep.get("weights"),
+        threshold_grid=sweep.get("thresholds"),
+        biochars=load_data(args.biochars) if args.biochars else None,
+        workers=(
+            args.workers
+            if args.workers is not None
+            else config.get("pipeline", {}).get("workers")
+        ),
+    )
+
+    output = Path(
+        args.output
+        or Path(config["paths"]["tables_dir"]) / "scenario_sweep.parquet"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    table.to_parquet(output, index=False)
+    with open(
+        output.with_suffix(".scenarios.json"), "w", encoding="utf-8"
+    ) as f:
+        json.dump(scenarios, f, indent=2)
+    print(
+        f"✅ {len(scenarios)} scenarios x {len(cells)} cells saved to: {output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,94 +3,270 @@ Threshold engine (cumulative scoring)
 - Robust to missing values
 - Cumulative points out of 20 (configurable)
 - Returns total_score, max_score, normalized_score and rationale
+- Batch mode (evaluate_matrix) scores a soil table against a biochar table
+  with NumPy
+- Rule bundles are declared in configs/default.yaml (thresholds.bundles) and
+  compiled once at import into flat arrays (see CompiledRules)
 """
 
-from typing import Dict, List, Any, Tuple
-
-# ----- Scoring scale (you can move this to configs/config.yaml later) -----
-POINTS_PER_RULE = 2.0       # each rule can add up to 2 points
-TOTAL_POINTS_TARGET = 20.0  # overall feel; not hard-capped (we also return max_score)
-
-# ----- Rule bundles (same logic as before, trimmed to the essentials) -----
-BUNDLES: Dict[str, Dict[str, Any]] = {
-    "moisture_low": {
-        "criteria": lambda s: s.get("moisture", 0) > 0 and s["moisture"] < 65,
-        "rules": [
-            {"prop": "fixed_carbon",    "type": "range", "min": 60, "max": 85, "w": 2, "msg": "FC 60–85%"},
-            {"prop": "volatile_matter", "type": "max",   "max": 20,              "w": 2, "msg": "VM < 20%"},
-            {"prop": "ash",             "type": "max",   "max": 20,              "w": 1, "msg": "Ash < 20%"},
-            {"prop": "pH",              "type": "range", "min": 7.0, "max": 9.5, "w": 1, "msg": "Biochar pH 7–9.5"},
-        ],
-    },
-    "moisture_high": {
-        "criteria": lambda s: s.get("moisture", 0) >= 65,
-        "rules": [
-            {"prop": "fixed_carbon",    "type": "max", "max": 50,               "w": 1, "msg": "FC < 50%"},
-            {"prop": "volatile_matter", "type": "min", "min": 30,               "w": 1, "msg": "VM > 30%"},
-            {"prop": "ash",             "type": "min", "min": 40,               "w": 2, "msg": "Ash > 40%"},
-            {"prop": "pH",              "type": "min", "min": 10,               "w": 2, "msg": "Biochar pH > 10"},
-        ],
-    },
-    "acidic_soil": {
-        "criteria": lambda s: s.get("pH", 7) < 6.0,
-        "rules": [
-            {"prop": "ash",         "type": "min",   "min": 25,              "w": 2, "msg": "Ash > 25% (liming)"},
-            {"prop": "c_pct",       "type": "min",   "min": 50,              "w": 1, "msg": "C% > 50%"},
-            {"prop": "h_pct",       "type": "max",   "max": 2.4,             "w": 1, "msg": "H% < 2.4%"},
-            {"prop": "bet",         "type": "min",   "min": 200,             "w": 2, "msg": "BET > 200 m²/g"},
-            {"prop": "pore_volume", "type": "min",   "min": 1.0,             "w": 1, "msg": "PV > 1.0 cm³/g"},
-            {"prop": "pH",          "type": "min",   "min": 7.0,             "w": 2, "msg": "Biochar pH > 7"},
-        ],
-    },
-    "basic_soil": {
-        "criteria": lambda s: s.get("pH", 7) > 7.0,
-        "rules": [
-            {"prop": "ash",         "type": "max", "max": 10,               "w": 2, "msg": "Ash < 10%"},
-            {"prop": "c_pct",       "type": "min", "min": 50,               "w": 1, "msg": "C% > 50%"},
-            {"prop": "h_pct",       "type": "min", "min": 6,                "w": 1, "msg": "H% > 6%"},
-            {"prop": "bet",         "type": "min", "min": 200,              "w": 2, "msg": "BET > 200 m²/g"},
-            {"prop": "pore_volume", "type": "min", "min": 1.0,              "w": 1, "msg": "PV > 1.0 cm³/g"},
-            {"prop": "pH",          "type": "max", "max": 6,                "w": 2, "msg": "Biochar pH < 6"},
-        ],
-    },
-    "soc_too_high": {  # hard blocker
-        "criteria": lambda s: s.get("SOC", 0) > 5,
-        "rules": [
-            {"prop": "fixed_carbon", "type": "max", "max": 1000, "w": 999, "critical": True, "msg": "SOC > 5% → do not apply"},
-        ],
-    },
-    "soc_low": {
-        "criteria": lambda s: s.get("SOC", 100) < 2.6,
-        "rules": [
-            {"prop": "volatile_matter", "type": "max",   "max": 15,             "w": 2, "msg": "VM < 15% (stability)"},
-            {"prop": "ash",             "type": "range", "min": 20, "max": 30,  "w": 1, "msg": "Ash 20–30%"},
-            {"prop": "c_pct",           "type": "min",   "min": 60,             "w": 2, "msg": "C% > 60%"},
-            {"prop": "h_pct",           "type": "max",   "max": 6,              "w": 1, "msg": "H% ≤ 6%"},
-            {"prop": "o_pct",           "type": "range", "min": 10, "max": 30,  "w": 1, "msg": "O% 10–30%"},
-            {"prop": "o_c_ratio",       "type": "max",   "max": 0.4,            "w": 2, "msg": "O/C < 0.4"},
-            {"prop": "pH",              "type": "max",   "max": 10,             "w": 1, "msg": "Biochar pH < 10"},
-        ],
-    },
-    "saline_warning": {
-        "criteria": lambda s: s.get("EC", 0) >= 4,
-        "rules": [
-            {"prop": "ash", "type": "max", "max": 20, "w": 2, "msg": "Ash < 20% (salinity)"},
-            {"prop": "pH",  "type": "max", "max": 9.5,"w": 2, "msg": "Biochar pH < 9.5 (salinity)"},
-        ],
-    },
-    "warm_climate": {
-        "criteria": lambda s: s.get("temp", 0) >= 25,
-        "rules": [
-            {"prop": "ash",     "type": "min", "min": 3.07, "w": 1, "msg": "Ash > 3.07%"},
-            {"prop": "moisture","type": "min", "min": 0.78, "w": 1, "msg": "Char moisture > 0.78%"},
-            {"prop": "c_pct",   "type": "min", "min": 60,   "w": 1, "msg": "C% > 60%"},
-            {"prop": "bet",     "type": "max", "max": 265,  "w": 1, "msg": "BET < 265 m²/g"},
-        ],
-    },
+import hashlib
+import heapq
+import json
+import math
+import operator
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+
+DEFAULT_CONFIG_PATH = (
+    Path(__file__).resolve().parents[2] / "configs" / "default.yaml"
+)
+
+# Rule type codes used in the compiled arrays
+RULE_MIN, RULE_MAX, RULE_RANGE = 0, 1, 2
+RULE_TYPES = {"min": RULE_MIN, "max": RULE_MAX, "range": RULE_RANGE}
+
+# Comparison operators allowed in bundle `when` conditions
+# (work on scalars and arrays)
+CONDITION_OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
 }
 
+
+class CompiledRules:
+    """
+    Bundle spec compiled into flat arrays, one entry per rule / condition.
+
+    Rules:      rule_prop (index into props), rule_type (RULE_* code), rule_lo,
+                rule_hi, rule_weight, rule_critical, rule_bundle
+    Conditions: cond_prop (index into soil_props), cond_op, cond_value,
+                cond_default, cond_bundle
+    version:    hash of the spec, for keying cached scoring results
+    """
+
+    def __init__(
+        self,
+        bundles: Dict[str, Dict[str, Any]],
+        points_per_rule: float = 2.0,
+        total_points_target: float = 20.0,
+    ):
+        self.bundles = bundles
+        self.points_per_rule = float(points_per_rule)
+        self.total_points_target = float(total_points_target)
+        self.bundle_keys: List[str] = list(bundles.keys())
+        self.props: List[str] = []
+        self.soil_props: List[str] = []
+
+        rules, conds = [], []
+        bundle_rules: List[Tuple[int, ...]] = []
+        for b, key in enumerate(self.bundle_keys):
+            spec = bundles[key]
+            for c in spec.get("when", []):
+                if c["op"] not in CONDITION_OPS:
+                    raise ValueError(
+                        f"Bundle '{key}': unsupported condition operator "
+                        f"{c['op']!r}"
+                    )
+                conds.append(
+                    (
+                        b,
+                        self._index(self.soil_props, c["prop"]),
+                        c["op"],
+                        float(c["value"]),
+                        float(c.get("default", np.nan)),
+                    )
+                )
+            first = len(rules)
+            for r in spec["rules"]:
+                if r["type"] not in RULE_TYPES:
+                    raise ValueError(
+                        f"Bundle '{key}': unsupported rule type {r['type']!r}"
+                    )
+                rules.append((
+                    b,
+                    self._index(self.props, r["prop"]),
+                    RULE_TYPES[r["type"]],
+                    float(r.get("min", np.nan)),
+                    float(r.get("max", np.nan)),
+                    float(r.get("w", 1.0)),
+                    bool(r.get("critical", False)),
+                    r.get("msg", r["prop"]),
+                ))
+            bundle_rules.append(tuple(range(first, len(rules))))
+
+        self.rule_bundle = np.array([r[0] for r in rules], dtype=np.int16)
+        self.rule_prop = np.array([r[1] for r in rules], dtype=np.int16)
+        self.rule_type = np.array([r[2] for r in rules], dtype=np.uint8)
+        self.rule_lo = np.array([r[3] for r in rules], dtype=float)
+        self.rule_hi = np.array([r[4] for r in rules], dtype=float)
+        self.rule_weight = np.array([r[5] for r in rules], dtype=float)
+        self.rule_critical = np.array([r[6] for r in rules], dtype=bool)
+        self.rule_msg: List[str] = [r[7] for r in rules]
+
+        self.cond_bundle = np.array([c[0] for c in conds], dtype=np.int16)
+        self.cond_prop = np.array([c[1] for c in conds], dtype=np.int16)
+        self.cond_op: List[str] = [c[2] for c in conds]
+        self.cond_value = np.array([c[3] for c in conds], dtype=float)
+        self.cond_default = np.array([c[4] for c in conds], dtype=float)
+
+        # Plain-Python mirrors for the per-pair path
+        # (NumPy scalars are slow in loops)
+        self._rules = [
+            (self.props[r[1]], r[2], r[3], r[4], r[5], r[6]) for r in rules
+        ]
+        self._bundle_rules = bundle_rules
+        self._bundle_conds = [
+            [
+                (self.soil_props[c[1]], CONDITION_OPS[c[2]], c[3], c[4])
+                for c in conds
+                if c[0] == b
+            ]
+            for b in range(len(self.bundle_keys))
+        ]
+        self._rule_sets: Dict[
+            Tuple[str, ...], Tuple[Tuple[int, ...], float, Tuple[int, ...]]
+        ] = {}
+
+        spec = json.dumps(
+            {"points_per_rule": self.points_per_rule, "bundles": bundles},
+            sort_keys=True,
+            ensure_ascii=True,
+        )
+        self.version = hashlib.sha256(spec.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _index(names: List[str], name: str) -> int:
+        if name not in names:
+            names.append(name)
+        return names.index(name)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def signature(self, soil: Dict[str, Any]) -> Tuple[str, ...]:
+        active = []
+        for key, conds in zip(self.bundle_keys, self._bundle_conds):
+            ok = True
+            for prop, op, value, default in conds:
+                v = soil.get(prop)
+                if not op(default if _is_missing(v) else v, value):
+                    ok = False
+                    break
+            if ok:
+                active.append(key)
+        return tuple(active)
+
+    def signature_matrix(
+        self, soils: pd.DataFrame | Dict[str, np.ndarray]
+    ) -> np.ndarray:
+        """
+        Boolean (n_soils, n_bundles) activation matrix in bundle_keys order.
+        soils: DataFrame, or a dict of property -> float array; NaN takes the
+               condition's default.
+        """
+        if isinstance(soils, dict):
+            columns = {
+                prop: soils[prop] for prop in self.soil_props if prop in soils
+            }
+            n = len(next(iter(soils.values()))) if soils else 0
+        else:
+            columns = {
+                prop: pd.to_numeric(soils[prop], errors="coerce").to_numpy(
+                    dtype=float
+                )
+                for prop in self.soil_props
+                if prop in soils.columns
+            }
+            n = len(soils)
+        active = np.ones((n, len(self.bundle_keys)), dtype=bool)
+        for b, p, op, value, default in zip(
+            self.cond_bundle,
+            self.cond_prop,
+            self.cond_op,
+            self.cond_value,
+            self.cond_default,
+        ):
+            prop = self.soil_props[p]
+            values = (
+                np.where(np.isnan(columns[prop]), default, columns[prop])
+                if prop in columns
+                else np.full(n, default)
+            )
+            with np.errstate(invalid="ignore"):
+                active[:, b] &= CONDITION_OPS[op](values, value)
+        return active
+
+    def rule_set(
+        self, signature: Tuple[str, ...]
+    ) -> Tuple[Tuple[int, ...], float, Tuple[int, ...]]:
+        """
+        Rule indices, max points and critical rule indices for a signature.
+        Cached, so a region pays for this once per distinct signature rather
+        than per cell.
+        """
+        cached = self._rule_sets.get(signature)
+        if cached is None:
+            idx = tuple(
+                i
+                for key in signature
+                for i in self._bundle_rules[self.bundle_keys.index(key)]
+            )
+            max_pts = 0.0
+            for i in idx:
+                max_pts += self._rules[i][4] * self.points_per_rule
+            critical = tuple(i for i in idx if self._rules[i][5])
+            cached = self._rule_sets[signature] = (idx, max_pts, critical)
+        return cached
+
+
+def compile_bundles(
+    bundles: Dict[str, Dict[str, Any]],
+    points_per_rule: float = 2.0,
+    total_points_target: float = 20.0,
+) -> CompiledRules:
+    return CompiledRules(bundles, points_per_rule, total_points_target)
+
+
+def load_rules(config_path: str | Path = DEFAULT_CONFIG_PATH) -> CompiledRules:
+    """
+    Load and compile the `thresholds` block of a YAML config.
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        spec = yaml.safe_load(f)["thresholds"]
+    return compile_bundles(
+        spec["bundles"],
+        points_per_rule=spec.get("points_per_rule", 2.0),
+        total_points_target=spec.get("total_points_target", 20.0),
+    )
+
+
+# ----- Compiled once at import from configs/default.yaml -----
+RULES = load_rules()
+BUNDLES: Dict[str, Dict[str, Any]] = RULES.bundles
+POINTS_PER_RULE = RULES.points_per_rule  # each rule can add up to 2 points
+# overall feel; not hard-capped (we also return max_score)
+TOTAL_POINTS_TARGET = RULES.total_points_target
+
 # ----- helpers --------------------------------------------------------------
 
+
+def _is_missing(v: Any) -> bool:
+    """
+    The one missing-value rule of both engines: None, pd.NA and float or
+    numpy-float NaN are missing. Missing soil values take the condition
+    default; missing biochar values score 0.5.
+    """
+    return v is None or v is pd.NA or (
+        isinstance(v, (float, np.floating)) and math.isnan(v)
+    )
+
+
 def _score_min(v: float, m: float) -> float:
     if v is None: return 0.5
     return 1.0 if v >= m else max(0.0, v / m)
@@ -106,38 +282,86 @@ def _score_range(v: float, a: float, b: float) -> float:
     tol = max(0.1 * (b - a), 1e-6)
     return max(0.0, 1 - d / tol)
 
-def _score_rule(value: Any, rule: Dict[str, Any]) -> float:
-    t = rule["type"]
-    if t == "min":   return _score_min(value, rule["min"])
-    if t == "max":   return _score_max(value, rule["max"])
-    if t == "range": return _score_range(value, rule["min"], rule["max"])
+
+def _score_rule(value: Any, rule_type: int, lo: float, hi: float) -> float:
+    if _is_missing(value):
+        value = None
+    if rule_type == RULE_MIN:   return _score_min(value, lo)
+    if rule_type == RULE_MAX:   return _score_max(value, hi)
+    if rule_type == RULE_RANGE: return _score_range(value, lo, hi)
     return 0.0
 
-def _select_bundles(soil: Dict[str, Any]) -> List[str]:
-    return [k for k, b in BUNDLES.items() if b["criteria"](soil)]
 
-def evaluate_one(bio: Dict[str, Any], soil: Dict[str, Any]) -> Dict[str, Any]:
-    active = _select_bundles(soil)
-    total_pts, max_pts = 0.0, 0.0
-    rationale: List[str] = []
+def soil_signature(
+    soil: Dict[str, Any], rules: Optional[CompiledRules] = None
+) -> Tuple[str, ...]:
+    """
+    Bundle-activation signature: which bundle criteria the soil crosses.
+    Soils with the same signature get identical scores for every biochar.
+    """
+    return (rules or RULES).signature(soil)
+
+
+def _select_bundles(
+    soil: Dict[str, Any], rules: Optional[CompiledRules] = None
+) -> List[str]:
+    return list(soil_signature(soil, rules))
+
+
+def _rule_message(
+    rules: CompiledRules, i: int, val: Any, s01: float, pts: float
+) -> str:
+    prop, _, _, _, _, critical = rules._rules[i]
+    if critical and s01 < 0.8:
+        return f"⚠ {rules.rule_msg[i]} (critical) → 0 pts"
+    shown = "None" if _is_missing(val) else f"{val}"
+    return f"{rules.rule_msg[i]}: {prop}={shown} → +{pts:.2f} pts"
+
+
+def build_rationale(
+    bio: Dict[str, Any],
+    active: List[str],
+    rules: Optional[CompiledRules] = None,
+) -> List[str]:
+    """
+    Expand the rationale text for a biochar against a set of active bundles.
+    Lets callers score with with_rationale=False and only format the rows they
+    keep.
+    """
+    rules = rules or RULES
+    messages: List[str] = []
+    for i in rules.rule_set(tuple(active))[0]:
+        prop, rule_type, lo, hi, w, _ = rules._rules[i]
+        val = bio.get(prop)
+        s01 = _score_rule(val, rule_type, lo, hi)
+        pts = s01 * w * rules.points_per_rule
+        messages.append(_rule_message(rules, i, val, s01, pts))
+    return messages
+
+
+def _evaluate_active(
+    bio: Dict[str, Any],
+    active: List[str],
+    with_rationale: bool = True,
+    rules: Optional[CompiledRules] = None,
+) -> Dict[str, Any]:
+    rules = rules or RULES
+    idx, max_pts, _ = rules.rule_set(tuple(active))
+    points_per_rule = rules.points_per_rule
+    total_pts = 0.0
     hard_fail = False
 
-    for key in active:
-        for r in BUNDLES[key]["rules"]:
-            w = float(r.get("w", 1.0))
-            max_pts += w * POINTS_PER_RULE
+    for i in idx:
+        prop, rule_type, lo, hi, w, critical = rules._rules[i]
+        s01 = _score_rule(bio.get(prop), rule_type, lo, hi)   # 0..1
+        pts = s01 * w * points_per_rule                       # 0..(w*2)
 
-            val = bio.get(r["prop"])
-            s01 = _score_rule(val, r)            # 0..1
-            pts = s01 * w * POINTS_PER_RULE      # 0..(w*2)
+        if critical and s01 < 0.8:
+            hard_fail = True
+        else:
+            total_pts += pts
 
-            if r.get("critical") and s01 < 0.8:
-                hard_fail = True
-                rationale.append(f"⚠ {r['msg']} (critical) → 0 pts")
-            else:
-                shown = "None" if val is None else f"{val}"
-                rationale.append(f"{r['msg']}: {r['prop']}={shown} → +{pts:.2f} pts")
-                total_pts += pts
+    rationale = build_rationale(bio, active, rules) if with_rationale else None
 
     if hard_fail:
         return {
@@ -161,6 +385,294 @@ def evaluate_one(bio: Dict[str, Any], soil: Dict[str, Any]) -> Dict[str, Any]:
         "messages": rationale,
     }
 
-def evaluate_soil_against_biochars(soil: Dict[str, Any], biochars: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    results = [evaluate_one(b, soil) for b in biochars]
-    return sorted(results, key=lambda x: (x["total_score"], x["normalized_score"]), reverse=True)
+
+def evaluate_one(
+    bio: Dict[str, Any],
+    soil: Dict[str, Any],
+    with_rationale: bool = True,
+    rules: Optional[CompiledRules] = None,
+) -> Dict[str, Any]:
+    """
+    Score one biochar against one soil.
+    With with_rationale=False no strings are built and "messages" is None;
+    use build_rationale(bio, result["active"]) to expand it later.
+    """
+    return _evaluate_active(
+        bio, _select_bundles(soil, rules), with_rationale, rules
+    )
+
+
+def _is_blocked(
+    bio: Dict[str, Any], critical: Tuple[int, ...], rules: CompiledRules
+) -> bool:
+    for i in critical:
+        prop, rule_type, lo, hi, _, _ = rules._rules[i]
+        if _score_rule(bio.get(prop), rule_type, lo, hi) < 0.8:
+            return True
+    return False
+
+
+def _rank_key(result: Dict[str, Any]) -> Tuple[float, float]:
+    return result["total_score"], result["normalized_score"]
+
+
+def evaluate_soil_against_biochars(
+    soil: Dict[str, Any],
+    biochars: List[Dict[str, Any]],
+    with_rationale: bool = True,
+    top_k: Optional[int] = None,
+    skip_blocked: bool = False,
+    rules: Optional[CompiledRules] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Rank biochars for one soil by (total_score, normalized_score), best first.
+
+    top_k: keep only the best k, selected with a heap instead of a full sort
+           (same order and tie-breaking as the full sort).
+    skip_blocked: drop biochars that fail a critical rule (e.g. soc_too_high)
+                  before scoring the rest of their rules.
+    """
+    return _rank_active(
+        _select_bundles(soil, rules),
+        biochars,
+        with_rationale,
+        top_k,
+        skip_blocked,
+        rules,
+    )
+
+
+def evaluate_soils_against_biochars(
+    soils: List[Dict[str, Any]],
+    biochars: List[Dict[str, Any]],
+    with_rationale: bool = True,
+    top_k: Optional[int] = None,
+    skip_blocked: bool = False,
+    rules: Optional[CompiledRules] = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Rank biochars for many soils (e.g. every H3 cell of a region).
+    Biochars are scored once per distinct soil_signature; soils that share a
+    signature share the same ranked list object.
+    """
+    ranked: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    out = []
+    for soil in soils:
+        sig = soil_signature(soil, rules)
+        if sig not in ranked:
+            ranked[sig] = _rank_active(
+                list(sig), biochars, with_rationale, top_k, skip_blocked, rules
+            )
+        out.append(ranked[sig])
+    return out
+
+
+def _rank_active(
+    active: List[str],
+    biochars: List[Dict[str, Any]],
+    with_rationale: bool,
+    top_k: Optional[int],
+    skip_blocked: bool,
+    rules: Optional[CompiledRules] = None,
+) -> List[Dict[str, Any]]:
+    rules = rules or RULES
+    candidates = biochars
+    if skip_blocked:
+        critical = rules.rule_set(tuple(active))[2]
+        if critical:
+            candidates = (
+                b for b in biochars if not _is_blocked(b, critical, rules)
+            )
+
+    if top_k is None:
+        results = [
+            _evaluate_active(b, active, with_rationale, rules)
+            for b in candidates
+        ]
+        return sorted(results, key=_rank_key, reverse=True)
+
+    # Score without text, then format rationale only for the k survivors.
+    scored = (
+        (_evaluate_active(b, active, False, rules), b) for b in candidates
+    )
+    best = heapq.nlargest(top_k, scored, key=lambda pair: _rank_key(pair[0]))
+    if with_rationale:
+        for result, bio in best:
+            result["messages"] = build_rationale(bio, active, rules)
+    return [result for result, _ in best]
+
+
+# ----- batch engine ---------------------------------------------------------
+
+def _score_rules_array(values: np.ndarray, rules: CompiledRules) -> np.ndarray:
+    """
+    Vectorized _score_rule for every compiled rule at once.
+    values: (n_rules, n_biochars) property values; NaN plays the role of None
+            (0.5 points).
+    """
+    t = rules.rule_type[:, None]
+    lo, hi = rules.rule_lo[:, None], rules.rule_hi[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s_min = np.where(values >= lo, 1.0, np.maximum(0.0, values / lo))
+        s_max = np.where(
+            values <= hi,
+            1.0,
+            np.maximum(0.0, 1 - (values - hi) / np.maximum(hi, 1e-9)),
+        )
+        d = np.minimum(np.abs(values - lo), np.abs(values - hi))
+        tol = np.maximum(0.1 * (hi - lo), 1e-6)
+        s_range = np.where(
+            (lo <= values) & (values <= hi), 1.0, np.maximum(0.0, 1 - d / tol)
+        )
+    s = np.select(
+        [t == RULE_MIN, t == RULE_MAX, t == RULE_RANGE],
+        [s_min, s_max, s_range],
+        0.0,
+    )
+    return np.where(np.isnan(values), 0.5, s)
+
+
+def _round_like_python(a: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    np.round, with exact-half cases re-rounded by round() so results match
+    evaluate_one.
+    """
+    out = np.round(a, ndigits)
+    scaled = a * 10.0 ** ndigits
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_half.any():
+        out[near_half] = [round(float(v), ndigits) for v in a[near_half]]
+    return out
+
+
+def _as_table(rows: Any) -> pd.DataFrame:
+    return rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+
+
+def biochar_matrix(
+    biochars: Any, rules: Optional[CompiledRules] = None
+) -> np.ndarray:
+    """(n_props, n_biochars) float matrix of the properties rules read."""
+    rules, biochars = rules or RULES, _as_table(biochars)
+    values = np.full((len(rules.props), len(biochars)), np.nan)
+    for p, prop in enumerate(rules.props):
+        if prop in biochars.columns:
+            values[p] = pd.to_numeric(
+                biochars[prop], errors="coerce"
+            ).to_numpy(dtype=float)
+    return values
+
+
+def prepare_biochars(
+    biochars: Any, rules: Optional[CompiledRules] = None
+) -> Dict[str, Any]:
+    """
+    Soil-independent part of evaluate_matrix: per-rule points (n_rules,
+    n_biochars) and critical failures of a catalogue. Pass it to
+    evaluate_matrix as `prepared` to score many soil batches against the same
+    catalogue without redoing it.
+    """
+    rules, biochars = rules or RULES, _as_table(biochars)
+    n_bio = len(biochars)
+    s01 = _score_rules_array(
+        biochar_matrix(biochars, rules)[rules.rule_prop], rules
+    )
+    pts = s01 * rules.rule_weight[:, None] * rules.points_per_rule
+    failed = rules.rule_critical[:, None] & (s01 < 0.8)
+
+    def _column(name: str) -> np.ndarray:
+        if name in biochars.columns:
+            return biochars[name].to_numpy(dtype=object)
+        return np.full(n_bio, None, dtype=object)
+
+    return {
+        "pts": np.where(failed, 0.0, pts),
+        "failed": failed,
+        "biochar_id": _column("id"),
+        "name": _column("name"),
+        "rules_version": rules.version,
+    }
+
+
+def evaluate_matrix(
+    soils: Any,
+    biochars: Any,
+    rules: Optional[CompiledRules] = None,
+    prepared: Optional[Dict[str, Any]] = None,
+    expand: bool = True,
+) -> Dict[str, np.ndarray]:
+    """
+    Score every soil against every biochar in one vectorized pass. Rules are
+    scored once per distinct bundle-activation signature, not per soil.
+
+    soils / biochars: DataFrames (or lists of dicts) with the same keys
+                      evaluate_one reads; soils may also be a dict of
+                      property -> float array. NaN cells are treated like
+                      missing keys.
+    prepared: prepare_biochars(biochars, rules) output to reuse (biochars is
+              then ignored).
+    expand: False keeps one score row per signature (n_soils becomes
+            n_signatures below); index them with signature to get a soil's
+            row.
+
+    Returns a dict of arrays:
+    - total_score, normalized_score, hard_fail: shape (n_soils, n_biochars)
+    - max_score: shape (n_soils,)
+    - active: (n_soils, n_bundles) bool, bundle_keys: bundle order
+    - signature: (n_soils,) id of the soil's distinct activation pattern
+    - biochar_id, name: shape (n_biochars,)
+    - rules_version: version hash of the compiled rules used
+    Scores equal evaluate_one(bio, soil) for each pair.
+    """
+    rules = rules or RULES
+    if prepared is None:
+        prepared = prepare_biochars(biochars, rules)
+    elif prepared["rules_version"] != rules.version:
+        raise ValueError("prepared biochars were compiled for different rules")
+    pts, failed = prepared["pts"], prepared["failed"]
+    n_bio = pts.shape[1]
+
+    # Score once per distinct activation signature, then gather rows per soil.
+    active = rules.signature_matrix(
+        soils if isinstance(soils, dict) else _as_table(soils)
+    )
+    signatures, inverse = np.unique(active, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    n_sigs = len(signatures)
+
+    total = np.zeros((n_sigs, n_bio))
+    max_pts = np.zeros(n_sigs)
+    hard_fail = np.zeros((n_sigs, n_bio), dtype=bool)
+    for g, mask in enumerate(signatures):
+        idx, max_pts[g], critical = rules.rule_set(
+            tuple(k for k, on in zip(rules.bundle_keys, mask) if on)
+        )
+        if idx:
+            # cumsum adds rows strictly in order,
+            # so sums match evaluate_one bit for bit
+            total[g] = np.cumsum(pts[list(idx)], axis=0)[-1]
+        if critical:
+            hard_fail[g] = failed[list(critical)].any(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        norm = np.where(max_pts[:, None] > 0, total / max_pts[:, None], 0.0)
+
+    total = np.where(hard_fail, 0.0, _round_like_python(total, 2))
+    norm = np.where(hard_fail, 0.0, _round_like_python(norm, 3))
+
+    max_pts = _round_like_python(max_pts, 2)
+    if expand:
+        total, max_pts = total[inverse], max_pts[inverse]
+        norm, hard_fail = norm[inverse], hard_fail[inverse]
+    return {
+        "biochar_id": prepared["biochar_id"],
+        "name": prepared["name"],
+        "total_score": total,
+        "max_score": max_pts,
+        "normalized_score": norm,
+        "hard_fail": hard_fail,
+        "active": active,
+        "signature": inverse,
+        "bundle_keys": list(rules.bundle_keys),
+        "rules_version": rules.version,
+    }
@@ -8,7 +8,7 @@ import logging.config
 from pathlib import Path
 
 from src.data.loader import load_biochar_dataset
-from src.analysis.suitability import calculate_suitability
+from src.analysis.suitability import WeightedSuitability, calculate_suitability
 from src.visualization.plots import plot_suitability_scores
 from src.visualization.map_renderer import render_map
 
@@ -59,7 +59,9 @@ def main():
 
     # 2. Calculate suitability
     logger.info("Calculating suitability scores...")
-    suitability_scores = calculate_suitability(data)
+    suitability_scores = calculate_suitability(
+        data, suitability=WeightedSuitability.from_config(config)
+    )
 
     # 3. Save plots
     logger.info("Generating visualizations...")
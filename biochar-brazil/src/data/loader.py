@@ -1,34 +1,309 @@
 """
-General data loader for all CSV/Excel datasets used in the Biochar-Brazil project.
-Supports multiple datasets (soil, biomass, environmental, etc.).
+General data loader for all CSV/Excel datasets used in the Biochar-Brazil
+project. Supports multiple datasets (soil, biomass, environmental, etc.). Large
+files can be streamed in chunks, with column projection and a dtype schema
+(e.g. float32 / category) applied as they are read. Parsed inputs are cached in
+a Parquet sidecar (<file>.parquet) keyed on the source path, mtime and size; a
+changed source rebuilds it on the next read. A source whose sidecar can't be
+built gets a <file>.parquet.failed marker under the same key, so later reads
+go straight to the source until it changes.
 """
 
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Iterator
+
 import pandas as pd
 
-def load_data(path: str | Path) -> pd.DataFrame:
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet sidecars are skipped without pyarrow
+    pa = pq = None
+
+CSV_SUFFIXES = [".csv"]
+EXCEL_SUFFIXES = [".xlsx", ".xls"]
+SIDECAR_KEY = b"biochar_source"
+SIDECAR_CHUNKSIZE = 100_000
+
+
+def _check_path(path: str | Path) -> Path:
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Dataset not found at {path}")
+    if path.suffix.lower() not in CSV_SUFFIXES + EXCEL_SUFFIXES:
+        raise ValueError(f"Unsupported file format: {path.suffix}")
+    return path
+
+
+def sidecar_path(path: str | Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + ".parquet")
+
+
+def _failure_marker(path: Path) -> Path:
+    sidecar = sidecar_path(path)
+    return sidecar.with_name(sidecar.name + ".failed")
+
+
+def _source_key(path: Path) -> str:
+    stat = path.stat()
+    return json.dumps(
+        {
+            "path": str(path.resolve()),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+        }
+    )
+
+
+def _fresh_sidecar(path: Path) -> Path | None:
+    """
+    Return the Parquet sidecar of path if it exists and matches the source's
+    key.
+    """
+    if pq is None:
+        return None
+    sidecar = sidecar_path(path)
+    if not sidecar.exists():
+        return None
+    try:
+        metadata = pq.read_schema(sidecar).metadata or {}
+    except Exception:
+        return None
+    return (
+        sidecar
+        if metadata.get(SIDECAR_KEY) == _source_key(path).encode("utf-8")
+        else None
+    )
+
+
+def _sidecar_failed(path: Path) -> bool:
+    """
+    True if building the sidecar already failed for the source as it is now.
+    """
+    marker = _failure_marker(path)
+    try:
+        return marker.read_text(encoding="utf-8") == _source_key(path)
+    except OSError:
+        return False
+
+
+def _write_sidecar(path: Path, chunks: Iterator[pd.DataFrame]) -> Path | None:
+    """
+    Stream parsed chunks of a source into its Parquet sidecar, one chunk in
+    memory at a time. Returns the sidecar, or None (with a warning) if the data
+    or location can't take it, e.g. when chunks were parsed with conflicting
+    column types; the failure is then recorded so it isn't retried for the
+    same source.
+    """
+    if pq is None:
+        return None
+    sidecar = sidecar_path(path)
+    tmp_path = sidecar.with_name(sidecar.name + ".tmp")
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                # An all-missing text column in the first chunk
+                # would otherwise fix its type to null
+                fields = [
+                    (
+                        pa.field(f.name, pa.string())
+                        if pa.types.is_null(f.type)
+                        else f
+                    )
+                    for f in table.schema
+                ]
+                metadata = {
+                    **(table.schema.metadata or {}),
+                    SIDECAR_KEY: _source_key(path),
+                }
+                writer = pq.ParquetWriter(
+                    tmp_path, pa.schema(fields, metadata=metadata)
+                )
+            writer.write_table(table.cast(writer.schema))
+        if writer is None:
+            return None
+        writer.close()
+        os.replace(tmp_path, sidecar)
+        _failure_marker(path).unlink(missing_ok=True)
+        return sidecar
+    except Exception as e:
+        print(f"Warning: Could not cache {path} as Parquet: {e}")
+        if writer is not None:
+            writer.close()
+        if tmp_path.exists():
+            tmp_path.unlink()
+        try:
+            _failure_marker(path).write_text(
+                _source_key(path), encoding="utf-8"
+            )
+        except OSError:
+            pass
+        return None
+
+
+def apply_schema(
+    df: pd.DataFrame, schema: dict[str, str] | None
+) -> pd.DataFrame:
+    """
+    Cast columns to the dtypes in schema, e.g.
+    {"pH": "float32", "texture": "category"}.
+    Columns not in the DataFrame are ignored.
+    """
+    if not schema:
+        return df
+    casts = {
+        col: dtype
+        for col, dtype in schema.items()
+        if col in df.columns and df[col].dtype != dtype
+    }
+    return df.astype(casts) if casts else df
+
+
+def _iter_excel(
+    path: Path, chunksize: int, columns: list[str] | None
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream an .xlsx sheet in row chunks through openpyxl's read-only mode.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [str(h) for h in next(rows, ())]
+        keep = [
+            i for i, h in enumerate(header) if columns is None or h in columns
+        ]
+        names = [header[i] for i in keep]
+        buffer = []
+        for row in rows:
+            buffer.append([row[i] if i < len(row) else None for i in keep])
+            if len(buffer) == chunksize:
+                yield pd.DataFrame(buffer, columns=names)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=names)
+    finally:
+        wb.close()
+
+
+def _iter_source(
+    path: Path,
+    chunksize: int,
+    columns: list[str] | None = None,
+    schema: dict[str, str] | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV or Excel source itself, bypassing any sidecar.
+    """
+    if path.suffix.lower() in CSV_SUFFIXES:
+        dtype = {
+            c: t
+            for c, t in (schema or {}).items()
+            if columns is None or c in columns
+        }
+        with pd.read_csv(
+            path, usecols=columns, dtype=dtype or None, chunksize=chunksize
+        ) as reader:
+            for chunk in reader:
+                yield chunk
+    elif path.suffix.lower() == ".xlsx":
+        for chunk in _iter_excel(path, chunksize, columns):
+            yield apply_schema(chunk, schema)
+    else:
+        # Legacy .xls has no streaming reader; read once and slice
+        df = apply_schema(pd.read_excel(path, usecols=columns), schema)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+
+def iter_data(
+    path: str | Path,
+    chunksize: int = 100_000,
+    columns: list[str] | None = None,
+    schema: dict[str, str] | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a dataset (CSV or Excel) as DataFrames of at most chunksize rows.
+    Only `columns` are read (all if None) and `schema` dtypes are applied per
+    chunk, so memory stays bounded by the chunk size.
+    """
+    path = _check_path(path)
+    sidecar = _fresh_sidecar(path)
+    if sidecar is None:
+        yield from _iter_source(path, chunksize, columns, schema)
+        return
+    for batch in pq.ParquetFile(sidecar).iter_batches(
+        batch_size=chunksize, columns=columns
+    ):
+        yield apply_schema(batch.to_pandas(), schema)
+
+
+def load_data(
+    path: str | Path,
+    columns: list[str] | None = None,
+    schema: dict[str, str] | None = None,
+    cache: bool = True,
+) -> pd.DataFrame:
     """
     Load a dataset (CSV or Excel) from the given path.
     Automatically detects file format.
+    Optionally reads only `columns` and casts them with `schema`.
+    With cache=True the parsed file is kept in a Parquet sidecar and later
+    reads load that instead, until the source's mtime or size changes. The
+    sidecar is built by streaming the source in chunks, so a first read costs
+    one chunk plus the projected result, as an uncached read does. If it can't
+    be built, reads of the unchanged source skip straight to parsing it.
     """
-    path = Path(path)
-    if not path.exists():
-        raise FileNotFoundError(f"Dataset not found at {path}")
+    path = _check_path(path)
+    sidecar = _fresh_sidecar(path) if cache else None
+    if cache and sidecar is None and not _sidecar_failed(path):
+        # All columns go into the sidecar so it serves any later projection,
+        # but they are streamed through in chunks, never held at once
+        sidecar = _write_sidecar(path, _iter_source(path, SIDECAR_CHUNKSIZE))
 
-    if path.suffix.lower() in [".csv"]:
-        df = pd.read_csv(path)
-    elif path.suffix.lower() in [".xlsx", ".xls"]:
-        df = pd.read_excel(path)
+    if sidecar is not None:
+        df = apply_schema(pd.read_parquet(sidecar, columns=columns), schema)
+    elif path.suffix.lower() in CSV_SUFFIXES:
+        dtype = {
+            c: t
+            for c, t in (schema or {}).items()
+            if columns is None or c in columns
+        }
+        df = pd.read_csv(path, usecols=columns, dtype=dtype or None)
     else:
-        raise ValueError(f"Unsupported file format: {path.suffix}")
+        df = apply_schema(pd.read_excel(path, usecols=columns), schema)
 
     print(f"Loaded dataset from {path} with {len(df)} rows and {len(df.columns)} columns.")
     return df
 
 
-def load_multiple(datasets: list[str] | None = None, base_dir: str = "data/raw") -> dict[str, pd.DataFrame]:
+def load_biochar_dataset(
+    path: str | Path = "data/processed/Dataset_feedstock_ML.xlsx",
+) -> pd.DataFrame:
     """
-    Load multiple datasets at once from the raw data folder.
+    Load the biochar feedstock catalogue (served from its Parquet sidecar after
+    the first read).
+    """
+    return load_data(path, cache=True)
+
+
+def load_multiple(
+    datasets: list[str] | None = None,
+    base_dir: str = "data/raw",
+    columns: list[str] | None = None,
+    schema: dict[str, str] | None = None,
+    workers: int | None = None,
+    cache: bool = True,
+) -> dict[str, pd.DataFrame]:
+    """
+    Load multiple datasets at once from the raw data folder, in parallel.
     Returns a dictionary of DataFrames.
     Example: data = load_multiple(["soil_data.csv", "biomass_data.csv"])
     """
@@ -36,11 +311,18 @@ def load_multiple(datasets: list[str] | None = None, base_dir: str = "data/raw")
     if datasets is None:
         datasets = [p.name for p in base_path.glob("*.csv")]
 
-    loaded = {}
-    for file_name in datasets:
+    def _load(file_name: str):
         try:
-            df = load_data(base_path / file_name)
-            loaded[file_name] = df
+            return file_name, load_data(
+                base_path / file_name,
+                columns=columns,
+                schema=schema,
+                cache=cache,
+            )
         except Exception as e:
             print(f"Warning: Could not load {file_name}: {e}")
-    return loaded
+            return file_name, None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_load, datasets))
+    return {name: df for name, df in results if df is not None}
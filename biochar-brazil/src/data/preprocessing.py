@@ -1,11 +1,30 @@
 """
 Data preprocessing utilities for the Biochar-Brazil project.
 Handles cleaning, normalization, and encoding for multiple dataset types.
+
+`preprocess` works in memory; `preprocess_to_parquet` gives the same result
+for inputs of any size by streaming chunks twice: one pass to collect
+duplicate hashes, means, min/max and category levels, one pass to clean,
+normalize, encode and append each chunk to a Parquet file. The statistics
+live in a `Preprocessor`, which can be saved and reused on new batches.
+
+Duplicates are found by a 64-bit hash of each row. Two distinct rows with
+the same hash (odds around n**2 / 2**65 for n distinct rows) are treated as
+duplicates, so the later one is silently dropped.
 """
 
+import json
+import os
+from pathlib import Path
+from typing import Any
+
 import pandas as pd
 import numpy as np
 
+from src.data.loader import iter_data
+
+NORMALIZE_COLUMNS = ["pH", "N", "P", "K", "organic_carbon", "moisture"]
+
 
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -66,7 +85,7 @@ def preprocess(raw_data_path: str, categorical_columns: list[str] = None) -> pd.
     df = clean_data(df)
 
     # Normalize known numeric columns (only if they exist)
-    df = normalize_data(df, ["pH", "N", "P", "K", "organic_carbon", "moisture"])
+    df = normalize_data(df, NORMALIZE_COLUMNS)
 
     # Encode categorical variables (optional)
     if categorical_columns:
@@ -74,3 +93,318 @@ def preprocess(raw_data_path: str, categorical_columns: list[str] = None) -> pd.
 
     print(f"Preprocessing completed for {raw_data_path}")
     return df
+
+
+def _row_hashes(chunk: pd.DataFrame) -> np.ndarray:
+    """
+    64-bit hash per row; numeric columns are hashed as float64 so a column read
+    as int in one chunk and float in another hashes the same values alike.
+    """
+    numeric = chunk.select_dtypes(include=[np.number]).columns
+    if len(numeric):
+        chunk = chunk.astype({c: np.float64 for c in numeric})
+    return pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+
+
+def _is_number(dtype) -> bool:
+    return pd.api.types.is_numeric_dtype(
+        dtype
+    ) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def _common_dtype(dtypes: list) -> Any:
+    if all(d == dtypes[0] for d in dtypes):
+        return dtypes[0]
+    if all(_is_number(d) for d in dtypes):
+        return np.result_type(*dtypes)
+    return np.dtype(object)
+
+
+class _SeenHashes:
+    """
+    Set of uint64 row hashes kept as sorted arrays (8 bytes per hash). Runs
+    are merged while the newer one is at least as long as the one before, so
+    there are O(log n) runs and each hash is copied O(log n) times.
+    """
+
+    def __init__(self):
+        self.runs: list[np.ndarray] = []
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs:
+            pos = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            found |= run[pos] == hashes
+        return found
+
+    def add(self, hashes: np.ndarray) -> None:
+        run = np.unique(hashes)
+        if not len(run):
+            return
+        while self.runs and len(self.runs[-1]) <= len(run):
+            run = np.union1d(self.runs.pop(), run)
+        self.runs.append(run)
+
+
+def scan_chunks(chunks, categorical_columns: list[str] | None = None) -> dict:
+    """
+    First pass of the streaming preprocessor. Returns the per-chunk keep masks
+    (first occurrence of each row, with coordinates when latitude/longitude
+    exist), the common dtype per column, the sum/count/min/max of every numeric
+    column over kept rows and the levels of the categorical columns. Seen row
+    hashes are kept as sorted uint64 runs and looked up by binary search.
+    """
+    seen = _SeenHashes()
+    keep_masks, chunk_dtypes, columns = [], {}, None
+    sums, counts, mins, maxs, levels = {}, {}, {}, {}, {}
+
+    for chunk in chunks:
+        if columns is None:
+            columns = list(chunk.columns)
+        for col in columns:
+            chunk_dtypes.setdefault(col, []).append(chunk[col].dtype)
+
+        hashes = _row_hashes(chunk)
+        first = ~pd.Series(hashes).duplicated().to_numpy()
+        keep = first & ~seen.contains(hashes)
+        seen.add(hashes[keep])
+        if "latitude" in chunk.columns and "longitude" in chunk.columns:
+            keep &= (
+                chunk[["latitude", "longitude"]].notna().all(axis=1).to_numpy()
+            )
+        keep_masks.append(np.packbits(keep))
+
+        kept = chunk[keep]
+        for col in kept.select_dtypes(include=[np.number]).columns:
+            values = kept[col].astype(np.float64)
+            sums[col] = sums.get(col, 0.0) + values.sum()
+            counts[col] = counts.get(col, 0) + int(values.count())
+            if values.count():
+                mins[col] = min(mins.get(col, np.inf), values.min())
+                maxs[col] = max(maxs.get(col, -np.inf), values.max())
+        for col in categorical_columns or []:
+            if col in kept.columns:
+                levels.setdefault(col, set()).update(
+                    kept[col].dropna().unique().tolist()
+                )
+
+    dtypes = {col: _common_dtype(d) for col, d in chunk_dtypes.items()}
+    numeric = [c for c in columns or [] if _is_number(dtypes[c])]
+    return {
+        "columns": columns or [],
+        "dtypes": dtypes,
+        "keep": keep_masks,
+        "means": {
+            c: sums[c] / counts[c] if counts.get(c) else np.nan
+            for c in numeric
+        },
+        "min": {c: mins.get(c, np.nan) for c in numeric},
+        "max": {c: maxs.get(c, np.nan) for c in numeric},
+        "levels": {c: sorted(v) for c, v in levels.items()},
+    }
+
+
+class Preprocessor:
+    """
+    Fitted version of clean_data / normalize_data / encode_categorical.
+
+    fit (or fit_chunks) records the column dtypes, fill means, min/max and
+    category levels once; transform then applies them to any new chunk without
+    recomputing, so later batches land on the training scale and get the same
+    dummy columns. The statistics are saved as JSON.
+    """
+
+    def __init__(
+        self,
+        normalize_columns: list[str] | None = None,
+        categorical_columns: list[str] | None = None,
+        stats: dict | None = None,
+    ):
+        self.normalize_columns = (
+            NORMALIZE_COLUMNS
+            if normalize_columns is None
+            else list(normalize_columns)
+        )
+        self.categorical_columns = list(categorical_columns or [])
+        self.stats = stats
+
+    def fit(self, df: pd.DataFrame) -> "Preprocessor":
+        return self.fit_chunks([df])
+
+    def fit_chunks(self, chunks) -> "Preprocessor":
+        """
+        Collect the statistics in one pass over an iterable of DataFrames.
+        """
+        self.stats = scan_chunks(chunks, self.categorical_columns)
+        return self
+
+    def transform(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fill, normalize and encode a chunk with the fitted statistics (rows are
+        neither dropped nor reordered). Unseen categories get all-zero dummies;
+        columns the fit didn't see are passed through.
+        """
+        if self.stats is None:
+            raise ValueError("Preprocessor is not fitted.")
+        stats = self.stats
+        chunk = chunk.copy()
+
+        # Fill before casting, so a NaN never meets an integer dtype
+        fill = {
+            c: m for c, m in stats["means"].items()
+            if c in chunk.columns and pd.notna(m) and chunk[c].hasnans
+        }
+        if fill:
+            chunk = chunk.fillna(fill)
+
+        casts = {}
+        for col, dtype in stats["dtypes"].items():
+            if col not in chunk.columns or chunk[col].dtype == dtype:
+                continue
+            if _is_number(dtype) and _is_number(chunk[col].dtype):
+                # Widen only: int from the fit never truncates incoming floats
+                dtype = np.result_type(chunk[col].dtype, dtype)
+            casts[col] = dtype
+        if casts:
+            chunk = chunk.astype(casts)
+
+        for col in self.normalize_columns:
+            lo = stats["min"].get(col, np.nan)
+            hi = stats["max"].get(col, np.nan)
+            if (
+                col in chunk.columns
+                and pd.notna(lo)
+                and pd.notna(hi)
+                and hi != lo
+            ):
+                dtype = (
+                    np.float32
+                    if chunk[col].dtype == np.float32
+                    else np.float64
+                )
+                values = chunk[col].to_numpy(dtype=dtype)
+                chunk[col] = (values - dtype(lo)) / dtype(hi - lo)
+
+        encode = [c for c in self.categorical_columns if c in chunk.columns]
+        if encode:
+            for col in encode:
+                levels = stats["levels"].get(col, [])
+                chunk[col] = pd.Categorical(
+                    chunk[col].where(chunk[col].isin(levels)),
+                    categories=levels,
+                )
+            chunk = pd.get_dummies(chunk, columns=encode, drop_first=True)
+        return chunk
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.fit(df).transform(df)
+
+    def save(self, path: str | Path):
+        if self.stats is None:
+            raise ValueError("Preprocessor is not fitted.")
+        stats = {k: v for k, v in self.stats.items() if k != "keep"}
+        stats["dtypes"] = {c: str(d) for c, d in stats["dtypes"].items()}
+        for key in ("means", "min", "max"):
+            stats[key] = {
+                c: None if pd.isna(v) else float(v)
+                for c, v in stats[key].items()
+            }
+        stats["levels"] = {
+            c: [v.item() if isinstance(v, np.generic) else v for v in levels]
+            for c, levels in stats["levels"].items()
+        }
+        payload = {
+            "normalize_columns": self.normalize_columns,
+            "categorical_columns": self.categorical_columns,
+            "stats": stats,
+        }
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp_path, path)
+        print(f"✅ Preprocessor saved to: {path}")
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Preprocessor":
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        stats = payload["stats"]
+        stats["dtypes"] = {
+            c: pd.api.types.pandas_dtype(d) for c, d in stats["dtypes"].items()
+        }
+        for key in ("means", "min", "max"):
+            stats[key] = {
+                c: np.nan if v is None else v for c, v in stats[key].items()
+            }
+        return cls(
+            payload["normalize_columns"], payload["categorical_columns"], stats
+        )
+
+
+def preprocess_to_parquet(
+    raw_data_path: str | Path,
+    output_path: str | Path,
+    categorical_columns: list[str] | None = None,
+    chunksize: int = 100_000,
+    normalize_columns: list[str] | None = None,
+    preprocessor_path: str | Path | None = None,
+) -> int:
+    """
+    Out-of-core version of `preprocess`: stream raw_data_path twice and write
+    the cleaned, normalized and encoded rows to output_path (Parquet). Memory
+    is bounded by the chunk size plus an 8-byte hash per distinct row (twice
+    that while two runs are merged); a 64-bit hash collision drops a distinct
+    row as a duplicate. The fitted Preprocessor is saved to preprocessor_path
+    if given, for scoring new batches later. Returns the number of rows
+    written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    preprocessor = Preprocessor(normalize_columns, categorical_columns)
+    preprocessor.fit_chunks(iter_data(raw_data_path, chunksize=chunksize))
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    writer, n_rows = None, 0
+    try:
+        for chunk, packed in zip(
+            iter_data(raw_data_path, chunksize=chunksize),
+            preprocessor.stats["keep"],
+        ):
+            keep = np.unpackbits(packed, count=len(chunk)).astype(bool)
+            out = preprocessor.transform(chunk[keep])
+            table = pa.Table.from_pandas(out, preserve_index=False)
+            if writer is None:
+                # An all-missing text column in the first chunk
+                # would otherwise fix the column type to null
+                schema = pa.schema(
+                    [
+                        (
+                            pa.field(f.name, pa.string())
+                            if pa.types.is_null(f.type)
+                            else f
+                        )
+                        for f in table.schema
+                    ]
+                )
+                writer = pq.ParquetWriter(tmp_path, schema)
+            writer.write_table(table.cast(writer.schema))
+            n_rows += len(out)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError(f"No rows to preprocess in {raw_data_path}")
+    os.replace(tmp_path, output_path)
+    if preprocessor_path is not None:
+        preprocessor.save(preprocessor_path)
+
+    print(
+        f"✅ Preprocessed {n_rows} rows from {raw_data_path} into {output_path}"
+    )
+    return n_rows
@@ -0,0 +1,285 @@
+"""
+Local raster sampling: aggregate GeoTIFF exports of `gee.layers` to H3.
+
+Rasters are read window by window (never whole), and windows are processed in
+a process pool. Each window reduces the cells that lie entirely inside it;
+cells that may straddle a window edge keep their raw pixel values and are
+reduced once all windows are in, so the result equals reducing every pixel of
+each cell at once.
+
+Usage:
+    python -m src.data.raster_sampler --config configs/default.yaml
+"""
+
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import h3
+import numpy as np
+import pandas as pd
+import rasterio
+import yaml
+from rasterio.warp import transform as warp_transform
+from rasterio.windows import Window
+
+from src.data.soil_store import SoilPropertyStore
+from src.utils.geospatial import latlon_to_h3_cells
+
+# gee.layers key -> soil property name used
+# by the store and the threshold engine
+LAYER_PROPERTIES = {
+    "soil_moisture": "moisture",
+    "soil_temp": "temp",
+    "soil_ph": "pH",
+    "soil_organic_carbon": "SOC",
+    "soil_type": "texture",
+}
+
+# USDA texture triangle class codes (OpenLandMap usda_tt_class) -> texture
+# names used by the mock soils and the suitability levels
+TEXTURE_CLASSES = {
+    1: "clay", 2: "silty clay", 3: "sandy clay", 4: "clay loam",
+    5: "silty clay loam", 6: "sandy clay loam", 7: "loam", 8: "silt loam",
+    9: "sandy loam", 10: "silt", 11: "loamy sand", 12: "sand",
+}
+
+REDUCERS = ("median", "mean", "mode")
+
+
+def raster_windows(width: int, height: int, tile_size: int) -> List[Window]:
+    """
+    Split a raster into square windows of at most tile_size pixels per side.
+    """
+    return [
+        Window(
+            col, row, min(tile_size, width - col), min(tile_size, height - row)
+        )
+        for row in range(0, height, tile_size)
+        for col in range(0, width, tile_size)
+    ]
+
+
+def _cell_margin_px(src, resolution: int) -> int:
+    """
+    Pixels within this distance of a window edge may belong to a cell that
+    continues in the next window (1.5x the mean cell diameter, in pixels).
+    """
+    diameter_km = (
+        2 * h3.average_hexagon_edge_length(resolution, unit="km") * 1.5
+    )
+    px_x, px_y = abs(src.transform.a), abs(src.transform.e)
+    if src.crs is None or src.crs.is_geographic:
+        max_lat = max(abs(src.bounds.bottom), abs(src.bounds.top))
+        px_km = min(
+            px_x * 111.32 * math.cos(math.radians(min(max_lat, 89.0))),
+            px_y * 110.57,
+        )
+    else:
+        px_km = min(px_x, px_y) / 1000.0
+    return int(math.ceil(diameter_km / px_km)) + 1
+
+
+def _reduce(pixels: pd.DataFrame, reducer: str) -> pd.Series:
+    if reducer == "mode":
+        # Most frequent value per cell; ties go to the smallest value
+        counts = (
+            pixels.groupby(["h3_index", "value"])
+            .size()
+            .rename("n")
+            .reset_index()
+        )
+        counts = counts.sort_values(
+            ["h3_index", "n", "value"], ascending=[True, False, True]
+        )
+        counts = counts.drop_duplicates("h3_index")
+        return counts.set_index("h3_index")["value"]
+    return pixels.groupby("h3_index")["value"].agg(reducer)
+
+
+def _sample_window(path: str, window: Window, resolution: int, reducer: str,
+                   margin_px: int) -> Tuple[pd.Series, pd.DataFrame]:
+    """
+    Read one window and return (reduced values of cells inside it, raw pixels
+    of edge cells).
+    """
+    with rasterio.open(path) as src:
+        band = src.read(1, window=window, masked=True)
+        valid = ~np.ma.getmaskarray(band)
+        if np.issubdtype(band.dtype, np.floating):
+            valid &= ~np.isnan(band.filled(0))
+        rows, cols = np.nonzero(valid)
+        values = band.data[rows, cols].astype(float)
+
+        # Pixel centers -> lon/lat
+        t = src.window_transform(window)
+        xs = t.a * (cols + 0.5) + t.b * (rows + 0.5) + t.c
+        ys = t.d * (cols + 0.5) + t.e * (rows + 0.5) + t.f
+        if src.crs is not None and not src.crs.is_geographic:
+            xs, ys = warp_transform(src.crs, "EPSG:4326", xs, ys)
+
+    cells = latlon_to_h3_cells(np.asarray(ys), np.asarray(xs), [resolution])
+    cells = cells[resolution]
+    edge_dist = np.minimum.reduce(
+        [rows, window.height - 1 - rows, cols, window.width - 1 - cols]
+    )
+    pixels = pd.DataFrame(
+        {"h3_index": cells, "value": values, "edge_dist": edge_dist}
+    )
+
+    # A cell reaching past the window has all its pixels
+    # within margin_px of the edge
+    interior = (
+        pixels.groupby("h3_index")["edge_dist"].transform("max") > margin_px
+    )
+    done = _reduce(pixels[interior], reducer)
+    shared = pixels.loc[~interior, ["h3_index", "value"]]
+    return done, shared
+
+
+def sample_raster_to_h3(
+    path: str | Path,
+    resolution: int,
+    reducer: str = "median",
+    tile_size: int = 1024,
+    workers: Optional[int] = None,
+    scale: float = 1.0,
+    offset: float = 0.0,
+) -> pd.Series:
+    """
+    Aggregate a single-band GeoTIFF to H3 cells with reducer
+    (median/mean/mode).
+
+    Returns a Series of reduced values indexed by uint64 H3 cell. scale/offset
+    convert stored values to physical units (value * scale + offset); they are
+    not applied for the "mode" reducer, which is meant for class codes.
+    """
+    if reducer not in REDUCERS:
+        raise ValueError(f"Unsupported reducer: {reducer}")
+    path = str(path)
+    with rasterio.open(path) as src:
+        windows = raster_windows(src.width, src.height, tile_size)
+        margin_px = _cell_margin_px(src, resolution)
+
+    args = [(path, w, resolution, reducer, margin_px) for w in windows]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        parts = [_sample_window(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_sample_window, *zip(*args)))
+
+    done = [p[0] for p in parts if len(p[0])]
+    shared = [p[1] for p in parts if len(p[1])]
+    if shared:
+        done.append(_reduce(pd.concat(shared, ignore_index=True), reducer))
+    result = pd.concat(done).sort_index() if done else pd.Series(dtype=float)
+    result.index = result.index.astype(np.uint64)
+    result.index.name = "h3_index"
+
+    if reducer != "mode":
+        result = result * scale + offset
+    print(
+        f"✅ Sampled {path} into {len(result)} H3 cells ({len(windows)} "
+        f"windows, reducer={reducer})."
+    )
+    return result
+
+
+def sample_layers_to_h3(
+    layers: Dict[str, Dict[str, Any]],
+    rasters_dir: str | Path,
+    resolution: int,
+    tile_size: int = 1024,
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Sample every configured layer found as <rasters_dir>/<layer>.tif into one
+    table with an h3_index column and one column per soil property. Texture
+    class codes become names (TEXTURE_CLASSES); unknown codes are missing.
+    """
+    rasters_dir = Path(rasters_dir)
+    columns = {}
+    for layer, spec in layers.items():
+        tif = rasters_dir / f"{layer}.tif"
+        if layer not in LAYER_PROPERTIES:
+            print(
+                f"Warning: layer '{layer}' has no soil property mapping "
+                "(LAYER_PROPERTIES); skipping."
+            )
+            continue
+        if not tif.exists():
+            print(
+                f"Warning: raster for layer '{layer}' not found at {tif}; "
+                "skipping."
+            )
+            continue
+        columns[LAYER_PROPERTIES[layer]] = sample_raster_to_h3(
+            tif,
+            resolution,
+            reducer=spec.get("reducer", "median"),
+            tile_size=tile_size,
+            workers=workers,
+            scale=spec.get("scale", 1.0),
+            offset=spec.get("offset", 0.0),
+        )
+
+    table = pd.DataFrame(columns)
+    if "texture" in table.columns:
+        table["texture"] = table["texture"].map(
+            lambda v: None if pd.isna(v) else TEXTURE_CLASSES.get(int(v))
+        )
+    return table.rename_axis("h3_index").reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the soil property store from local GeoTIFF exports"
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default="configs/default.yaml",
+        help="Path to configuration YAML file",
+    )
+    parser.add_argument(
+        "--rasters-dir",
+        type=str,
+        default=None,
+        help="Directory of <layer>.tif files (default: paths.rasters_dir)",
+    )
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=None,
+        help="Output store directory (default: paths.soil_store)",
+    )
+    parser.add_argument(
+        "--tile-size", type=int, default=1024, help="Window size in pixels"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: all cores)",
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+
+    table = sample_layers_to_h3(
+        config["gee"]["layers"],
+        args.rasters_dir or config["paths"]["rasters_dir"],
+        config["h3"]["resolution"],
+        tile_size=args.tile_size,
+        workers=args.workers,
+    )
+    SoilPropertyStore.build(table, args.store or config["paths"]["soil_store"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Columnar on-disk store of soil properties per H3 cell.
+
+Layout (one directory):
+- cells.npy            sorted uint64 H3 cell ids
+- <property>.npy       float64 column per numeric property (pH, SOC,
+                       moisture, EC, temp)
+- <categorical>.npy    int16 codes per categorical property (texture),
+                       -1 = missing
+- meta.json            property names and categorical levels
+
+Columns are opened memory-mapped, so opening the store is instant and a bulk
+lookup only touches the pages it needs.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils.geospatial import h3_cells_to_int
+
+NUMERIC_PROPERTIES = ["pH", "SOC", "moisture", "EC", "temp"]
+CATEGORICAL_PROPERTIES = ["texture"]
+
+
+class SoilPropertyStore:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            raise FileNotFoundError(
+                f"Soil property store not found at {self.path}"
+            )
+        with open(meta_path, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        self.cells = np.load(self.path / "cells.npy", mmap_mode="r")
+        self.columns = {
+            prop: np.load(self.path / f"{prop}.npy", mmap_mode="r")
+            for prop in self.meta["numeric"] + list(self.meta["categorical"])
+        }
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    @classmethod
+    def build(
+        cls, df: pd.DataFrame, path: str | Path, cell_col: str = "h3_index"
+    ) -> "SoilPropertyStore":
+        """
+        Write a store from a table with one row per H3 cell (e.g. the raster
+        sampler output). Properties missing from the table are stored as
+        missing values.
+        """
+        cells = h3_cells_to_int(df[cell_col].to_numpy())
+        if len(cells) == 0:
+            raise ValueError("Soil property table is empty.")
+        if len(np.unique(cells)) != len(cells):
+            raise ValueError("Soil property table has duplicate H3 cells.")
+        order = np.argsort(cells)
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "cells.npy", cells[order])
+
+        for prop in NUMERIC_PROPERTIES:
+            values = (
+                pd.to_numeric(df[prop], errors="coerce")
+                if prop in df.columns
+                else pd.Series(np.nan, index=df.index)
+            )
+            # float64 on purpose: float32 would shift values
+            # sitting on rule thresholds (e.g. SOC 2.6)
+            np.save(
+                path / f"{prop}.npy", values.to_numpy(dtype=np.float64)[order]
+            )
+
+        categorical = {}
+        for prop in CATEGORICAL_PROPERTIES:
+            values = (
+                df[prop]
+                if prop in df.columns
+                else pd.Series(None, index=df.index, dtype=object)
+            )
+            codes, levels = pd.factorize(values)
+            np.save(path / f"{prop}.npy", codes.astype(np.int16)[order])
+            categorical[prop] = [str(level) for level in levels]
+
+        with open(path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "numeric": NUMERIC_PROPERTIES,
+                    "categorical": categorical,
+                    "n_cells": len(cells),
+                },
+                f,
+                indent=2,
+            )
+
+        print(
+            f"✅ Soil property store with {len(cells)} cells saved to: {path}"
+        )
+        return cls(path)
+
+    def lookup(self, cells) -> pd.DataFrame:
+        """
+        Vectorized lookup for many cells (uint64 or strings), in input order.
+        Cells absent from the store get missing values.
+        """
+        keys = h3_cells_to_int(cells)
+        pos = np.minimum(
+            np.searchsorted(self.cells, keys), len(self.cells) - 1
+        )
+        found = self.cells[pos] == keys
+
+        out = {"h3_index": np.asarray(cells)}
+        for prop in self.meta["numeric"]:
+            out[prop] = np.where(found, self.columns[prop][pos], np.nan)
+        for prop, levels in self.meta["categorical"].items():
+            codes = np.where(found, self.columns[prop][pos], -1)
+            out[prop] = pd.Categorical.from_codes(codes, categories=levels)
+        return pd.DataFrame(out)
@@ -1,24 +1,164 @@
 """
 Machine Learning model for predicting biochar suitability or related outcomes.
 Integrates with data pipeline for the Biochar-Brazil project.
+Training uses all cores by default; `search` runs a parallel cross-validated
+hyperparameter search over cached fold splits.
+
+Artifacts are compressed joblib files holding the estimator plus its feature
+columns; `load_artifact` keeps one loaded copy per process. Forests are not
+shared by memory-mapping: sklearn's Tree.__setstate__ copies its node arrays
+on load. To share a model with worker processes, load it in the parent before
+they are forked and let copy-on-write share the pages. `predict_stream` scores
+region-scale inputs chunk by chunk and writes predictions keyed by h3_index
+to Parquet.
 """
 
+import copy
+import os
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Iterable
+
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import GridSearchCV, KFold, train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 import pandas as pd
 import numpy as np
 import joblib
 from pathlib import Path
 
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+ARTIFACT_VERSION = 1
+
+# Process-level model registry: (resolved path, mtime_ns) -> artifact dict
+_REGISTRY: Dict[tuple, Dict[str, Any]] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=32)
+def cv_splits(
+    n_samples: int, n_splits: int = 5, random_state: int = 42
+) -> tuple:
+    """
+    Shuffled K-fold (train, test) index pairs, computed once per (n_samples,
+    n_splits, random_state) and shared by every candidate and every search on
+    data of that size.
+    """
+    kfold = KFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    return tuple(kfold.split(np.empty((n_samples, 1))))
+
+
+def peak_memory_mb() -> float:
+    """
+    Peak resident memory of this (parent) process so far, in MB (NaN where
+    unsupported). Worker processes, such as the loky workers of a parallel grid
+    search, are not included.
+    """
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    return peak / (1024 ** 2 if sys.platform == "darwin" else 1024)
+
+
+def save_artifact(
+    model,
+    path: str | Path,
+    feature_columns: list[str],
+    target: str = None,
+    compress: int = 3,
+    **metadata,
+) -> Path:
+    """
+    Save an estimator with its feature columns, compressed at joblib level
+    compress. compress=0 writes a memory-mappable file, which only helps
+    estimators holding plain numpy arrays.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    artifact = {
+        "artifact_version": ARTIFACT_VERSION,
+        "model": model,
+        "feature_columns": list(feature_columns),
+        "target": target,
+        **metadata,
+    }
+    tmp_path = path.with_name(path.name + ".tmp")
+    joblib.dump(artifact, tmp_path, compress=compress)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_artifact(
+    path: str | Path, mmap_mode: str | None = None
+) -> Dict[str, Any]:
+    """
+    Load an artifact once per process (reloaded if the file changes). mmap_mode
+    only saves memory for estimators holding plain numpy arrays; tree ensembles
+    copy their arrays on load whatever it is set to. Bare estimators saved by
+    older versions are wrapped, taking feature columns from feature_names_in_.
+    """
+    path = Path(path)
+    key = (str(path.resolve()), path.stat().st_mtime_ns)
+    with _REGISTRY_LOCK:
+        if key not in _REGISTRY:
+            with warnings.catch_warnings():
+                warnings.filterwarnings(
+                    "ignore",
+                    message=".*is not compatible with compressed file.*",
+                )
+                artifact = joblib.load(path, mmap_mode=mmap_mode)
+            if not isinstance(artifact, dict) or "model" not in artifact:
+                names = getattr(artifact, "feature_names_in_", None)
+                artifact = {
+                    "artifact_version": 0,
+                    "model": artifact,
+                    "target": None,
+                    "feature_columns": (
+                        list(names) if names is not None else None
+                    ),
+                }
+            for stale in [k for k in _REGISTRY if k[0] == key[0]]:
+                del _REGISTRY[stale]
+            _REGISTRY[key] = artifact
+        return _REGISTRY[key]
+
+
+def clear_model_registry():
+    with _REGISTRY_LOCK:
+        _REGISTRY.clear()
+
 
 class MLModel:
-    def __init__(self, data: pd.DataFrame):
-        self.data = data.copy()
-        self.model = RandomForestRegressor(random_state=42)
+
+    def __init__(
+        self,
+        data: pd.DataFrame = None,
+        n_jobs: int = -1,
+        random_state: int = 42,
+    ):
+        self.data = data.copy() if data is not None else None
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.model = RandomForestRegressor(
+            random_state=random_state, n_jobs=n_jobs
+        )
         self.features = None
         self.target = None
         self.trained = False
+        self.fit_stats = {}
+        self.search_results = None
+        self.feature_columns = None
+        self.target_column = None
 
     def prepare_data(self, feature_columns: list[str] = None, target_column: str = None):
         """
@@ -33,12 +173,74 @@ class MLModel:
 
         self.features = self.data[feature_columns].fillna(0)
         self.target = self.data[target_column].fillna(0)
+        self.feature_columns = list(feature_columns)
+        self.target_column = target_column
         print(f"Prepared data with {len(self.features.columns)} features.")
         return self.features, self.target
 
-    def train(self, test_size=0.2, random_state=42, save_path: str = "data/processed/ml_model.pkl"):
+    def search(
+        self,
+        param_grid: dict,
+        cv: int = 5,
+        X: pd.DataFrame = None,
+        y: pd.Series = None,
+        scoring: str = "neg_mean_squared_error",
+    ) -> pd.DataFrame:
+        """
+        Cross-validated grid search over RandomForestRegressor parameters.
+        Candidates x folds run in parallel on n_jobs cores (each forest on one
+        core, to avoid oversubscription) over fold splits cached by cv_splits.
+        Sets the model to the best parameters (unfitted) and returns the CV
+        results, best first.
+        """
+        if X is None or y is None:
+            if self.features is None or self.target is None:
+                raise RuntimeError(
+                    "Data not prepared. Call prepare_data() first."
+                )
+            X, y = self.features, self.target
+
+        start = time.perf_counter()
+        grid = GridSearchCV(
+            RandomForestRegressor(random_state=self.random_state, n_jobs=1),
+            param_grid,
+            cv=list(cv_splits(len(X), cv, self.random_state)),
+            scoring=scoring,
+            n_jobs=self.n_jobs,
+            refit=False,
+        )
+        grid.fit(X, y)
+        elapsed = time.perf_counter() - start
+
+        results = pd.DataFrame(grid.cv_results_).sort_values("rank_test_score")
+        self.search_results = results
+        self.model = RandomForestRegressor(
+            random_state=self.random_state,
+            n_jobs=self.n_jobs,
+            **grid.best_params_,
+        )
+        print(
+            f"✅ Searched {len(results)} candidates x {cv} folds in "
+            f"{elapsed:.1f}s. Best: {grid.best_params_}"
+        )
+        return results
+
+    def train(
+        self,
+        test_size=0.2,
+        random_state=42,
+        save_path: str = "data/processed/ml_model.pkl",
+        param_grid: dict = None,
+        cv: int = 5,
+        compress: int = 3,
+    ):
         """
-        Train the model and save it to disk.
+        Train the model and save it to disk (see save_artifact for compress).
+        With param_grid, the parameters are first chosen by `search` on the
+        training split. A fresh clone is fitted, so a model obtained through
+        `load` never changes the estimator other loaders share. Fit time and
+        the parent process's peak memory (search workers not included) are
+        recorded in fit_stats.
         """
         if self.features is None or self.target is None:
             raise RuntimeError("Data not prepared. Call prepare_data() first.")
@@ -46,20 +248,71 @@ class MLModel:
         X_train, X_test, y_train, y_test = train_test_split(
             self.features, self.target, test_size=test_size, random_state=random_state
         )
+        if param_grid:
+            self.search(param_grid, cv=cv, X=X_train, y=y_train)
 
+        self.model = clone(self.model)
+        start = time.perf_counter()
         self.model.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
         preds = self.model.predict(X_test)
 
         mse = mean_squared_error(y_test, preds)
         r2 = r2_score(y_test, preds)
 
         self.trained = True
-        joblib.dump(self.model, Path(save_path))
+        self.fit_stats = {
+            "fit_seconds": fit_seconds,
+            "parent_peak_memory_mb": peak_memory_mb(),
+            "n_jobs": self.model.n_jobs,
+        }
+        save_artifact(
+            self.model,
+            save_path,
+            self.feature_columns,
+            self.target_column,
+            compress=compress,
+            fit_stats=self.fit_stats,
+        )
 
         print(f"✅ Model trained. MSE = {mse:.3f}, R² = {r2:.3f}")
+        print(
+            f"Fit time {fit_seconds:.2f}s on n_jobs={self.model.n_jobs}, "
+            "parent-process peak memory "
+            f"{self.fit_stats['parent_peak_memory_mb']:.0f} MB"
+        )
         print(f"Model saved to {save_path}")
         return mse, r2
 
+    def _feature_array(
+        self, df: pd.DataFrame, out: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Copy the feature columns of df into a float32 array, NaN -> 0.
+        Writes into out[:len(df)] when out is given.
+        """
+        missing = [c for c in self.feature_columns if c not in df.columns]
+        if missing:
+            raise ValueError(f"Input is missing model features: {missing}")
+        X = (
+            np.empty((len(df), len(self.feature_columns)), dtype=np.float32)
+            if out is None
+            else out[: len(df)]
+        )
+        for j, col in enumerate(self.feature_columns):
+            X[:, j] = df[col].to_numpy()
+        X[np.isnan(X)] = 0.0
+        return X
+
+    def _predict_array(self, X: np.ndarray, model=None) -> np.ndarray:
+        with warnings.catch_warnings():
+            # Forests fitted on DataFrames warn about unnamed arrays;
+            # columns were checked by _feature_array
+            warnings.filterwarnings(
+                "ignore", message="X does not have valid feature names"
+            )
+            return (model or self.model).predict(X)
+
     def predict(self, new_data: pd.DataFrame):
         """
         Predict new outcomes using the trained model.
@@ -67,23 +320,151 @@ class MLModel:
         if not self.trained:
             raise RuntimeError("Model not trained. Train or load a model first.")
 
-        new_data = new_data.fillna(0)
-        return self.model.predict(new_data)
+        if self.feature_columns is None:
+            return self.model.predict(new_data.fillna(0))
+        return self._predict_array(self._feature_array(new_data))
+
+    def predict_stream(
+        self,
+        source: str | Path | Iterable[pd.DataFrame],
+        output_path: str | Path,
+        chunksize: int = 100_000,
+        workers: int = 1,
+        id_col: str = "h3_index",
+    ) -> int:
+        """
+        Predict a region-scale input chunk by chunk and append predictions to a
+        Parquet file.
+
+        source: Parquet path (only id_col and the feature columns are read) or
+                an iterable of DataFrames.
+        Each worker thread reuses one preallocated float32 buffer; at most
+        `workers` chunks are in flight, so memory stays flat whatever the input
+        size. With several workers the forest predicts each chunk on one core,
+        so threads don't oversubscribe the machine. Output rows (id_col,
+        prediction) keep the input order. Returns the number of rows predicted.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self.trained:
+            raise RuntimeError(
+                "Model not trained. Train or load a model first."
+            )
+        if self.feature_columns is None:
+            raise RuntimeError(
+                "Model has no feature column metadata; re-save it with "
+                "save_artifact."
+            )
+
+        if isinstance(source, (str, Path)):
+            parquet = pq.ParquetFile(source)
+            columns = [id_col] + [
+                c for c in self.feature_columns if c != id_col
+            ]
+            chunks = (
+                b.to_pandas()
+                for b in parquet.iter_batches(
+                    batch_size=chunksize, columns=columns
+                )
+            )
+        else:
+            chunks = iter(source)
+
+        model = self.model
+        if workers > 1 and hasattr(model, "n_jobs"):
+            # Shallow copy: shares the fitted trees, only n_jobs differs
+            model = copy.copy(model)
+            model.n_jobs = 1
+        local = threading.local()
+
+        def _predict_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+            if getattr(local, "buffer", None) is None or len(
+                local.buffer
+            ) < len(chunk):
+                local.buffer = np.empty(
+                    (max(chunksize, len(chunk)), len(self.feature_columns)),
+                    dtype=np.float32,
+                )
+            preds = self._predict_array(
+                self._feature_array(chunk, out=local.buffer), model
+            )
+            return pd.DataFrame(
+                {id_col: chunk[id_col].to_numpy(), "prediction": preds}
+            )
+
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = output_path.with_name(output_path.name + ".tmp")
+        writer, n_rows = None, 0
+
+        def _write(frame: pd.DataFrame):
+            nonlocal writer, n_rows
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+            n_rows += len(frame)
+
+        try:
+            if workers <= 1:
+                for chunk in chunks:
+                    _write(_predict_chunk(chunk))
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    pending = []
+                    for chunk in chunks:
+                        pending.append(pool.submit(_predict_chunk, chunk))
+                        if len(pending) >= workers:
+                            _write(pending.pop(0).result())
+                    for future in pending:
+                        _write(future.result())
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            pd.DataFrame(
+                {id_col: [], "prediction": np.array([], dtype=float)}
+            ).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, output_path)
+
+        print(
+            f"✅ Predicted {n_rows} rows in chunks of {chunksize} ({workers} "
+            f"worker(s)); saved to {output_path}"
+        )
+        return n_rows
 
     def feature_importance(self):
         """
         Return feature importance as a sorted DataFrame.
         """
         importance = pd.DataFrame({
-            "feature": self.features.columns,
+            "feature": self.feature_columns,
             "importance": self.model.feature_importances_
         }).sort_values("importance", ascending=False)
         return importance
 
-    def load(self, model_path: str = "data/processed/ml_model.pkl"):
+    def load(
+        self,
+        model_path: str = "data/processed/ml_model.pkl",
+        mmap_mode: str | None = None,
+    ):
         """
-        Load a pre-trained model from disk.
+        Load a pre-trained model from disk, through the process-level registry.
         """
-        self.model = joblib.load(model_path)
+        artifact = load_artifact(model_path, mmap_mode=mmap_mode)
+        self.model = artifact["model"]
+        self.feature_columns = artifact["feature_columns"]
+        self.target_column = artifact["target"]
         self.trained = True
         print(f"✅ Loaded model from {model_path}")
+        return self
+
+    @classmethod
+    def from_artifact(cls, model_path: str = "data/processed/ml_model.pkl",
+                      mmap_mode: str | None = None) -> "MLModel":
+        """
+        A prediction-only MLModel for a saved artifact (no training data
+        attached).
+        """
+        return cls().load(model_path, mmap_mode=mmap_mode)
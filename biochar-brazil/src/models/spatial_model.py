@@ -4,24 +4,80 @@ Integrates H3 geospatial encoding and polygon boundary checks.
 """
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 import h3
+import shapely
 from shapely.geometry import Point, Polygon
 
+from src.analysis.pyramid import H3Pyramid
+from src.utils.geospatial import (
+    H3BoundaryCache,
+    h3_cells_to_int,
+    latlon_to_h3_cells,
+)
+
+# Interior cells must clear the boundary by this fraction of the H3 edge
+# length, covering the gap between H3's great-circle cell edges and straight
+# lat/lng edges.
+INTERIOR_MARGIN = 0.1
+
+# Persistent H3 boundary cache, under paths.output_dir
+# (paths.boundary_cache in configs/default.yaml);
+# boundary_cache_path=None keeps it in memory only
+DEFAULT_BOUNDARY_CACHE_PATH = "data/outputs/h3_boundaries.npz"
+
 
 class SpatialModel:
-    def __init__(self, boundary: Polygon = None, h3_resolution: int = 6):
+
+    def __init__(
+        self,
+        boundary: Polygon = None,
+        h3_resolution: int = 6,
+        boundary_cache_path: str | None = DEFAULT_BOUNDARY_CACHE_PATH,
+    ):
         self.boundary = boundary
         self.h3_resolution = h3_resolution
+        self.boundary_cache = H3BoundaryCache(boundary_cache_path)
+        # (id(boundary), resolution) -> (boundary,
+        # sorted uint64 interior cells)
+        self._coverings = {}
+        if boundary is not None:
+            shapely.prepare(boundary)
 
-    def add_h3_index(self, df: pd.DataFrame, lat_col="latitude", lon_col="longitude") -> pd.DataFrame:
+    def add_h3_index(
+        self,
+        df: pd.DataFrame,
+        lat_col="latitude",
+        lon_col="longitude",
+        resolutions: list[int] = None,
+        as_uint64: bool = True,
+    ) -> pd.DataFrame:
         """
-        Add an H3 index column based on coordinates.
+        Add H3 index columns based on coordinates.
+
+        Coordinate columns are read as whole arrays and each distinct point is
+        indexed once per resolution, all resolutions in one pass.
+        The model's own resolution goes to "h3_index", every other resolution
+        to "h3_index_<res>". Cells are stored as uint64 unless as_uint64=False.
         """
         if lat_col not in df.columns or lon_col not in df.columns:
             raise ValueError("Missing latitude/longitude columns.")
-        df["h3_index"] = df.apply(lambda row: h3.geo_to_h3(row[lat_col], row[lon_col], self.h3_resolution), axis=1)
-        print(f"✅ Added H3 index (resolution {self.h3_resolution}) to {len(df)} rows.")
+        resolutions = sorted(set(resolutions or [self.h3_resolution]))
+
+        indexed = latlon_to_h3_cells(
+            df[lat_col].to_numpy(), df[lon_col].to_numpy(), resolutions
+        )
+        for res, cells in indexed.items():
+            column = (
+                "h3_index" if res == self.h3_resolution else f"h3_index_{res}"
+            )
+            if not as_uint64:
+                cells = [h3.int_to_str(int(c)) if c else None for c in cells]
+            df[column] = cells
+        print(
+            f"✅ Added H3 index (resolutions {resolutions}) to {len(df)} rows."
+        )
         return df
 
     def aggregate_by_hex(self, df: pd.DataFrame, value_col: str) -> pd.DataFrame:
@@ -34,18 +90,135 @@ class SpatialModel:
         print(f"✅ Aggregated '{value_col}' by H3 hexagon.")
         return grouped
 
+    def build_pyramid(
+        self, df: pd.DataFrame, value_cols: list[str], min_resolution: int = 0
+    ) -> H3Pyramid:
+        """
+        Precompute count/sum/min/max/sum-of-squares of value_cols per H3 cell,
+        rolled up from the rows' resolution to min_resolution, so any zoom
+        level is a lookup.
+        """
+        if "h3_index" not in df.columns:
+            raise ValueError("Missing 'h3_index' column.")
+        return H3Pyramid.build(df, value_cols, min_resolution=min_resolution)
+
     def h3_to_geodataframe(self, df: pd.DataFrame) -> gpd.GeoDataFrame:
         """
-        Convert H3 indices into polygons for visualization.
+        Convert H3 indices (uint64 or strings) into polygons for visualization.
+        Each distinct cell is converted once and duplicate rows share its
+        geometry; boundaries come from (and are added to) the model's boundary
+        cache. Rows without a cell get no geometry.
         """
-        polygons = []
-        for h in df["h3_index"]:
-            boundary = h3.h3_to_geo_boundary(h, geo_json=True)
-            polygons.append(Polygon(boundary))
-        gdf = gpd.GeoDataFrame(df, geometry=polygons, crs="EPSG:4326")
-        print(f"✅ Converted {len(gdf)} H3 cells into GeoDataFrame polygons.")
+        codes, uniques = pd.factorize(df["h3_index"])
+        polygons = self.boundary_cache.polygons(h3_cells_to_int(uniques))
+        geometry = np.full(len(codes), None, dtype=object)
+        geometry[codes >= 0] = polygons[codes[codes >= 0]]
+        self.boundary_cache.save()
+        gdf = gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
+        print(
+            f"✅ Converted {len(gdf)} H3 cells ({len(uniques)} unique) into "
+            "GeoDataFrame polygons."
+        )
         return gdf
 
+    def boundary_covering(
+        self, boundary: Polygon = None, resolution: int = None
+    ) -> np.ndarray:
+        """
+        Sorted uint64 H3 cells lying entirely inside boundary (with a safety
+        margin). Computed once per boundary and resolution.
+        """
+        boundary = self.boundary if boundary is None else boundary
+        resolution = self.h3_resolution if resolution is None else resolution
+        key = (id(boundary), resolution)
+        if key not in self._coverings:
+            candidates = h3_cells_to_int(
+                sorted(
+                    h3.h3shape_to_cells(
+                        h3.geo_to_h3shape(boundary), resolution
+                    )
+                )
+            )
+            margin = (
+                INTERIOR_MARGIN
+                * h3.average_hexagon_edge_length(resolution, unit="km")
+                / 111.0
+            )
+            inner = boundary.buffer(-margin)
+            shapely.prepare(inner)
+            within = (
+                shapely.contains(
+                    inner, self.boundary_cache.polygons(candidates)
+                )
+                if len(candidates)
+                else []
+            )
+            self._coverings[key] = (
+                boundary,
+                candidates[np.asarray(within, dtype=bool)],
+            )
+        return self._coverings[key][1]
+
+    def within_boundary_mask(
+        self, lat, lon, boundary: Polygon = None, resolution: int = None
+    ) -> np.ndarray:
+        """
+        Vectorized point-in-boundary test for coordinate arrays.
+        Points outside the boundary's bbox are rejected and points in interior
+        H3 cells accepted without a geometry test; only the rest (edge cells)
+        are tested exactly against the prepared boundary.
+        """
+        boundary = self.boundary if boundary is None else boundary
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        if boundary is None:
+            return np.ones(len(lat), dtype=bool)
+        shapely.prepare(boundary)
+        resolution = self.h3_resolution if resolution is None else resolution
+
+        minx, miny, maxx, maxy = boundary.bounds
+        mask = np.zeros(len(lat), dtype=bool)
+        candidates = np.flatnonzero(
+            (lon >= minx) & (lon <= maxx) & (lat >= miny) & (lat <= maxy)
+        )
+        interior = self.boundary_covering(boundary, resolution)
+        cells = latlon_to_h3_cells(
+            lat[candidates], lon[candidates], [resolution]
+        )[resolution]
+        pos = np.minimum(
+            np.searchsorted(interior, cells), max(len(interior) - 1, 0)
+        )
+        inside = (
+            interior[pos] == cells
+            if len(interior)
+            else np.zeros(len(cells), dtype=bool)
+        )
+        mask[candidates[inside]] = True
+
+        edge = candidates[~inside]
+        mask[edge] = shapely.contains_xy(boundary, lon[edge], lat[edge])
+        return mask
+
+    def filter_within_boundary(
+        self,
+        df: pd.DataFrame,
+        lat_col="latitude",
+        lon_col="longitude",
+        boundary: Polygon = None,
+    ) -> pd.DataFrame:
+        """
+        Rows of df whose coordinates fall inside the boundary (the model's, or
+        e.g. an AOI circle). Same result as is_within_boundary per row,
+        computed in bulk.
+        """
+        if lat_col not in df.columns or lon_col not in df.columns:
+            raise ValueError("Missing latitude/longitude columns.")
+        mask = self.within_boundary_mask(
+            df[lat_col].to_numpy(), df[lon_col].to_numpy(), boundary
+        )
+        print(f"✅ {int(mask.sum())} of {len(df)} rows within boundary.")
+        return df[mask]
+
     def is_within_boundary(self, point: Point) -> bool:
         """
         Check if a point is within the specified boundary polygon.
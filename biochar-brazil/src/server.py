@@ -0,0 +1,513 @@
+"""
+Local HTTP scoring service for interactive use.
+
+Loads the config, biochar catalogue, compiled threshold rules, soil property
+store and (if present) the MLModel artifact once, then answers requests from
+memory:
+
+    GET  /score/cell?h3=<cell>         ranked biochars for one H3 cell
+    GET  /score/point?lat=<y>&lon=<x>  same, for the cell containing a point
+                                       (at h3.resolution)
+    POST /score/batch  {"cells": [...]}
+                                       ranked biochars for many cells
+    GET  /stats                        p50/p99 latency per endpoint (unknown
+                                       paths under "other"), cache and batch
+                                       counters
+    GET  /health
+
+Cells are ranked with the threshold engine (evaluate_soil_against_biochars, in
+its many-soils form). Single-cell requests arriving together are batched into
+one soil lookup and engine call, and per-cell results are kept in an LRU cache.
+With a model loaded, each biochar also gets its ml_score and blended_score
+from HybridScorer, and the top_k are chosen by blended_score (ties keep
+catalogue order, as in HybridScorer.score_batch).
+
+Built on asyncio streams only; there is no web framework dependency.
+
+Usage:
+    python -m src.server \\
+        --biochars data/processed/Dataset_feedstock_ML.xlsx --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import h3
+import numpy as np
+import pandas as pd
+import yaml
+
+from src.analysis.hybrid import HybridScorer
+from src.analysis.region import table_records
+from src.analysis.thresholds import (
+    CompiledRules,
+    build_rationale,
+    evaluate_soils_against_biochars,
+    load_rules,
+)
+from src.data.loader import load_biochar_dataset
+from src.data.soil_store import SoilPropertyStore
+from src.models.ml_model import MLModel
+from src.utils.geospatial import get_soil_properties_from_h3
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+ROUTES = ("/health", "/stats", "/score/cell", "/score/point", "/score/batch")
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 10_000):
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._counts = defaultdict(int)
+
+    def record(self, endpoint: str, seconds: float):
+        self._samples[endpoint].append(seconds)
+        self._counts[endpoint] += 1
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """
+        Request count and p50/p99 latency (ms, over the most recent window) per
+        endpoint.
+        """
+        out = {}
+        for endpoint, samples in self._samples.items():
+            ms = np.asarray(samples) * 1000.0
+            out[endpoint] = {
+                "requests": self._counts[endpoint],
+                "p50_ms": round(float(np.percentile(ms, 50)), 3),
+                "p99_ms": round(float(np.percentile(ms, 99)), 3),
+            }
+        return out
+
+
+class ScoringService:
+
+    def __init__(
+        self,
+        biochars: pd.DataFrame,
+        rules: CompiledRules,
+        resolution: int = 6,
+        top_k: int = 10,
+        soil_store: Optional[SoilPropertyStore] = None,
+        model: Optional[MLModel] = None,
+        hybrid_config: Optional[Dict[str, Any]] = None,
+        cache_size: int = 50_000,
+        max_batch: int = 256,
+        max_wait_ms: float = 2.0,
+    ):
+        self.rules = rules
+        self.biochars = table_records(biochars)
+        self.resolution = resolution
+        self.top_k = top_k
+        self.soil_store = soil_store
+        self.cache_size = cache_size
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+
+        self.scorer = None
+        if model is not None:
+            ids = [b.get("id") for b in self.biochars]
+            if None in ids or len(set(ids)) != len(ids):
+                print(
+                    "Warning: biochar ids are missing or not unique; serving "
+                    "rule scores only."
+                )
+            else:
+                self.scorer = HybridScorer.from_config(
+                    {"hybrid": hybrid_config or {}}, model, biochars, rules
+                )
+                self._catalogue_pos = {bid: j for j, bid in enumerate(ids)}
+
+        self.latency = LatencyTracker()
+        self.counters = defaultdict(int)
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One scoring thread keeps the event loop free
+        # to collect the next batch
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks;
+        # hold batches until they finish
+        self._tasks: set = set()
+
+    @classmethod
+    def from_config(
+        cls,
+        config_path: str,
+        biochars_path: Optional[str] = None,
+        model_path: Optional[str] = None,
+        soil_store: Optional[str] = None,
+    ) -> "ScoringService":
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+        service = config.get("service", {})
+
+        store_path = soil_store or config["paths"].get("soil_store")
+        if store_path and not (Path(store_path) / "meta.json").exists():
+            print(
+                f"Warning: soil property store not found at {store_path}; "
+                "using mock soil values."
+            )
+            store_path = None
+        model_path = model_path or service.get("model")
+        if model_path and not Path(model_path).exists():
+            print(
+                f"Warning: model artifact not found at {model_path}; serving "
+                "rule scores only."
+            )
+            model_path = None
+
+        return cls(
+            load_biochar_dataset(
+                biochars_path
+                or service.get(
+                    "biochars", "data/processed/Dataset_feedstock_ML.xlsx"
+                )
+            ),
+            load_rules(config_path),
+            resolution=config["h3"]["resolution"],
+            top_k=config.get("pipeline", {}).get("top_k", 10),
+            soil_store=SoilPropertyStore(store_path) if store_path else None,
+            model=MLModel.from_artifact(model_path) if model_path else None,
+            hybrid_config=config.get("hybrid"),
+            cache_size=service.get("cache_size", 50_000),
+            max_batch=service.get("max_batch", 256),
+            max_wait_ms=service.get("max_wait_ms", 2.0),
+        )
+
+    # ----- scoring (runs on the scoring thread) -----------------------------
+
+    def _soils(self, cells: List[str]) -> pd.DataFrame:
+        if self.soil_store is not None:
+            return self.soil_store.lookup(cells)
+        return pd.DataFrame(
+            [get_soil_properties_from_h3(c) for c in cells]
+        ).assign(h3_index=cells)
+
+    def _score_uncached(self, cells: List[str]) -> Dict[str, Dict[str, Any]]:
+        soils = self._soils(cells)
+        records = table_records(soils.drop(columns=["h3_index"]))
+        ml = (
+            self.scorer.score_matrix(soils)
+            if self.scorer is not None
+            else None
+        )
+        # With a model the top_k come from the blended ranking, so every
+        # biochar is scored, and rationale waits until the top_k are known
+        ranked = evaluate_soils_against_biochars(
+            records,
+            self.biochars,
+            with_rationale=ml is None,
+            top_k=self.top_k if ml is None else None,
+            rules=self.rules,
+        )
+
+        out = {}
+        for i, (cell, soil, results) in enumerate(zip(cells, records, ranked)):
+            # Copy: cells sharing a soil signature
+            # share the engine's result objects
+            results = [dict(r) for r in results]
+            if ml is not None:
+                for r in results:
+                    j = self._catalogue_pos[r["biochar_id"]]
+                    r["ml_score"] = float(ml["ml"][i, j])
+                    r["blended_score"] = float(ml["blended"][i, j])
+                results.sort(
+                    key=lambda r: (
+                        -r["blended_score"],
+                        self._catalogue_pos[r["biochar_id"]],
+                    )
+                )
+                results = results[:self.top_k]
+                for r in results:
+                    bio = self.biochars[self._catalogue_pos[r["biochar_id"]]]
+                    r["messages"] = build_rationale(
+                        bio, r["active"], self.rules
+                    )
+            out[cell] = {"h3_index": cell, "soil": soil, "results": results}
+        return out
+
+    def score_cells(self, cells: List[str]) -> List[Dict[str, Any]]:
+        """
+        Ranked results for each cell (in input order), from the LRU cache where
+        possible.
+        """
+        with self._lock:
+            hits = {
+                c: self._cache[c]
+                for c in dict.fromkeys(cells)
+                if c in self._cache
+            }
+            for c in hits:
+                self._cache.move_to_end(c)
+            missing = [c for c in dict.fromkeys(cells) if c not in hits]
+            self.counters["cache_hits"] += len(cells) - len(missing)
+            self.counters["cache_misses"] += len(missing)
+
+        fresh = self._score_uncached(missing) if missing else {}
+        with self._lock:
+            if missing:
+                self.counters["batches"] += 1
+            for c, result in fresh.items():
+                self._cache[c] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return [hits.get(c) or fresh[c] for c in cells]
+
+    # ----- request batching (runs on the event loop) ------------------------
+
+    async def score_cell(self, cell: str) -> Dict[str, Any]:
+        """
+        Queue one cell; queued cells are scored together once max_batch arrive
+        or max_wait passes.
+        """
+        with self._lock:
+            if cell in self._cache:
+                self._cache.move_to_end(cell)
+                self.counters["cache_hits"] += 1
+                return self._cache[cell]
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((cell, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        cells = [cell for cell, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.score_cells, cells
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    # ----- HTTP -------------------------------------------------------------
+
+    def _cell_param(self, cell: str) -> str:
+        if not cell or not h3.is_valid_cell(cell):
+            raise ValueError(f"Invalid H3 cell: {cell!r}")
+        return cell
+
+    async def route(
+        self, method: str, target: str, body: bytes
+    ) -> Tuple[int, Dict[str, Any]]:
+        url = urlsplit(target)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip("/") or "/"
+
+        if path == "/health":
+            return 200, {
+                "status": "ok",
+                "biochars": len(self.biochars),
+                "model": self.scorer is not None,
+            }
+        if path == "/stats":
+            with self._lock:
+                cached = len(self._cache)
+            return 200, {
+                "latency": self.latency.report(),
+                "counters": dict(self.counters),
+                "cached_cells": cached,
+            }
+        if path == "/score/cell":
+            return 200, await self.score_cell(
+                self._cell_param(params.get("h3", ""))
+            )
+        if path == "/score/point":
+            lat, lon = float(params["lat"]), float(params["lon"])
+            return 200, await self.score_cell(
+                h3.latlng_to_cell(lat, lon, self.resolution)
+            )
+        if path == "/score/batch":
+            if method != "POST":
+                return 405, {
+                    "error": "Use POST with a JSON body {\"cells\": [...]}"
+                }
+            cells = [
+                self._cell_param(c)
+                for c in json.loads(body or b"{}").get("cells", [])
+            ]
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.score_cells, cells
+            )
+            return 200, {"results": results}
+        return 404, {"error": f"Unknown endpoint {path}"}
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """
+        Serve HTTP/1.1 requests on one connection (keep-alive) until the client
+        closes it.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (
+                    b"\r\n",
+                    b"\n",
+                    b"",
+                ):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                start = time.perf_counter()
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(
+                        " ", 2
+                    )
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # Malformed request line or length: answer,
+                    # then drop the out-of-step stream
+                    method = target = None
+                    headers["connection"] = "close"
+                    status, payload = 400, {
+                        "error": f"Malformed request: {request_line[:200]!r}"
+                    }
+
+                endpoint = "other"
+                if target is not None:
+                    body = await reader.readexactly(length)
+                    path = urlsplit(target).path.rstrip("/") or "/"
+                    endpoint = path if path in ROUTES else "other"
+                    try:
+                        status, payload = await self.route(
+                            method.upper(), target, body
+                        )
+                    except (KeyError, ValueError) as e:
+                        status, payload = 400, {"error": str(e)}
+                    except Exception as e:
+                        status, payload = 500, {"error": str(e)}
+                data = json.dumps(payload, default=str).encode("utf-8")
+                # Keyed by route, not raw path, so
+                # arbitrary paths can't grow the tracker
+                self.latency.record(endpoint, time.perf_counter() - start)
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                connection = "keep-alive" if keep_alive else "close"
+                head = (
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {connection}\r\n\r\n"
+                )
+                writer.write(head.encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionResetError, BrokenPipeError):
+                pass
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"✅ Scoring service listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            print(f"Latency: {json.dumps(self.latency.report())}")
+            self._executor.shutdown(wait=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve biochar rankings over local HTTP with warm caches"
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default="configs/default.yaml",
+        help="Path to configuration YAML file",
+    )
+    parser.add_argument(
+        "--biochars",
+        type=str,
+        default=None,
+        help="Biochar catalogue (default: service.biochars)",
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default=None,
+        help="MLModel artifact (default: service.model)",
+    )
+    parser.add_argument(
+        "--soil-store",
+        type=str,
+        default=None,
+        help="Soil property store (default: paths.soil_store)",
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default=None,
+        help="Bind address (default: service.host)",
+    )
+    parser.add_argument(
+        "--port", type=int, default=None, help="Port (default: service.port)"
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f).get("service", {})
+    service = ScoringService.from_config(
+        args.config, args.biochars, args.model, args.soil_store
+    )
+    try:
+        asyncio.run(
+            service.serve(
+                args.host or config.get("host", "127.0.0.1"),
+                args.port or config.get("port", 8765),
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
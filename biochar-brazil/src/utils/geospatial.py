@@ -2,11 +2,20 @@
 Geospatial helper functions for the Biochar-Brazil project.
 Includes:
 - Conversion between H3 hexagons and geographic coordinates.
-- Sampling or mock extraction of soil properties.
+- Array-based H3 indexing (uint64 cells) and parent lookups.
+- Bulk H3 cell -> polygon conversion with a persistent boundary cache.
+- Soil property lookups: bulk from the on-disk store, or mock values per cell.
 """
 
+import os
+from functools import lru_cache
+from pathlib import Path
 from typing import Dict, Any, Tuple
-from h3 import h3
+import h3
+from h3.api import basic_int
+import numpy as np
+import pandas as pd
+import shapely
 
 
 def h3_to_latlon(h3_id: str) -> Tuple[float, float]:
@@ -17,13 +26,187 @@ def h3_to_latlon(h3_id: str) -> Tuple[float, float]:
     return float(lat), float(lon)
 
 
-def get_soil_properties_from_h3(h3_id: str) -> Dict[str, Any]:
+def latlon_to_h3_cells(
+    lat: np.ndarray, lon: np.ndarray, resolutions: list[int]
+) -> dict[int, np.ndarray]:
     """
-    Retrieve soil property values corresponding to an H3 cell.
-    Replace mock data with real raster or tabular lookups later.
+    Index coordinate arrays into uint64 H3 cells at one or more resolutions.
+    Repeated coordinate pairs are indexed once; rows with NaN coordinates get 0
+    (the H3 null cell). h3 has no array form of latlng_to_cell, so each
+    distinct point still costs one Python-level call per resolution; only the
+    de-duplication and the scatter back to rows are array operations.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    codes, uniques = pd.factorize(lat[valid] + 1j * lon[valid])
+    points = [(z.real, z.imag) for z in uniques.tolist()]
+
+    out = {}
+    for res in resolutions:
+        unique_cells = np.fromiter(
+            (basic_int.latlng_to_cell(a, b, res) for a, b in points),
+            dtype=np.uint64,
+            count=len(points),
+        )
+        cells = np.zeros(len(lat), dtype=np.uint64)
+        cells[valid] = unique_cells[codes]
+        out[res] = cells
+    return out
+
+
+def h3_cells_to_int(cells) -> np.ndarray:
+    """
+    Normalize H3 cells (uint64 or hex strings) to a uint64 array; missing cells
+    become 0.
+    """
+    arr = np.asarray(cells)
+    if arr.dtype.kind in "ui":
+        return arr.astype(np.uint64)
+    return np.fromiter(
+        (h3.str_to_int(c) if isinstance(c, str) else 0 for c in arr),
+        dtype=np.uint64,
+        count=len(arr),
+    )
+
+
+_H3_RES_SHIFT = np.uint64(52)
+_H3_RES_MASK = np.uint64(0xF) << _H3_RES_SHIFT
+
+
+def h3_cell_resolutions(cells: np.ndarray) -> np.ndarray:
+    """
+    Resolution of each uint64 H3 cell, read from the index bits.
+    """
+    return (
+        (np.asarray(cells, dtype=np.uint64) & _H3_RES_MASK) >> _H3_RES_SHIFT
+    ).astype(np.int8)
+
+
+def h3_cell_parents(cells: np.ndarray, resolution: int) -> np.ndarray:
+    """
+    Vectorized h3.cell_to_parent for uint64 cells at resolutions >= resolution:
+    set the resolution field and mark the digits below it as unused (7).
+    """
+    cells = np.asarray(cells, dtype=np.uint64)
+    unused = 0
+    for r in range(resolution + 1, 16):
+        unused |= 7 << ((15 - r) * 3)
+    return (
+        (cells & ~_H3_RES_MASK)
+        | (np.uint64(resolution) << _H3_RES_SHIFT)
+        | np.uint64(unused)
+    )
+
+
+class H3BoundaryCache:
+    """
+    Boundary rings (lng, lat vertices) of H3 cells, optionally persisted to an
+    .npz file. Keyed by uint64 cell id, which already encodes the cell's
+    resolution, so one cache can hold several resolutions.
+    """
+
+    def __init__(self, path: str | Path = None):
+        self.path = Path(path) if path else None
+        self._rings: Dict[int, np.ndarray] = {}
+        self._dirty = False
+        if self.path is not None and self.path.exists():
+            with np.load(self.path) as data:
+                cells, counts, coords = (
+                    data["cells"],
+                    data["counts"],
+                    data["coords"],
+                )
+            self._rings = dict(
+                zip(cells.tolist(), np.split(coords, np.cumsum(counts)[:-1]))
+            )
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+    def polygons(self, cells: np.ndarray) -> np.ndarray:
+        """
+        Object array of shapely Polygons for uint64 cells (None for the null
+        cell 0). Only cells missing from the cache are computed; rings with the
+        same vertex count are built in one vectorized shapely call.
+        """
+        cells = cells.tolist()
+        for c in cells:
+            if c and c not in self._rings:
+                # cell_to_boundary gives (lat, lng);
+                # GeoJSON order is (lng, lat)
+                self._rings[c] = np.asarray(
+                    basic_int.cell_to_boundary(c), dtype=float
+                )[:, ::-1]
+                self._dirty = True
+
+        out = np.full(len(cells), None, dtype=object)
+        rings = [self._rings.get(c) if c else None for c in cells]
+        counts = np.array([0 if r is None else len(r) for r in rings])
+        for k in np.unique(counts[counts > 0]):
+            idx = np.flatnonzero(counts == k)
+            out[idx] = shapely.polygons(np.stack([rings[i] for i in idx]))
+        return out
+
+    def save(self):
+        """
+        Write the cache to its .npz path if new cells were added.
+        """
+        if self.path is None or not self._dirty or not self._rings:
+            return
+        rings = list(self._rings.values())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                cells=np.fromiter(
+                    self._rings.keys(), dtype=np.uint64, count=len(rings)
+                ),
+                counts=np.array([len(r) for r in rings], dtype=np.uint8),
+                coords=np.concatenate(rings),
+            )
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+@lru_cache(maxsize=None)
+def _open_soil_store(path: str):
+    from src.data.soil_store import SoilPropertyStore
+    return SoilPropertyStore(path)
+
+
+def get_soil_properties_for_cells(
+    cells, store="data/outputs/soil_store"
+) -> pd.DataFrame:
+    """
+    Bulk soil property lookup for many H3 cells in one vectorized pass.
+    store: a SoilPropertyStore or the path of one (opened once per process).
+    Returns one row per input cell: h3_index, pH, SOC, moisture, EC, temp,
+    texture.
+    """
+    if isinstance(store, (str, Path)):
+        store = _open_soil_store(str(store))
+    return store.lookup(cells)
+
+
+def get_soil_properties_from_h3(h3_id: str, store=None) -> Dict[str, Any]:
+    """
+    Retrieve soil property values corresponding to an H3 cell. With a store
+    (SoilPropertyStore or path) values come from it; without one, mock values
+    are returned. Prefer get_soil_properties_for_cells for many cells.
     """
     lat, lon = h3_to_latlon(h3_id)
 
+    if store is not None:
+        row = get_soil_properties_for_cells([h3_id], store).iloc[0]
+        soil = {
+            k: (None if pd.isna(v) else v)
+            for k, v in row.drop("h3_index").items()
+        }
+        soil["latitude"], soil["longitude"] = lat, lon
+        return soil
+
     # Mock values for now — can be replaced with GEE or raster sampling later
     soil = {
         "pH": 5.8,                # example soil pH
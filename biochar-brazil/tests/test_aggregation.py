@@ -0,0 +1,81 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.aggregation import (
+    aggregate_by_h3,
+    analyze_chunks,
+    has_cell,
+    merge_partials,
+    partial_aggregates,
+)
+from src.analysis.risk_assessment import assess_risk
+from src.analysis.suitability import calculate_suitability
+
+
+class TestFusedAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 1000
+        self.df = pd.DataFrame(
+            {
+                "h3_index": [
+                    f"86a8{c:03d}ffffffff" for c in rng.integers(0, 80, n)
+                ],
+                "pH": rng.uniform(4, 8, n),
+                "organic_carbon": rng.uniform(0.5, 5, n),
+                "moisture": rng.uniform(5, 40, n),
+            }
+        )
+        self.df.loc[rng.choice(n, 30, replace=False), "moisture"] = np.nan
+
+    def expected(self):
+        scores = calculate_suitability(self.df.copy())
+        assess_risk(scores)
+        return aggregate_by_h3(scores)
+
+    def test_chunked_matches_three_stage_pipeline(self):
+        for chunksize in [1000, 137, 7]:
+            chunks = (
+                self.df.iloc[i:i + chunksize]
+                for i in range(0, len(self.df), chunksize)
+            )
+            result = analyze_chunks(chunks)
+            pd.testing.assert_frame_equal(
+                result, self.expected(), check_dtype=False, rtol=1e-12
+            )
+
+    def test_rows_without_cell_count_towards_global_max(self):
+        self.df.loc[self.df.index[:3], "h3_index"] = None
+        self.df.loc[
+            self.df.index[:3], ["pH", "organic_carbon", "moisture"]
+        ] = [7.0, 5.0, 40.0]
+        chunks = (self.df.iloc[i:i + 137] for i in range(0, len(self.df), 137))
+        result = analyze_chunks(chunks)
+        self.assertFalse(result["h3_index"].isna().any())
+        pd.testing.assert_frame_equal(
+            result, self.expected(), check_dtype=False, rtol=1e-12
+        )
+
+    def test_partials_keep_missing_cell_key(self):
+        rows = self.df.index[[0, 1, 2, 500]]
+        self.df.loc[rows, "h3_index"] = [None, None, None, np.nan]
+        self.df.loc[rows, "moisture"] = 30.0
+        partials = merge_partials(
+            partial_aggregates(self.df.iloc[:400]),
+            partial_aggregates(self.df.iloc[400:]),
+        )
+        missing = ~has_cell(partials.index)
+        self.assertEqual(missing.sum(), 1)
+        self.assertEqual(partials["n"][missing].sum(), 4)
+
+    def test_input_not_modified(self):
+        before = self.df.copy()
+        analyze_chunks([self.df])
+        pd.testing.assert_frame_equal(self.df, before)
+
+
+if __name__ == "__main__":
+    unittest.main()
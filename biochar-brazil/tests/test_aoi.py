@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+
+import h3
+import pandas as pd
+
+from src.analysis.aoi import RegionStore, aoi_ring, aoi_ring_size
+from src.analysis.region import score_region
+
+
+class TestAOIQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.tmp.name, "region_scores.csv")
+        biochars = [
+            {
+                "id": i,
+                "name": f"char-{i}",
+                "fixed_carbon": 50 + 5 * i,
+                "ash": 4 + 3 * i,
+                "pH": 6 + 0.5 * i,
+            }
+            for i in range(5)
+        ]
+        score_region(
+            biochars,
+            [-56.0, -13.0, -55.4, -12.4],
+            6,
+            self.csv,
+            workers=1,
+            top_k=3,
+        )
+        self.scores = pd.read_csv(self.csv)
+        self.lat, self.lon = -12.7, -55.7
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ring_size_covers_radius(self):
+        """Every cell centered within the radius is inside the k-ring."""
+        center = h3.latlng_to_cell(self.lat, self.lon, 6)
+        k = aoi_ring_size(100, 6)
+        ring = set(h3.grid_disk(center, k))
+        outside = [c for c in h3.grid_disk(center, k + 3) if c not in ring]
+        nearest = min(
+            h3.great_circle_distance(
+                (self.lat, self.lon), h3.cell_to_latlng(c)
+            )
+            for c in outside
+        )
+        self.assertGreater(nearest, 100)
+
+    def test_query_matches_brute_force(self):
+        """Every stored cell in the radius comes back with its top-k rows."""
+        store = RegionStore.build(self.csv)
+        radius = 25.0
+        result = store.query_aoi(self.lat, self.lon, radius)
+
+        center = h3.latlng_to_cell(self.lat, self.lon, 6)
+        expected = {
+            c
+            for c in self.scores["h3_index"].unique()
+            if h3.great_circle_distance(
+                (self.lat, self.lon), h3.cell_to_latlng(c)
+            )
+            <= radius
+            or c == center
+        }
+        self.assertEqual(set(result["h3_index"]), expected)
+        self.assertTrue(result["distance_km"].is_monotonic_increasing)
+
+        cell = result["h3_index"].iloc[-1]
+        got = (
+            result[result["h3_index"] == cell]
+            .drop(columns=["ring", "distance_km"])
+            .reset_index(drop=True)
+        )
+        want = (
+            self.scores[self.scores["h3_index"] == cell]
+            .sort_values("rank")
+            .reset_index(drop=True)
+        )
+        pd.testing.assert_frame_equal(got, want, check_dtype=False)
+        self.assertEqual(
+            result[result["h3_index"] == cell]["ring"].iloc[0],
+            h3.grid_distance(center, cell),
+        )
+
+    def test_rings_cached_and_store_round_trip(self):
+        path = os.path.join(self.tmp.name, "region_store")
+        RegionStore.build(self.scores, path)
+        store = RegionStore.load(path)
+        self.assertEqual(store.resolution, 6)
+
+        aoi_ring.cache_clear()
+        first = store.query_aoi(self.lat, self.lon, 15.0)
+        second = store.query_aoi(self.lat, self.lon, 15.0)
+        self.assertEqual(aoi_ring.cache_info().hits, 1)
+        pd.testing.assert_frame_equal(first, second)
+        self.assertTrue(store.query_aoi(0.0, 0.0, 15.0).empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,17 @@
 import unittest
 import os
-from src.data.loader import load_biochar_dataset
+import tempfile
+from unittest.mock import patch
+from src.data.loader import (
+    iter_data,
+    load_biochar_dataset,
+    load_data,
+    load_multiple,
+    sidecar_path,
+)
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 
 
 class TestDataLoader(unittest.TestCase):
@@ -43,5 +53,133 @@ class TestDataLoader(unittest.TestCase):
         pass
 
 
+class TestStreamingLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.df = pd.DataFrame({
+            "pH": np.linspace(4.0, 8.0, 25),
+            "SOC": np.linspace(0.5, 6.0, 25),
+            "texture": ["clay", "loam", "sandy loam", "clay", "loam"] * 5,
+        })
+        self.df.to_csv(os.path.join(self.tmp.name, "soil_a.csv"), index=False)
+        self.df.to_csv(os.path.join(self.tmp.name, "soil_b.csv"), index=False)
+        self.df.to_excel(os.path.join(self.tmp.name, "soil.xlsx"), index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_iter_data_chunks_projection_and_schema(self):
+        """CSV and Excel stream in bounded chunks with given columns/dtypes."""
+        schema = {"pH": "float32", "texture": "category"}
+        for name in ["soil_a.csv", "soil.xlsx"]:
+            chunks = list(
+                iter_data(
+                    os.path.join(self.tmp.name, name),
+                    chunksize=10,
+                    columns=["pH", "texture"],
+                    schema=schema,
+                )
+            )
+            self.assertEqual([len(c) for c in chunks], [10, 10, 5])
+            self.assertEqual(list(chunks[0].columns), ["pH", "texture"])
+            self.assertEqual(chunks[0]["pH"].dtype, np.float32)
+            self.assertIsInstance(
+                chunks[0]["texture"].dtype, pd.CategoricalDtype
+            )
+            combined = pd.concat(chunks, ignore_index=True)
+            np.testing.assert_allclose(
+                combined["pH"], self.df["pH"], rtol=1e-6
+            )
+
+    def test_load_multiple_parallel(self):
+        loaded = load_multiple(
+            base_dir=self.tmp.name, workers=2, schema={"SOC": "float32"}
+        )
+        self.assertEqual(sorted(loaded), ["soil_a.csv", "soil_b.csv"])
+        self.assertEqual(loaded["soil_b.csv"]["SOC"].dtype, np.float32)
+
+
+class TestParquetSidecar(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "feedstock.xlsx")
+        self.df = pd.DataFrame(
+            {
+                "feedstock": ["wood", "coconut shell", "rice husk"],
+                "pH": [8.1, 9.0, 7.4],
+            }
+        )
+        self.df.to_excel(self.path, index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sidecar_built_and_reused(self):
+        first = load_data(self.path)
+        self.assertTrue(sidecar_path(self.path).exists())
+        pd.testing.assert_frame_equal(load_data(self.path), first)
+        projected = load_data(
+            self.path, columns=["pH"], schema={"pH": "float32"}
+        )
+        self.assertEqual(list(projected.columns), ["pH"])
+        self.assertEqual(projected["pH"].dtype, np.float32)
+
+    def test_stale_sidecar_rebuilt(self):
+        load_data(self.path)
+        changed = pd.concat([self.df, self.df], ignore_index=True)
+        changed.to_excel(self.path, index=False)
+        os.utime(self.path, ns=(0, 10**18))
+        self.assertEqual(len(load_data(self.path)), 6)
+        self.assertEqual(
+            sum(len(c) for c in iter_data(self.path, chunksize=4)), 6
+        )
+
+    def test_sidecar_streamed_in_chunks(self):
+        """A CSV sidecar is written chunk by chunk and reads back intact."""
+        path = os.path.join(self.tmp.name, "soil.csv")
+        df = pd.DataFrame(
+            {
+                "h3_index": [f"cell-{i}" for i in range(25)],
+                "pH": np.linspace(4, 9, 25),
+            }
+        )
+        df.to_csv(path, index=False)
+        with patch("src.data.loader.SIDECAR_CHUNKSIZE", 4):
+            cached = load_data(path, columns=["pH"])
+        self.assertEqual(pq.ParquetFile(sidecar_path(path)).num_row_groups, 7)
+        pd.testing.assert_frame_equal(
+            cached, load_data(path, columns=["pH"], cache=False)
+        )
+        pd.testing.assert_frame_equal(
+            load_data(path), load_data(path, cache=False)
+        )
+
+    def test_conflicting_chunk_types_skip_sidecar(self):
+        path = os.path.join(self.tmp.name, "mixed.csv")
+        pd.DataFrame({"value": ["1", "2", "3", "x", "y"]}).to_csv(
+            path, index=False
+        )
+        with patch("src.data.loader.SIDECAR_CHUNKSIZE", 3):
+            df = load_data(path)
+        self.assertFalse(sidecar_path(path).exists())
+        self.assertEqual(len(df), 5)
+
+        # The failure is remembered until the source changes
+        with patch(
+            "src.data.loader._write_sidecar", return_value=None
+        ) as write:
+            pd.testing.assert_frame_equal(load_data(path), df)
+            write.assert_not_called()
+            os.utime(path, ns=(0, 10**18))
+            load_data(path)
+            write.assert_called_once()
+
+    def test_cache_disabled(self):
+        load_data(self.path, cache=False)
+        self.assertFalse(sidecar_path(self.path).exists())
+
+
 if __name__ == "__main__":
     unittest.main()
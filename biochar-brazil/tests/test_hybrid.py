@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.hybrid import HybridScorer
+from src.analysis.thresholds import evaluate_matrix
+from src.models.ml_model import MLModel, clear_model_registry
+from tests.test_sweep import make_soils
+from tests.test_thresholds import make_biochars
+
+
+def train_pair_model(path, n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "soil_pH": rng.uniform(4, 9, n),
+        "soil_SOC": rng.uniform(0.5, 6, n),
+        "fixed_carbon": rng.uniform(0, 120, n),
+        "ash": rng.uniform(0, 120, n),
+    })
+    df["performance"] = (
+        0.01 * df["fixed_carbon"]
+        - 0.05 * df["soil_pH"]
+        + rng.normal(0, 0.05, n)
+    )
+    model = MLModel(df, n_jobs=1)
+    model.prepare_data(target_column="performance")
+    model.train(save_path=path)
+    return MLModel.from_artifact(path)
+
+
+class TestHybridScorer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.model = train_pair_model(
+            os.path.join(self.tmp.name, "pair_model.pkl")
+        )
+        self.biochars = pd.DataFrame(make_biochars(12))
+        self.soils = make_soils(25)
+        self.soils.loc[3, "SOC"] = np.nan
+
+    def tearDown(self):
+        clear_model_registry()
+        self.tmp.cleanup()
+
+    def test_matches_separate_pipelines(self):
+        scorer = HybridScorer(
+            self.model,
+            self.biochars,
+            ml_weight=0.3,
+            rules_weight=0.7,
+            ml_min=-1.0,
+            ml_max=1.5,
+        )
+        scores = scorer.score_matrix(self.soils)
+
+        rule = evaluate_matrix(self.soils, self.biochars)
+        np.testing.assert_array_equal(scores["rule"], rule["normalized_score"])
+
+        pairs = pd.DataFrame(
+            {
+                "soil_pH": np.repeat(
+                    self.soils["pH"].to_numpy(), len(self.biochars)
+                ),
+                "soil_SOC": np.repeat(
+                    self.soils["SOC"].to_numpy(), len(self.biochars)
+                ),
+                "fixed_carbon": np.tile(
+                    self.biochars["fixed_carbon"].to_numpy(), len(self.soils)
+                ),
+                "ash": np.tile(
+                    self.biochars["ash"].to_numpy(), len(self.soils)
+                ),
+            }
+        )
+        ml = self.model.predict(pairs).reshape(
+            len(self.soils), len(self.biochars)
+        )
+        np.testing.assert_allclose(scores["ml"], ml, rtol=1e-12)
+
+        ml01 = np.clip((ml + 1.0) / 2.5, 0, 1)
+        expected = np.where(
+            rule["hard_fail"], 0.0, 0.3 * ml01 + 0.7 * rule["normalized_score"]
+        )
+        np.testing.assert_allclose(scores["blended"], expected, rtol=1e-12)
+
+    def test_top_k_ranking(self):
+        scorer = HybridScorer(self.model, self.biochars, top_k=4)
+        ranked = scorer.score_batch(self.soils)
+        self.assertEqual(len(ranked), 4 * len(self.soils))
+        blended = scorer.score_matrix(self.soils)["blended"]
+        for i, (cell, rows) in enumerate(
+            ranked.groupby("h3_index", sort=False)
+        ):
+            self.assertEqual(list(rows["rank"]), [1, 2, 3, 4])
+            np.testing.assert_allclose(
+                rows["blended_score"], np.sort(blended[i])[::-1][:4]
+            )
+
+    def test_invalid_configuration(self):
+        with self.assertRaises(ValueError):
+            HybridScorer(
+                self.model, self.biochars, ml_weight=0, rules_weight=0
+            )
+        with self.assertRaises(ValueError):
+            HybridScorer(self.model, self.biochars.drop(columns="ash"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.analysis import incremental
+from src.analysis.aggregation import aggregate_by_h3
+from src.analysis.incremental import ResultStore
+from src.analysis.risk_assessment import assess_risk
+from src.analysis.suitability import WeightedSuitability, calculate_suitability
+
+
+def make_samples(n=500, n_cells=60, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "h3_index": [
+                f"86a8{c:03d}ffffffff" for c in rng.integers(0, n_cells, n)
+            ],
+            "pH": rng.uniform(4, 8, n).round(2),
+            "organic_carbon": rng.uniform(0.5, 5, n).round(2),
+            "moisture": rng.uniform(5, 40, n).round(1),
+        }
+    )
+
+
+def full_pipeline(df, weights=None):
+    scores = calculate_suitability(df.copy(), weights)
+    assess_risk(scores)  # adds risk_score to scores
+    return aggregate_by_h3(scores)
+
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.df = make_samples()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assert_matches_full(self, aggregates, df):
+        pd.testing.assert_frame_equal(
+            aggregates, full_pipeline(df), check_dtype=False, rtol=1e-12
+        )
+
+    def test_first_run_matches_full_pipeline(self):
+        store = ResultStore(self.tmp.name)
+        self.assert_matches_full(store.update(self.df), self.df)
+
+    def test_only_changed_cells_rescored(self):
+        store = ResultStore(self.tmp.name)
+        store.update(self.df)
+        store.save()
+
+        changed = self.df.copy()
+        changed.loc[3, "pH"] += 0.5
+        changed = pd.concat(
+            [changed, changed.iloc[[7]].assign(h3_index="86a8999ffffffff")],
+            ignore_index=True,
+        )
+        changed = changed.drop(
+            index=changed.index[
+                changed["h3_index"] == self.df.loc[11, "h3_index"]
+            ]
+        )
+
+        reopened = ResultStore(self.tmp.name)
+        with mock.patch.object(
+            incremental,
+            "partial_aggregates",
+            wraps=incremental.partial_aggregates,
+        ) as spy:
+            aggregates = reopened.update(
+                changed.sample(frac=1, random_state=1)
+            )
+        rescored = set(spy.call_args[0][0]["h3_index"])
+        self.assertEqual(
+            rescored, {self.df.loc[3, "h3_index"], "86a8999ffffffff"}
+        )
+        self.assert_matches_full(aggregates, changed)
+
+    def test_rows_without_cell_count_towards_global_max(self):
+        df = self.df.assign(moisture=5.0)
+        # The cell-less rows hold the global max
+        df.loc[df.index[:3], "h3_index"] = None
+        df.loc[df.index[:3], ["pH", "organic_carbon", "moisture"]] = [
+            4.0,
+            0.5,
+            40.0,
+        ]
+        store = ResultStore(self.tmp.name)
+        aggregates = store.update(df)
+        self.assertFalse(aggregates["h3_index"].isna().any())
+        self.assertEqual(len(store), len(aggregates))
+        self.assert_matches_full(aggregates, df)
+        store.save()
+
+        df.loc[df.index[0], "pH"] = 8.0
+        aggregates = ResultStore(self.tmp.name).update(df)
+        self.assert_matches_full(aggregates, df)
+
+    def test_new_weights_rescore_everything(self):
+        store = ResultStore(self.tmp.name)
+        store.update(self.df)
+        weights = {"soil_ph": 0.5, "soc": 0.5}
+        with mock.patch.object(
+            incremental,
+            "partial_aggregates",
+            wraps=incremental.partial_aggregates,
+        ) as spy:
+            aggregates = store.update(self.df, weights=weights)
+        self.assertEqual(len(spy.call_args[0][0]), len(self.df))
+        pd.testing.assert_frame_equal(
+            aggregates,
+            full_pipeline(self.df, weights),
+            check_dtype=False,
+            rtol=1e-12,
+        )
+
+    def test_config_scorer_applied_and_versioned(self):
+        store = ResultStore(self.tmp.name)
+        store.update(self.df)
+        suitability = WeightedSuitability({"soil_ph": 0.5, "soc": 0.5})
+        with mock.patch.object(
+            incremental,
+            "partial_aggregates",
+            wraps=incremental.partial_aggregates,
+        ) as spy:
+            aggregates = store.update(self.df, suitability=suitability)
+        self.assertEqual(len(spy.call_args[0][0]), len(self.df))
+
+        scores = suitability.score(self.df)[["h3_index", "suitability_score"]]
+        assess_risk(scores)
+        pd.testing.assert_frame_equal(
+            aggregates, aggregate_by_h3(scores), check_dtype=False, rtol=1e-6
+        )
+
+        reweighted = WeightedSuitability({"soil_ph": 0.7, "soc": 0.3})
+        self.assertNotEqual(
+            incremental.scoring_version(suitability=suitability),
+            incremental.scoring_version(suitability=reweighted),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import os
+import tempfile
+import unittest
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.models.ml_model import (
+    MLModel,
+    clear_model_registry,
+    cv_splits,
+    load_artifact,
+)
+
+
+def make_dataset(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "fixed_carbon": rng.uniform(40, 90, n),
+        "ash": rng.uniform(1, 40, n),
+        "pH": rng.uniform(5, 11, n),
+    })
+    df["yield"] = (
+        0.5 * df["fixed_carbon"] - 0.3 * df["ash"] + rng.normal(0, 1, n)
+    )
+    return df
+
+
+class TestMLModelTraining(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.save_path = os.path.join(self.tmp.name, "ml_model.pkl")
+        self.model = MLModel(make_dataset())
+        self.model.prepare_data(target_column="yield")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_train_uses_all_cores_and_records_stats(self):
+        self.model.train(save_path=self.save_path)
+        self.assertEqual(self.model.model.n_jobs, -1)
+        self.assertGreater(self.model.fit_stats["fit_seconds"], 0)
+        self.assertIn("parent_peak_memory_mb", self.model.fit_stats)
+
+    def test_search_picks_best_params(self):
+        grid = {"n_estimators": [10, 30], "max_depth": [2, None]}
+        mse, r2 = self.model.train(
+            save_path=self.save_path, param_grid=grid, cv=3
+        )
+        results = self.model.search_results
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results.iloc[0]["rank_test_score"], 1)
+        best = results.iloc[0]["params"]
+        self.assertEqual(
+            self.model.model.get_params()["n_estimators"], best["n_estimators"]
+        )
+        self.assertGreater(r2, 0.5)
+
+    def test_fold_splits_cached(self):
+        self.assertIs(cv_splits(160, 3, 42), cv_splits(160, 3, 42))
+        folds = cv_splits(160, 3, 42)
+        self.assertEqual(
+            sorted(np.concatenate([test for _, test in folds]).tolist()),
+            list(range(160)),
+        )
+
+
+class TestMLModelArtifacts(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.save_path = os.path.join(self.tmp.name, "ml_model.pkl")
+        self.trained = MLModel(make_dataset(), n_jobs=2)
+        self.trained.prepare_data(target_column="yield")
+        self.trained.train(save_path=self.save_path)
+        self.region = make_dataset(n=1000, seed=1).drop(columns="yield")
+        self.region.loc[::7, "ash"] = np.nan
+        self.region.insert(
+            0,
+            "h3_index",
+            [f"86a8{i:05x}ffffff" for i in range(len(self.region))],
+        )
+        clear_model_registry()
+
+    def tearDown(self):
+        clear_model_registry()
+        self.tmp.cleanup()
+
+    def test_artifact_round_trip(self):
+        model = MLModel.from_artifact(self.save_path)
+        self.assertEqual(model.feature_columns, ["fixed_carbon", "ash", "pH"])
+        self.assertEqual(model.target_column, "yield")
+        expected = self.trained.model.predict(
+            self.region[model.feature_columns].fillna(0)
+        )
+        # Threaded tree averaging may differ in the last ulp between runs
+        np.testing.assert_allclose(
+            model.predict(self.region), expected, rtol=1e-12
+        )
+
+    def test_registry_loads_once(self):
+        self.assertIs(
+            load_artifact(self.save_path), load_artifact(self.save_path)
+        )
+        self.assertIs(
+            MLModel.from_artifact(self.save_path).model,
+            MLModel.from_artifact(self.save_path).model,
+        )
+
+    def test_compressed_artifact(self):
+        path = os.path.join(self.tmp.name, "uncompressed.pkl")
+        self.trained.train(save_path=path, compress=0)
+        self.assertLess(os.path.getsize(self.save_path), os.path.getsize(path))
+        model = MLModel.from_artifact(self.save_path)
+        np.testing.assert_allclose(
+            model.predict(self.region),
+            self.trained.predict(self.region),
+            rtol=1e-12,
+        )
+
+    def test_training_a_loaded_model_leaves_registry_intact(self):
+        shared = MLModel.from_artifact(self.save_path).model
+        expected = shared.predict(self.region[["fixed_carbon", "ash", "pH"]])
+        loaded = MLModel(make_dataset(seed=2)).load(self.save_path)
+        loaded.prepare_data(target_column="yield")
+        loaded.train(save_path=os.path.join(self.tmp.name, "retrained.pkl"))
+        self.assertIsNot(loaded.model, shared)
+        self.assertIs(load_artifact(self.save_path)["model"], shared)
+        np.testing.assert_allclose(
+            shared.predict(self.region[["fixed_carbon", "ash", "pH"]]),
+            expected,
+            rtol=1e-12,
+        )
+
+    def test_legacy_bare_estimator(self):
+        path = os.path.join(self.tmp.name, "legacy.pkl")
+        joblib.dump(self.trained.model, path)
+        model = MLModel.from_artifact(path)
+        self.assertEqual(model.feature_columns, ["fixed_carbon", "ash", "pH"])
+
+    def test_missing_features_raise(self):
+        model = MLModel.from_artifact(self.save_path)
+        with self.assertRaises(ValueError):
+            model.predict(self.region.drop(columns="pH"))
+
+    def test_predict_stream(self):
+        model = MLModel.from_artifact(self.save_path)
+        expected = model.predict(self.region)
+        source = os.path.join(self.tmp.name, "region.parquet")
+        self.region.to_parquet(source, index=False)
+
+        for src, workers in [
+            (source, 1),
+            (source, 3),
+            ((self.region.iloc[i:i + 128] for i in range(0, 1000, 128)), 2),
+        ]:
+            out = os.path.join(self.tmp.name, "predictions.parquet")
+            n = model.predict_stream(src, out, chunksize=128, workers=workers)
+            result = pd.read_parquet(out)
+            self.assertEqual(n, len(self.region))
+            self.assertEqual(
+                list(result["h3_index"]), list(self.region["h3_index"])
+            )
+            np.testing.assert_allclose(
+                result["prediction"], expected, rtol=1e-12
+            )
+        self.assertEqual(model.model.n_jobs, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
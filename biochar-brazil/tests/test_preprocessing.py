@@ -0,0 +1,152 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.data.preprocessing import (
+    Preprocessor,
+    _SeenHashes,
+    clean_data,
+    preprocess,
+    preprocess_to_parquet,
+)
+
+
+def make_raw(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "latitude": rng.uniform(-30, 0, n).round(1),
+        "longitude": rng.uniform(-60, -40, n).round(1),
+        "pH": rng.uniform(4, 8, n).round(1),
+        "N": rng.integers(0, 50, n),
+        "moisture": rng.uniform(5, 40, n).round(1),
+        "texture": rng.choice(["clay", "loam", "sandy loam"], n),
+        "region": rng.choice(["north", "south"], n),
+    })
+    df.loc[rng.choice(n, 20, replace=False), "pH"] = np.nan
+    df.loc[rng.choice(n, 5, replace=False), "latitude"] = np.nan
+    # NaNs only late in the file, so early chunks
+    # read N as int and later ones as float
+    df.loc[n - 3:, "N"] = np.nan
+    # Duplicates both within and across chunks
+    return pd.concat(
+        [df, df.iloc[[0, 5, 150]], df.iloc[[10, 10]]], ignore_index=True
+    )
+
+
+class TestStreamingPreprocess(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw_path = os.path.join(self.tmp.name, "raw.csv")
+        make_raw().to_csv(self.raw_path, index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_matches_in_memory_preprocess(self):
+        expected = preprocess(
+            self.raw_path, categorical_columns=["texture"]
+        ).reset_index(drop=True)
+        out_path = os.path.join(self.tmp.name, "clean.parquet")
+        n_rows = preprocess_to_parquet(
+            self.raw_path,
+            out_path,
+            categorical_columns=["texture"],
+            chunksize=64,
+        )
+        result = pd.read_parquet(out_path)
+
+        self.assertEqual(n_rows, len(expected))
+        self.assertEqual(list(result.columns), list(expected.columns))
+        pd.testing.assert_frame_equal(
+            result, expected, check_dtype=False, rtol=1e-9
+        )
+
+    def test_single_chunk(self):
+        expected = preprocess(self.raw_path).reset_index(drop=True)
+        out_path = os.path.join(self.tmp.name, "clean.parquet")
+        preprocess_to_parquet(self.raw_path, out_path, chunksize=10_000)
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(out_path), expected, check_dtype=False, rtol=1e-9
+        )
+
+
+class TestSeenHashes(unittest.TestCase):
+
+    def test_matches_python_set(self):
+        rng = np.random.default_rng(0)
+        seen, reference = _SeenHashes(), set()
+        for size in [5, 40, 3, 0, 200, 17]:
+            batch = rng.integers(0, 500, size).astype(np.uint64)
+            found = seen.contains(batch)
+            np.testing.assert_array_equal(
+                found, [int(h) in reference for h in batch]
+            )
+            seen.add(batch[~found])
+            reference.update(int(h) for h in batch)
+        self.assertEqual(sum(len(r) for r in seen.runs), len(reference))
+
+
+class TestPreprocessor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.train = clean_data(make_raw()).reset_index(drop=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_save_load_round_trip(self):
+        prep = Preprocessor(categorical_columns=["texture"]).fit(self.train)
+        path = os.path.join(self.tmp.name, "preprocessor.json")
+        prep.save(path)
+        loaded = Preprocessor.load(path)
+
+        batch = make_raw(n=200, seed=1)
+        pd.testing.assert_frame_equal(
+            loaded.transform(batch), prep.transform(batch)
+        )
+
+    def test_new_batches_use_training_scale(self):
+        prep = Preprocessor(categorical_columns=["texture"]).fit(self.train)
+        lo, hi = self.train["pH"].min(), self.train["pH"].max()
+        batch = pd.DataFrame(
+            {
+                "pH": [lo, hi, np.nan, hi + 1],
+                "texture": ["clay", "loam", "peat", "sandy loam"],
+            }
+        )
+        out = prep.transform(batch)
+
+        np.testing.assert_allclose(out["pH"][:2], [0.0, 1.0])
+        self.assertAlmostEqual(
+            out["pH"][2], (self.train["pH"].mean() - lo) / (hi - lo)
+        )
+        self.assertGreater(out["pH"][3], 1.0)
+        self.assertEqual(
+            [c for c in out.columns if c.startswith("texture_")],
+            ["texture_loam", "texture_sandy loam"],
+        )
+        # Unseen level -> no dummy set
+        self.assertFalse(
+            out.loc[2, ["texture_loam", "texture_sandy loam"]].any()
+        )
+
+    def test_int_fit_does_not_truncate_float_batches(self):
+        """A column fitted as int64 keeps later fractional values and NaNs."""
+        train = pd.DataFrame({"pH": [4, 5, 6, 7, 8]})
+        prep = Preprocessor(normalize_columns=["pH"]).fit(train)
+        out = prep.transform(pd.DataFrame({"pH": [5.5, 6.9, np.nan]}))
+        self.assertEqual(out["pH"].dtype, np.float64)
+        np.testing.assert_allclose(out["pH"], [0.375, 0.725, 0.5])
+
+    def test_unfitted_raises(self):
+        with self.assertRaises(ValueError):
+            Preprocessor().transform(self.train)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import tempfile
+import unittest
+
+import h3
+import numpy as np
+import pandas as pd
+
+from src.analysis.pyramid import H3Pyramid
+from src.models.spatial_model import SpatialModel
+
+
+class TestH3Pyramid(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 3000
+        self.df = pd.DataFrame({
+            "latitude": rng.uniform(-14.0, -12.0, n),
+            "longitude": rng.uniform(-57.0, -55.0, n),
+            "pH": rng.uniform(4, 8, n),
+            "SOC": rng.uniform(0.5, 5, n),
+        })
+        self.df.loc[rng.choice(n, 100, replace=False), "SOC"] = np.nan
+        self.model = SpatialModel(h3_resolution=7)
+        self.df = self.model.add_h3_index(self.df)
+        self.pyramid = self.model.build_pyramid(
+            self.df, ["pH", "SOC"], min_resolution=3
+        )
+
+    def expected(self, res, col):
+        parents = [
+            h3.str_to_int(h3.cell_to_parent(h3.int_to_str(int(c)), res))
+            for c in self.df["h3_index"]
+        ]
+        grouped = self.df[col].groupby(np.array(parents, dtype=np.uint64))
+        return grouped.agg(["count", "mean", "var", "min", "max"])
+
+    def test_levels_match_direct_groupby(self):
+        self.assertEqual(self.pyramid.resolutions, [3, 4, 5, 6, 7])
+        for res in [7, 5, 3]:
+            for col in ["pH", "SOC"]:
+                stats = self.pyramid.stats(res, col).set_index("h3_index")
+                expected = self.expected(res, col)
+                self.assertEqual(list(stats.index), list(expected.index))
+                np.testing.assert_array_equal(
+                    stats["count"], expected["count"]
+                )
+                np.testing.assert_allclose(
+                    stats["mean"], expected["mean"], rtol=1e-12
+                )
+                np.testing.assert_allclose(
+                    stats["var"], expected["var"], rtol=1e-8
+                )
+                np.testing.assert_array_equal(stats["min"], expected["min"])
+                np.testing.assert_array_equal(stats["max"], expected["max"])
+
+    def test_base_mean_matches_aggregate_by_hex(self):
+        base = self.pyramid.stats(7, "pH")
+        direct = self.model.aggregate_by_hex(self.df, "pH")
+        np.testing.assert_allclose(base["mean"], direct["pH"], rtol=1e-12)
+
+    def test_lookup_mixed_resolutions_and_save_load(self):
+        some = self.pyramid.stats(5, "pH").iloc[:3]
+        cells = [h3.int_to_str(int(c)) for c in some["h3_index"]] + [
+            "83a8b3fffffffff"
+        ]
+        cells.insert(1, h3.int_to_str(int(self.df["h3_index"].iloc[0])))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.pyramid.save(tmp)
+            loaded = H3Pyramid.load(tmp)
+        result = loaded.lookup(cells, "pH")
+        self.assertEqual(list(result["h3_index"]), cells)
+        np.testing.assert_allclose(
+            result["mean"].iloc[[0, 2, 3]], some["mean"], rtol=1e-12
+        )
+        self.assertEqual(result["count"].iloc[-1], 0)
+        self.assertTrue(np.isnan(result["mean"].iloc[-1]))
+
+    def test_mixed_resolutions_rejected(self):
+        mixed = self.df.copy()
+        mixed.loc[0, "h3_index"] = h3.str_to_int(
+            h3.cell_to_parent(h3.int_to_str(int(mixed.loc[0, "h3_index"])), 5)
+        )
+        with self.assertRaises(ValueError):
+            H3Pyramid.build(mixed, ["pH"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.transform import from_origin
+
+from src.data.raster_sampler import sample_layers_to_h3, sample_raster_to_h3
+from src.utils.geospatial import latlon_to_h3_cells
+
+
+def write_raster(path, data, nodata=None):
+    transform = from_origin(-56.0, -12.0, 0.01, 0.01)
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=data.shape[0],
+        width=data.shape[1],
+        count=1,
+        dtype=data.dtype,
+        crs="EPSG:4326",
+        transform=transform,
+        nodata=nodata,
+    ) as dst:
+        dst.write(data, 1)
+    return transform
+
+
+def brute_force(data, transform, resolution, reducer, nodata=None):
+    rows, cols = (
+        np.nonzero(data != nodata)
+        if nodata is not None
+        else np.indices(data.shape).reshape(2, -1)
+    )
+    xs = transform.c + transform.a * (cols + 0.5)
+    ys = transform.f + transform.e * (rows + 0.5)
+    cells = latlon_to_h3_cells(ys, xs, [resolution])[resolution]
+    pixels = pd.DataFrame(
+        {"h3_index": cells, "value": data[rows, cols].astype(float)}
+    )
+    if reducer == "mode":
+        return pixels.groupby("h3_index")["value"].agg(
+            lambda v: v.value_counts().sort_index().idxmax()
+        )
+    return pixels.groupby("h3_index")["value"].agg(reducer)
+
+
+class TestRasterSampler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.values = rng.uniform(40, 80, (120, 150)).astype(np.float32)
+        self.values[:5, :5] = -9999
+        self.classes = rng.integers(1, 5, (120, 150)).astype(np.uint8)
+        self.transform = write_raster(
+            os.path.join(self.tmp.name, "soil_ph.tif"),
+            self.values,
+            nodata=-9999,
+        )
+        write_raster(
+            os.path.join(self.tmp.name, "soil_type.tif"), self.classes
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_windowed_median_matches_whole_raster(self):
+        """Small windows (many cells split) give the exact per-cell median."""
+        path = os.path.join(self.tmp.name, "soil_ph.tif")
+        sampled = sample_raster_to_h3(
+            path, 7, "median", tile_size=32, workers=1
+        )
+        expected = brute_force(
+            self.values, self.transform, 7, "median", nodata=-9999
+        )
+        self.assertEqual(len(sampled), len(expected))
+        np.testing.assert_allclose(
+            sampled.loc[expected.index].to_numpy(), expected.to_numpy()
+        )
+
+    def test_parallel_mode(self):
+        path = os.path.join(self.tmp.name, "soil_type.tif")
+        sampled = sample_raster_to_h3(path, 7, "mode", tile_size=40, workers=2)
+        expected = brute_force(self.classes, self.transform, 7, "mode")
+        np.testing.assert_array_equal(
+            sampled.loc[expected.index].to_numpy(), expected.to_numpy()
+        )
+
+    def test_layers_table(self):
+        layers = {
+            "soil_ph": {"reducer": "median", "scale": 0.1},
+            "soil_type": {"reducer": "mode"},
+            "soil_moisture": {"reducer": "median"},
+            "land_cover": {"reducer": "mode"},
+        }
+        with mock.patch("builtins.print") as printed:
+            table = sample_layers_to_h3(
+                layers, self.tmp.name, 6, tile_size=64, workers=1
+            )
+        self.assertTrue(
+            any(
+                "'land_cover' has no soil property mapping" in str(c)
+                for c in printed.call_args_list
+            )
+        )
+        self.assertEqual(list(table.columns), ["h3_index", "pH", "texture"])
+        # The nodata corner leaves one cell with texture but no pH
+        self.assertTrue(table["pH"].dropna().between(4.0, 8.0).all())
+        self.assertEqual(table["texture"].isna().sum(), 0)
+        self.assertTrue(
+            set(table["texture"])
+            <= {"clay", "silty clay", "sandy clay", "clay loam"}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
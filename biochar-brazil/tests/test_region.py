@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from src.analysis.region import chunk_cells, polyfill_bbox, score_region
+from src.analysis.thresholds import evaluate_soil_against_biochars
+from src.utils.geospatial import get_soil_properties_from_h3
+
+
+class TestRegionScoring(unittest.TestCase):
+
+    def setUp(self):
+        self.bbox = [-56.0, -13.0, -55.5, -12.5]
+        self.biochars = [
+            {
+                "id": i,
+                "name": f"char-{i}",
+                "fixed_carbon": 50 + 5 * i,
+                "ash": 4 + 3 * i,
+                "pH": 6 + 0.5 * i,
+                "c_pct": 55 + i,
+                "bet": 150 + 20 * i,
+            }
+            for i in range(8)
+        ]
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, "region_scores.csv")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_chunks_cover_all_cells(self):
+        cells = polyfill_bbox(self.bbox, 6)
+        self.assertGreater(len(cells), 0)
+        chunks = list(chunk_cells(cells, 7))
+        self.assertEqual([c for chunk in chunks for c in chunk], cells)
+        self.assertTrue(all(len(chunk) <= 7 for chunk in chunks))
+
+    def test_streamed_top_k_matches_engine(self):
+        """Serial and pooled runs write the same per-cell top-k rows."""
+        n_cells = score_region(
+            self.biochars,
+            self.bbox,
+            6,
+            self.output,
+            workers=1,
+            chunk_size=5,
+            top_k=3,
+        )
+        serial = pd.read_csv(self.output)
+        self.assertEqual(len(serial), n_cells * 3)
+
+        cell = serial["h3_index"].iloc[0]
+        expected = evaluate_soil_against_biochars(
+            get_soil_properties_from_h3(cell), self.biochars, top_k=3
+        )
+        self.assertEqual(
+            serial[serial["h3_index"] == cell]["biochar_id"].tolist(),
+            [r["biochar_id"] for r in expected],
+        )
+
+        score_region(
+            self.biochars,
+            self.bbox,
+            6,
+            self.output,
+            workers=2,
+            chunk_size=5,
+            top_k=3,
+        )
+        pd.testing.assert_frame_equal(pd.read_csv(self.output), serial)
+
+
+if __name__ == "__main__":
+    unittest.main()
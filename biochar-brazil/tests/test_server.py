@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+import h3
+import numpy as np
+import pandas as pd
+
+from src.analysis.hybrid import HybridScorer
+from src.analysis.region import polyfill_bbox
+from src.analysis.thresholds import RULES, evaluate_soil_against_biochars
+from src.models.ml_model import clear_model_registry
+from src.server import ScoringService
+from src.utils.geospatial import get_soil_properties_from_h3
+from tests.test_hybrid import train_pair_model
+from tests.test_thresholds import make_biochars
+
+
+async def request(port, method, target, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nHost: x\r\nContent-Length: "
+        f"{len(body)}\r\n"
+        f"Connection: close\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, data = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(data)
+
+
+class TestScoringService(unittest.TestCase):
+
+    def setUp(self):
+        self.biochars = pd.DataFrame(make_biochars(12))
+        self.cells = polyfill_bbox([-56.0, -13.0, -55.8, -12.8], 6)[:20]
+
+    def tearDown(self):
+        clear_model_registry()
+
+    def run_with_server(self, service, scenario):
+        async def main():
+            server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await scenario(port)
+        return asyncio.run(main())
+
+    def test_cell_and_point_match_engine(self):
+        service = ScoringService(self.biochars, RULES, top_k=5)
+        cell = self.cells[0]
+        lat, lon = h3.cell_to_latlng(cell)
+
+        async def scenario(port):
+            return (
+                await request(port, "GET", f"/score/cell?h3={cell}"),
+                await request(
+                    port, "GET", f"/score/point?lat={lat}&lon={lon}"
+                ),
+                await request(port, "GET", "/score/cell?h3=nope"),
+                await request(port, "GET", "/nowhere"),
+            )
+
+        (status, body), (_, point), (bad, _), (missing, _) = (
+            self.run_with_server(service, scenario)
+        )
+        self.assertEqual(status, 200)
+        expected = evaluate_soil_against_biochars(
+            get_soil_properties_from_h3(cell),
+            service.biochars,
+            top_k=5,
+            rules=RULES,
+        )
+        self.assertEqual(body["results"], json.loads(json.dumps(expected)))
+        self.assertEqual(point, body)
+        self.assertEqual((bad, missing), (400, 404))
+
+    def test_malformed_request_and_unknown_paths(self):
+        service = ScoringService(self.biochars, RULES, top_k=3)
+
+        async def scenario(port):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GARBAGE\r\n\r\n")
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(
+                b"POST /score/batch HTTP/1.1\r\nContent-Length: -5\r\n\r\n"
+            )
+            await writer.drain()
+            negative = await reader.read()
+            writer.close()
+            for i in range(5):
+                await request(port, "GET", f"/nowhere/{i}")
+            return response, negative, await request(port, "GET", "/stats")
+
+        response, negative, (_, stats) = self.run_with_server(
+            service, scenario
+        )
+        self.assertTrue(response.startswith(b"HTTP/1.1 400 "))
+        self.assertTrue(negative.startswith(b"HTTP/1.1 400 "))
+        self.assertEqual(set(stats["latency"]), {"other"})
+        self.assertEqual(stats["latency"]["other"]["requests"], 7)
+
+    def test_concurrent_requests_are_batched_and_cached(self):
+        service = ScoringService(self.biochars, RULES, top_k=3, max_wait_ms=50)
+
+        async def scenario(port):
+            first = await asyncio.gather(
+                *[
+                    request(port, "GET", f"/score/cell?h3={c}")
+                    for c in self.cells
+                ]
+            )
+            again = await request(
+                port, "POST", "/score/batch", {"cells": self.cells[:5]}
+            )
+            stats = await request(port, "GET", "/stats")
+            return first, again, stats
+
+        first, (_, again), (_, stats) = self.run_with_server(service, scenario)
+        self.assertEqual([body["h3_index"] for _, body in first], self.cells)
+        self.assertLess(stats["counters"]["batches"], len(self.cells))
+        self.assertEqual(stats["counters"]["cache_misses"], len(self.cells))
+        self.assertEqual(again["results"], [body for _, body in first[:5]])
+        latency = stats["latency"]["/score/cell"]
+        self.assertEqual(latency["requests"], len(self.cells))
+        self.assertLessEqual(latency["p50_ms"], latency["p99_ms"])
+
+    def test_lru_eviction(self):
+        service = ScoringService(self.biochars, RULES, top_k=3, cache_size=4)
+        service.score_cells(self.cells[:6])
+        self.assertEqual(list(service._cache), self.cells[2:6])
+        service.score_cells(self.cells[2:3])
+        self.assertEqual(list(service._cache)[-1], self.cells[2])
+
+    def test_model_scores_attached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            model = train_pair_model(os.path.join(tmp, "pair_model.pkl"))
+            service = ScoringService(
+                self.biochars, RULES, top_k=4, model=model
+            )
+            result = service.score_cells(self.cells[:3])[1]
+
+            scorer = HybridScorer(model, self.biochars, RULES)
+            soils = pd.DataFrame(
+                [get_soil_properties_from_h3(self.cells[1])]
+            ).assign(h3_index=self.cells[1])
+            ml = scorer.score_matrix(soils)["ml"][0]
+            ids = self.biochars["id"].tolist()
+            for r in result["results"]:
+                np.testing.assert_allclose(
+                    r["ml_score"], ml[ids.index(r["biochar_id"])], rtol=1e-12
+                )
+
+            # Ranked by blended score, matching the hybrid top-k
+            self.assertEqual(
+                [r["biochar_id"] for r in result["results"]],
+                scorer.score_batch(soils)["biochar_id"].tolist()[:4],
+            )
+
+            # Rationale is built for the kept rows only, as the engine would
+            full = evaluate_soil_against_biochars(
+                get_soil_properties_from_h3(self.cells[1]),
+                service.biochars,
+                rules=RULES,
+            )
+            messages = {r["biochar_id"]: r["messages"] for r in full}
+            for r in result["results"]:
+                self.assertEqual(r["messages"], messages[r["biochar_id"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
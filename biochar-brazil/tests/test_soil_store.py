@@ -0,0 +1,64 @@
+import tempfile
+import unittest
+
+import h3
+import numpy as np
+import pandas as pd
+
+from src.data.soil_store import SoilPropertyStore
+from src.utils.geospatial import (
+    get_soil_properties_for_cells,
+    get_soil_properties_from_h3,
+)
+
+
+class TestSoilPropertyStore(unittest.TestCase):
+
+    def setUp(self):
+        self.cells = [
+            h3.latlng_to_cell(-12.0 + 0.2 * i, -55.0, 6) for i in range(6)
+        ]
+        self.table = pd.DataFrame({
+            "h3_index": self.cells,
+            "pH": [5.0, 5.5, 6.0, 6.5, 7.0, 7.5],
+            "SOC": [2.6, 1.0, 3.0, np.nan, 5.5, 2.0],
+            "moisture": [40.0, 50.0, 60.0, 70.0, 80.0, 90.0],
+            "EC": [1.0] * 6,
+            "temp": [26.0] * 6,
+            "texture": ["clay", "sandy loam", "clay", None, "loam", "clay"],
+        })
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SoilPropertyStore.build(self.table, self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_bulk_lookup_in_input_order(self):
+        """Lookups return rows in request order; unknown cells are missing."""
+        unknown = h3.latlng_to_cell(0.0, 0.0, 6)
+        query = [self.cells[4], unknown, self.cells[0]]
+        result = get_soil_properties_for_cells(query, self.store)
+        self.assertEqual(result["h3_index"].tolist(), query)
+        self.assertEqual(result["pH"].tolist()[0], 7.0)
+        self.assertTrue(np.isnan(result["pH"].iloc[1]))
+        self.assertEqual(result["SOC"].iloc[2], 2.6)
+        self.assertEqual(result["texture"].tolist(), ["loam", np.nan, "clay"])
+
+    def test_uint64_cells_and_reopen(self):
+        reopened = SoilPropertyStore(self.tmp.name)
+        result = reopened.lookup(
+            np.array([h3.str_to_int(c) for c in self.cells], dtype=np.uint64)
+        )
+        np.testing.assert_array_equal(
+            result["moisture"].to_numpy(), self.table["moisture"].to_numpy()
+        )
+
+    def test_single_cell_lookup_uses_store(self):
+        soil = get_soil_properties_from_h3(self.cells[3], store=self.tmp.name)
+        self.assertEqual(soil["moisture"], 70.0)
+        self.assertIsNone(soil["SOC"])
+        self.assertIsNone(soil["texture"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+
+import h3
+import numpy as np
+import pandas as pd
+from shapely.geometry import Point, Polygon
+
+from src.models.spatial_model import SpatialModel
+
+
+class TestSpatialModel(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            "latitude": rng.uniform(-18, -7, 200),
+            "longitude": rng.uniform(-65, -50, 200),
+        })
+        # Repeated coordinates and a missing one
+        self.df.loc[10] = self.df.loc[0]
+        self.df.loc[11, "latitude"] = np.nan
+        self.model = SpatialModel(h3_resolution=6)
+
+    def test_add_h3_index_matches_h3(self):
+        """Batched uint64 indexes equal per-row h3 lookups at every res."""
+        df = self.model.add_h3_index(self.df.copy(), resolutions=[5, 6, 7])
+        self.assertEqual(df["h3_index"].dtype, np.uint64)
+        for res, column in [
+            (5, "h3_index_5"),
+            (6, "h3_index"),
+            (7, "h3_index_7"),
+        ]:
+            for i, row in df.iterrows():
+                if np.isnan(row["latitude"]):
+                    self.assertEqual(df.at[i, column], 0)
+                    continue
+                expected = h3.latlng_to_cell(
+                    row["latitude"], row["longitude"], res
+                )
+                self.assertEqual(
+                    h3.int_to_str(int(df.at[i, column])), expected
+                )
+
+    def test_add_h3_index_as_strings(self):
+        df = self.model.add_h3_index(self.df.copy(), as_uint64=False)
+        row = df.iloc[0]
+        self.assertEqual(
+            row["h3_index"],
+            h3.latlng_to_cell(row["latitude"], row["longitude"], 6),
+        )
+
+    def test_h3_to_geodataframe_shares_and_caches_geometry(self):
+        """Duplicate cells share a polygon; boundaries persist on disk."""
+        cells = [
+            h3.latlng_to_cell(-12.0 + 0.1 * i, -55.0, 6) for i in range(5)
+        ]
+        df = pd.DataFrame({"h3_index": cells + cells[:2]})
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, "h3_boundaries.npz")
+            gdf = SpatialModel(
+                boundary_cache_path=cache_path
+            ).h3_to_geodataframe(df)
+
+            expected = Polygon(
+                [(lng, lat) for lat, lng in h3.cell_to_boundary(cells[0])]
+            )
+            self.assertTrue(gdf.geometry.iloc[0].equals(expected))
+            self.assertIs(gdf.geometry.iloc[5], gdf.geometry.iloc[0])
+
+            reloaded = SpatialModel(boundary_cache_path=cache_path)
+            self.assertEqual(len(reloaded.boundary_cache), len(cells))
+            uint_df = pd.DataFrame(
+                {"h3_index": [h3.str_to_int(c) for c in cells]}
+            ).astype("uint64")
+            self.assertTrue(
+                reloaded.h3_to_geodataframe(uint_df)
+                .geometry.iloc[0]
+                .equals(expected)
+            )
+
+    def test_missing_cells_get_no_geometry(self):
+        model = SpatialModel(boundary_cache_path=None)
+        cell = h3.latlng_to_cell(-12.0, -55.0, 6)
+        gdf = model.h3_to_geodataframe(
+            pd.DataFrame({"h3_index": [None, cell, None]})
+        )
+        self.assertIsNone(gdf.geometry.iloc[0])
+        self.assertIsNotNone(gdf.geometry.iloc[1])
+        empty = model.h3_to_geodataframe(
+            pd.DataFrame({"h3_index": [None, None]})
+        )
+        self.assertTrue(empty.geometry.isna().all())
+        self.assertEqual(
+            str(SpatialModel().boundary_cache.path),
+            os.path.join("data", "outputs", "h3_boundaries.npz"),
+        )
+
+    def test_filter_within_boundary_matches_point_tests(self):
+        """Covering-based filtering keeps exactly what contains() accepts."""
+        boundary = Polygon(
+            [(-64, -17), (-52, -16), (-51, -8), (-58, -10), (-63, -8)]
+        )
+        model = SpatialModel(boundary=boundary, h3_resolution=5)
+        self.assertGreater(len(model.boundary_covering()), 0)
+        kept = model.filter_within_boundary(self.df)
+        expected = [
+            i
+            for i, row in self.df.iterrows()
+            if not np.isnan(row["latitude"])
+            and boundary.contains(Point(row["longitude"], row["latitude"]))
+        ]
+        self.assertEqual(kept.index.tolist(), expected)
+
+    def test_filter_within_aoi_circle(self):
+        """Any geometry (here a buffered point) can replace the boundary."""
+        aoi = Point(-57.0, -12.0).buffer(3.0)
+        kept = self.model.filter_within_boundary(self.df, boundary=aoi)
+        mask = [not np.isnan(lat) and aoi.contains(Point(lon, lat))
+                for lat, lon in zip(self.df["latitude"], self.df["longitude"])]
+        self.assertEqual(kept.index.tolist(), self.df.index[mask].tolist())
+        self.assertEqual(
+            len(self.model.filter_within_boundary(self.df)), len(self.df)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
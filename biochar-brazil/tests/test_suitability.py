@@ -1,6 +1,12 @@
 import unittest
+import numpy as np
 import pandas as pd
-from src.analysis.suitability import calculate_suitability
+from src.analysis.suitability import (
+    FEATURE_SUBSCORES,
+    WeightedSuitability,
+    calculate_suitability,
+    subscores,
+)
 
 
 class TestSuitability(unittest.TestCase):
@@ -29,5 +35,113 @@ class TestSuitability(unittest.TestCase):
         self.assertTrue(result["suitability_score"].between(0, 1).all())
 
 
+class TestWeightedSuitability(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            "h3_index": [f"cell-{i}" for i in range(50)],
+            "pH": rng.uniform(4, 8, 50),
+            "SOC": rng.uniform(0.5, 5, 50),
+            "moisture": rng.uniform(0, 20, 50),
+        })
+        self.config = {
+            "scoring": {
+                "weights": {
+                    "soil_ph": 0.5,
+                    "soc": 0.5,
+                    "moisture": 0.2,
+                    "temp": 0.1,
+                },
+                "clamp_min": 0.0,
+                "clamp_max": 10.0,
+            },
+            "recommendation": {"good_threshold": 7.5, "ok_threshold": 6.0},
+        }
+
+    def test_matches_weighted_sum(self):
+        """Scores are the weighted sum of per-feature 0..10 sub-scores."""
+        model = WeightedSuitability.from_config(self.config)
+        result = model.score(self.df)
+        ph = np.clip((self.df["pH"] - 8.0) / (5.0 - 8.0), 0, 1) * 10
+        soc = np.clip((self.df["SOC"] - 5.0) / (1.0 - 5.0), 0, 1) * 10
+        moisture = (
+            np.clip(1 - np.maximum(20 - self.df["moisture"], 0) / 20, 0, 1)
+            * 10
+        )
+        expected = (0.5 * ph + 0.5 * soc + 0.2 * moisture).clip(0, 10)
+        np.testing.assert_allclose(
+            result["suitability_score"], expected, rtol=1e-5
+        )
+        self.assertEqual(result["suitability_score"].dtype, np.float32)
+
+    def test_categorical_features_encoded(self):
+        """Soil type names and land cover names/codes map to sub-scores."""
+        model = WeightedSuitability({"soil_type": 0.5, "land_cover": 0.5})
+        df = pd.DataFrame({"texture": ["Sandy Loam", "clay", "peat", None],
+                           "land_cover": [40, 40.0, "forest", 40]})
+        scores = model.score(df)["suitability_score"].to_numpy()
+        levels = FEATURE_SUBSCORES["soil_type"]["levels"]
+        np.testing.assert_allclose(
+            scores[:3],
+            [
+                0.5 * levels["sandy loam"] + 5.0,
+                0.5 * levels["clay"] + 5.0,
+                0.5 * FEATURE_SUBSCORES["soil_type"]["default"] + 1.0,
+            ],
+        )
+        self.assertTrue(np.isnan(scores[3]))
+
+    def test_non_numeric_feature_rejected(self):
+        with self.assertRaisesRegex(ValueError, "soil_ph"):
+            WeightedSuitability({"soil_ph": 1.0}).score(
+                pd.DataFrame({"pH": ["acid", "neutral"]})
+            )
+
+    def test_subscore_curves(self):
+        values = pd.Series([0.0, 10.0, 20.0, 40.0, 60.0, 70.0, 90.0])
+        np.testing.assert_allclose(
+            subscores(
+                values, {"type": "range", "min": 20, "max": 60, "span": 20}
+            ),
+            [0, 5, 10, 10, 10, 5, 0],
+        )
+        np.testing.assert_allclose(
+            subscores(values[:3], {"type": "linear", "lo": 0, "hi": 20}),
+            [0, 5, 10],
+        )
+
+    def test_clamp_and_classes(self):
+        model = WeightedSuitability(
+            {"soil_ph": 1.0},
+            features={"soil_ph": {"subscore": {"type": "identity"}}},
+        )
+        result = model.score(
+            pd.DataFrame({"pH": [-1.0, 5.0, 6.0, 7.5, 12.0, np.nan]})
+        )
+        np.testing.assert_array_equal(
+            result["suitability_score"][:5], [0.0, 5.0, 6.0, 7.5, 10.0]
+        )
+        self.assertEqual(
+            list(result["suitability_class"].astype(object)[:5]),
+            ["poor", "poor", "ok", "good", "good"],
+        )
+        self.assertTrue(pd.isna(result["suitability_class"][5]))
+
+    def test_scenarios_in_one_batch(self):
+        scenarios = [{}, {"soc": 0.0}, {"soil_ph": 1.0, "moisture": 0.0}]
+        batch = WeightedSuitability.from_config(
+            self.config, scenarios=scenarios
+        ).score(self.df)
+        for i, scenario in enumerate(scenarios):
+            weights = {**self.config["scoring"]["weights"], **scenario}
+            single = WeightedSuitability(weights).score(self.df)
+            np.testing.assert_allclose(
+                batch[f"suitability_score_{i}"],
+                single["suitability_score"],
+                rtol=1e-6,
+            )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from src.analysis.suitability import DEFAULT_CONFIG_PATH, WeightedSuitability
+from src.analysis.sweep import expand_grid, override_bundles, run_sweep
+from src.analysis.thresholds import (
+    compile_bundles,
+    evaluate_soil_against_biochars,
+)
+from tests.test_thresholds import make_biochars
+
+
+def make_soils(n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "h3_index": [f"86a8{c:03d}ffffffff" for c in range(n)],
+        "pH": rng.uniform(4, 9, n).round(1),
+        "SOC": rng.uniform(0.5, 6, n).round(1),
+        "moisture": rng.uniform(5, 90, n).round(0),
+        "temp": rng.uniform(15, 35, n).round(1),
+    })
+
+
+class TestScenarioSweep(unittest.TestCase):
+
+    def setUp(self):
+        with open(DEFAULT_CONFIG_PATH, "r", encoding="utf-8") as f:
+            self.config = yaml.safe_load(f)
+        self.soils = make_soils()
+        self.biochars = pd.DataFrame(make_biochars(15))
+        self.weight_grid = {"soc": [0.2, 0.3], "soil_ph": [0.1, 0.2, 0.4]}
+        self.threshold_grid = {"acidic_soil.when.pH.value": [5.5, 6.0]}
+
+    def test_expand_grid(self):
+        self.assertEqual(expand_grid(None), [{}])
+        self.assertEqual(len(expand_grid(self.weight_grid)), 6)
+
+    def test_override_bundles(self):
+        bundles = self.config["thresholds"]["bundles"]
+        changed = override_bundles(
+            bundles,
+            {
+                "acidic_soil.when.pH.value": 5.5,
+                "moisture_low.when.1.value": 70,
+            },
+        )
+        self.assertEqual(changed["acidic_soil"]["when"][0]["value"], 5.5)
+        self.assertEqual(changed["moisture_low"]["when"][1]["value"], 70)
+        self.assertEqual(bundles["acidic_soil"]["when"][0]["value"], 6.0)
+        with self.assertRaises(KeyError):
+            override_bundles(bundles, {"acidic_soil.when.SOC.value": 1})
+
+    def test_sweep_matches_single_runs(self):
+        table, scenarios = run_sweep(
+            self.soils,
+            self.config,
+            self.weight_grid,
+            self.threshold_grid,
+            biochars=self.biochars,
+            workers=1,
+        )
+        self.assertEqual(len(scenarios), 12)
+        self.assertEqual(len(table), 12 * len(self.soils))
+
+        spec = self.config["thresholds"]
+        for s in scenarios:
+            rows = table[table["scenario"] == s["scenario"]]
+            single = WeightedSuitability(
+                {**self.config["scoring"]["weights"], **s["weights"]}
+            )
+            np.testing.assert_allclose(
+                rows["suitability_score"],
+                single.score(self.soils)["suitability_score"],
+                rtol=1e-6,
+            )
+
+            rules = compile_bundles(
+                override_bundles(spec["bundles"], s["thresholds"]),
+                spec["points_per_rule"],
+                spec["total_points_target"],
+            )
+            for soil, best, score in zip(
+                self.soils.to_dict("records"),
+                rows["best_biochar"],
+                rows["best_score"],
+            ):
+                top = evaluate_soil_against_biochars(
+                    soil,
+                    make_biochars(15),
+                    with_rationale=False,
+                    top_k=1,
+                    rules=rules,
+                )[0]
+                self.assertEqual(
+                    self.biochars["id"].iloc[best], top["biochar_id"]
+                )
+                self.assertAlmostEqual(
+                    score, top["normalized_score"], places=5
+                )
+
+    def test_process_pool_matches_serial(self):
+        serial, _ = run_sweep(
+            self.soils,
+            self.config,
+            self.weight_grid,
+            self.threshold_grid,
+            biochars=self.biochars,
+            workers=1,
+        )
+        pooled, _ = run_sweep(
+            self.soils,
+            self.config,
+            self.weight_grid,
+            self.threshold_grid,
+            biochars=self.biochars,
+            workers=2,
+        )
+        pd.testing.assert_frame_equal(serial, pooled)
+
+
+if __name__ == "__main__":
+    unittest.main()
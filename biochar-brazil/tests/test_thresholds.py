@@ -0,0 +1,351 @@
+import copy
+import random
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.thresholds import (
+    BUNDLES,
+    RULES,
+    compile_bundles,
+    load_rules,
+    prepare_biochars,
+    build_rationale,
+    evaluate_matrix,
+    evaluate_one,
+    evaluate_soil_against_biochars,
+    evaluate_soils_against_biochars,
+    soil_signature,
+)
+
+BIOCHAR_PROPS = [
+    "fixed_carbon", "volatile_matter", "ash", "pH", "c_pct", "h_pct",
+    "bet", "pore_volume", "o_pct", "o_c_ratio", "moisture",
+]
+
+
+def make_biochars(n, seed=0):
+    rng = random.Random(seed)
+    biochars = []
+    for i in range(n):
+        bio = {"id": i, "name": f"char-{i}"}
+        for prop in BIOCHAR_PROPS:
+            bio[prop] = (
+                None if rng.random() < 0.1 else round(rng.uniform(0, 120), 2)
+            )
+        biochars.append(bio)
+    # Explicit hard-fail candidates for the soc_too_high blocker
+    biochars[0]["fixed_carbon"] = None
+    biochars[1]["fixed_carbon"] = 5000
+    return biochars
+
+
+def make_soils(n, seed=1):
+    rng = random.Random(seed)
+    return [
+        {
+            "moisture": rng.choice([0, 30, 64.9, 65, 80]),
+            "pH": rng.choice([4.5, 6.0, 6.5, 7.0, 8.2]),
+            "SOC": rng.choice([1.0, 2.6, 4.0, 5.5]),
+            "EC": rng.choice([0.5, 4.0, 6.0]),
+            "temp": rng.choice([20.0, 25.0, 30.0]),
+        }
+        for _ in range(n)
+    ]
+
+
+class TestEvaluateMatrix(unittest.TestCase):
+
+    def setUp(self):
+        self.biochars = make_biochars(40)
+        self.soils = make_soils(60)
+
+    def test_matches_evaluate_one(self):
+        """Every cell of the score matrix equals the per-pair result."""
+        result = evaluate_matrix(
+            pd.DataFrame(self.soils), pd.DataFrame(self.biochars)
+        )
+        self.assertEqual(result["total_score"].shape, (60, 40))
+
+        for i, soil in enumerate(self.soils):
+            for j, bio in enumerate(self.biochars):
+                expected = evaluate_one(bio, soil)
+                self.assertEqual(
+                    result["total_score"][i, j], expected["total_score"]
+                )
+                self.assertEqual(
+                    result["normalized_score"][i, j],
+                    expected["normalized_score"],
+                )
+                self.assertEqual(result["max_score"][i], expected["max_score"])
+                hard_fail = expected["total_score"] == 0.0 and any(
+                    "critical" in m for m in expected["messages"]
+                )
+                self.assertEqual(bool(result["hard_fail"][i, j]), hard_fail)
+
+    def test_hard_fail_on_high_soc(self):
+        """Missing/out-of-range fixed carbon blocks all biochars at SOC > 5."""
+        soil = {"moisture": 30, "pH": 6.5, "SOC": 5.5, "EC": 0.5, "temp": 20.0}
+        result = evaluate_matrix([soil], self.biochars[:3])
+        self.assertTrue(result["hard_fail"][0, 0])
+        self.assertTrue(result["hard_fail"][0, 1])
+        self.assertEqual(result["total_score"][0, 0], 0.0)
+        self.assertEqual(result["normalized_score"][0, 1], 0.0)
+
+    def test_missing_soil_columns_use_defaults(self):
+        """Absent soil columns fall back to the bundle condition defaults."""
+        result = evaluate_matrix(
+            pd.DataFrame({"pH": [5.0]}), self.biochars[:5]
+        )
+        expected = [
+            evaluate_one(b, {"pH": 5.0})["total_score"]
+            for b in self.biochars[:5]
+        ]
+        np.testing.assert_array_equal(result["total_score"][0], expected)
+
+    def test_nan_soil_values_use_defaults(self):
+        """NaN soil values act as missing keys, also in dict-of-array soils."""
+        soils = pd.DataFrame(
+            {
+                "pH": [5.0, np.nan],
+                "SOC": [np.nan, 1.0],
+                "moisture": [np.nan, np.nan],
+            }
+        )
+        expected = [
+            [
+                evaluate_one(b, {"pH": 5.0})["total_score"]
+                for b in self.biochars[:5]
+            ],
+            [
+                evaluate_one(b, {"SOC": 1.0})["total_score"]
+                for b in self.biochars[:5]
+            ],
+        ]
+        np.testing.assert_array_equal(
+            evaluate_matrix(soils, self.biochars[:5])["total_score"], expected
+        )
+        arrays = {c: soils[c].to_numpy() for c in soils.columns}
+        np.testing.assert_array_equal(
+            evaluate_matrix(arrays, self.biochars[:5])["total_score"], expected
+        )
+
+    def test_nan_equivalence_with_overridden_thresholds(self):
+        """Per-pair and matrix paths agree on NaN soil and biochar values."""
+        bundles = copy.deepcopy(BUNDLES)
+        # default pH 7 now activates the bundle
+        bundles["acidic_soil"]["when"][0]["value"] = 7.5
+        rules = compile_bundles(bundles)
+        biochars = copy.deepcopy(self.biochars[:8])
+        biochars[2]["ash"] = float("nan")
+        biochars[3]["pH"] = np.nan
+        soils = [
+            {"pH": np.nan, "SOC": 1.0, "moisture": 30.0},
+            {"pH": None, "SOC": np.nan, "moisture": np.nan},
+        ]
+
+        result = evaluate_matrix(pd.DataFrame(soils), biochars, rules)
+        for i, soil in enumerate(soils):
+            self.assertIn("acidic_soil", soil_signature(soil, rules))
+            for j, bio in enumerate(biochars):
+                single = evaluate_one(bio, soil, rules=rules)
+                self.assertEqual(
+                    result["total_score"][i, j], single["total_score"]
+                )
+                self.assertEqual(
+                    result["normalized_score"][i, j],
+                    single["normalized_score"],
+                )
+
+    def test_float32_and_pd_na_equivalence(self):
+        """np.float32 NaN and pd.NA are missing in both paths."""
+        props = ["pH", "ash", "fixed_carbon", "moisture", "bet"]
+        biochars = [
+            {"id": 0, **{p: np.float32("nan") for p in props}},
+            {"id": 1, **{p: pd.NA for p in props}},
+            {"id": 2, "pH": np.float32(9.5), "ash": pd.NA},
+        ]
+        soils = [
+            {"pH": np.float32(5.0), "SOC": np.float32("nan")},
+            {"pH": pd.NA, "SOC": 1.0, "moisture": np.float32(30.0)},
+        ]
+
+        result = evaluate_matrix(soils, biochars)
+        for i, soil in enumerate(soils):
+            for j, bio in enumerate(biochars):
+                single = evaluate_one(bio, soil)
+                self.assertEqual(
+                    result["total_score"][i, j], single["total_score"]
+                )
+                self.assertEqual(
+                    result["normalized_score"][i, j],
+                    single["normalized_score"],
+                )
+
+    def test_prepared_biochars_reused(self):
+        prepared = prepare_biochars(self.biochars)
+        direct = evaluate_matrix(self.soils, self.biochars)
+        reused = evaluate_matrix(self.soils, None, prepared=prepared)
+        np.testing.assert_array_equal(
+            direct["total_score"], reused["total_score"]
+        )
+        with self.assertRaises(ValueError):
+            other = copy.deepcopy(BUNDLES)
+            other["acidic_soil"]["when"][0]["value"] = 5.5
+            evaluate_matrix(
+                self.soils,
+                None,
+                rules=compile_bundles(other),
+                prepared=prepared,
+            )
+
+
+class TestLazyRationale(unittest.TestCase):
+
+    def setUp(self):
+        self.biochars = make_biochars(20)
+        self.soils = make_soils(10)
+
+    def test_no_rationale_keeps_ranking(self):
+        """Skipping rationale does not change scores or order."""
+        for soil in self.soils:
+            eager = evaluate_soil_against_biochars(soil, self.biochars)
+            lazy = evaluate_soil_against_biochars(
+                soil, self.biochars, with_rationale=False
+            )
+            self.assertEqual(
+                [r["biochar_id"] for r in eager],
+                [r["biochar_id"] for r in lazy],
+            )
+            self.assertTrue(all(r["messages"] is None for r in lazy))
+
+    def test_build_rationale_matches_eager_messages(self):
+        """Rationale expanded later is identical to the one built inline."""
+        by_id = {b["id"]: b for b in self.biochars}
+        for soil in self.soils:
+            for r in evaluate_soil_against_biochars(
+                soil, self.biochars, with_rationale=False
+            )[:3]:
+                expected = evaluate_one(by_id[r["biochar_id"]], soil)[
+                    "messages"
+                ]
+                self.assertEqual(
+                    build_rationale(by_id[r["biochar_id"]], r["active"]),
+                    expected,
+                )
+
+
+class TestTopK(unittest.TestCase):
+
+    def setUp(self):
+        self.biochars = make_biochars(60)
+        # Duplicate a few rows so the ranking has exact ties
+        self.biochars += [
+            dict(b, id=100 + i) for i, b in enumerate(self.biochars[:10])
+        ]
+        self.soils = make_soils(15)
+
+    def test_top_k_matches_full_sort(self):
+        """Heap selection returns the head of the full sort, ties included."""
+        for soil in self.soils:
+            full = evaluate_soil_against_biochars(soil, self.biochars)
+            for k in (1, 5, 10, 200):
+                top = evaluate_soil_against_biochars(
+                    soil, self.biochars, top_k=k
+                )
+                self.assertEqual(top, full[:k])
+
+    def test_skip_blocked_drops_hard_fails(self):
+        """Biochars failing the soc_too_high blocker are left out."""
+        soil = {"moisture": 30, "pH": 6.5, "SOC": 5.5, "EC": 0.5, "temp": 20.0}
+        ranked = evaluate_soil_against_biochars(
+            soil, self.biochars, top_k=5, skip_blocked=True
+        )
+        ids = [r["biochar_id"] for r in ranked]
+        self.assertNotIn(0, ids)
+        self.assertNotIn(1, ids)
+        self.assertTrue(all(r["total_score"] > 0 for r in ranked))
+
+
+class TestSignatureCache(unittest.TestCase):
+
+    def setUp(self):
+        self.biochars = make_biochars(30)
+        self.soils = make_soils(80)
+
+    def test_region_ranking_matches_per_soil(self):
+        """Sharing rankings across a signature gives the per-soil result."""
+        region = evaluate_soils_against_biochars(
+            self.soils, self.biochars, top_k=5
+        )
+        for soil, ranked in zip(self.soils, region):
+            self.assertEqual(
+                ranked,
+                evaluate_soil_against_biochars(soil, self.biochars, top_k=5),
+            )
+
+    def test_matrix_signatures(self):
+        """Soils with equal signatures share a signature id and score rows."""
+        result = evaluate_matrix(self.soils, self.biochars)
+        n_distinct = len({soil_signature(s) for s in self.soils})
+        self.assertEqual(len(set(result["signature"].tolist())), n_distinct)
+        for i, soil in enumerate(self.soils):
+            self.assertEqual(
+                tuple(
+                    k
+                    for k, on in zip(
+                        result["bundle_keys"], result["active"][i]
+                    )
+                    if on
+                ),
+                soil_signature(soil),
+            )
+
+    def test_unexpanded_matrix_has_one_row_per_signature(self):
+        full = evaluate_matrix(self.soils, self.biochars)
+        compact = evaluate_matrix(self.soils, self.biochars, expand=False)
+        n_sigs = len({soil_signature(s) for s in self.soils})
+        self.assertEqual(compact["total_score"].shape, (n_sigs, 30))
+        sig = compact["signature"]
+        for key in ("total_score", "normalized_score", "hard_fail"):
+            np.testing.assert_array_equal(compact[key][sig], full[key])
+        np.testing.assert_array_equal(
+            compact["max_score"][sig], full["max_score"]
+        )
+
+
+class TestCompiledRules(unittest.TestCase):
+
+    def test_default_rules_loaded_from_config(self):
+        """The default config compiles into one array entry per rule."""
+        rules = load_rules()
+        self.assertEqual(rules.version, RULES.version)
+        self.assertEqual(
+            len(rules), sum(len(b["rules"]) for b in BUNDLES.values())
+        )
+        self.assertEqual(len(rules.rule_type), len(rules))
+
+    def test_version_tracks_spec(self):
+        """Changing a threshold changes the version hash and the scores."""
+        bundles = copy.deepcopy(BUNDLES)
+        bundles["acidic_soil"]["when"][0]["value"] = 5.5
+        custom = compile_bundles(bundles)
+        self.assertNotEqual(custom.version, RULES.version)
+        soil = {"pH": 5.8}
+        self.assertIn("acidic_soil", RULES.signature(soil))
+        self.assertNotIn("acidic_soil", custom.signature(soil))
+
+    def test_unknown_rule_type_rejected(self):
+        bundles = {
+            "bad": {
+                "when": [],
+                "rules": [{"prop": "ash", "type": "between", "w": 1}],
+            }
+        }
+        with self.assertRaises(ValueError):
+            compile_bundles(bundles)
+
+
+if __name__ == "__main__":
+    unittest.main()